@@ -0,0 +1,391 @@
+"""Convert LookML files or whole directories to Omni YAML from the command line.
+
+    python batch_convert.py path/to/lookml_project -o omni_yaml/
+    python batch_convert.py path/to/lookml_project -o shard_2/ --shard 2/4
+
+With --shard i/N only the outputs whose path hashes to shard i are
+converted, so N nodes can split a run; merge_shards.py then combines their
+outputs.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from lookml_project import RELATIONSHIPS_PATH, LookMLProject, describe_target
+from metrics import CACHE_LOOKUPS, CONVERSION_SECONDS, CONVERSIONS, MetricsFileWriter, size_class
+from omni_converter import LookMLToOmniConverter
+from project_store import SqliteStore
+from rename_rules import RenameRules, RuleError
+
+# Output path -> content hash, size and mtime of every file the last run wrote
+MANIFEST_NAME = '.omni_manifest.json'
+# What one shard of a sharded run converted: sources, output hashes, timings and errors
+SHARD_MANIFEST_NAME = '.omni_shard.json'
+
+
+def iter_lookml_files(paths: List[str]) -> Iterator[Tuple[str, str]]:
+    """Yield (source_path, relative_path) for every .lkml file under the given paths"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.lkml'):
+                        source = os.path.join(root, name)
+                        yield source, os.path.relpath(source, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+def shard_of(path: str, shards: int) -> int:
+    """Shard, from 1 to shards, that converts the output at path
+
+    Based on a hash of the path with / separators, so every node assigns the
+    same files to the same shard whatever order it finds them in. Outputs
+    rather than sources are assigned, since one model file can produce
+    thousands of topics.
+    """
+    digest = hashlib.sha256(path.replace(os.sep, '/').encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shards + 1
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse --shard i/N"""
+    index, _, shards = value.partition('/')
+    try:
+        index, shards = int(index), int(shards)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if not 1 <= index <= shards:
+        raise argparse.ArgumentTypeError(f"shard {index} is not between 1 and {shards}")
+    return index, shards
+
+
+def content_hash(data: bytes) -> str:
+    """Hash identifying an output file's content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _default_file_mode() -> int:
+    """Mode open() gives a new file under the process umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Read once at import: os.umask can only be read by setting it, which is not thread-safe
+DEFAULT_FILE_MODE = _default_file_mode()
+
+
+def write_atomic(path: str, data: bytes):
+    """Write through a temporary file in the same directory and rename it over path
+
+    The file keeps the mode of the one it replaces, or gets the umask's
+    default for a new file, rather than mkstemp's owner-only 0600.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load_manifest(output_dir: str, name: str = MANIFEST_NAME) -> Dict[str, Any]:
+    """Entries written by the previous run, or none if there is no readable manifest"""
+    try:
+        with open(os.path.join(output_dir, name), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, Any], name: str = MANIFEST_NAME):
+    """Replace the manifest atomically, like the outputs it describes"""
+    data = json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8')
+    write_atomic(os.path.join(output_dir, name), data)
+
+
+def file_matches(path: str, digest: str, entry: Optional[Dict[str, Any]]) -> bool:
+    """Whether the file at path already holds content with this hash
+
+    A file whose size and mtime still match its manifest entry is trusted
+    without reading it; anything else is read and hashed.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['hash'] == digest
+    with open(path, 'rb') as f:
+        return content_hash(f.read()) == digest
+
+
+def manifest_entry(path: str, digest: str) -> Dict[str, Any]:
+    """Manifest entry for a file just written or verified"""
+    stat = os.stat(path)
+    return {'hash': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ProgressReporter:
+    """Live progress line with throughput and ETA, redrawn in place on a terminal"""
+
+    def __init__(self, stream: TextIO = sys.stderr, interval: float = 0.2):
+        self.stream = stream
+        self.interval = interval
+        self.phase = None
+        self.started = 0.0
+        self.last_draw = 0.0
+
+    def __call__(self, phase: str, done: int, total: int):
+        now = time.monotonic()
+        if phase != self.phase:
+            if self.phase is not None:
+                self.stream.write('\n')
+            self.phase, self.started, self.last_draw = phase, now, 0.0
+        if done < total and now - self.last_draw < self.interval:
+            return
+        self.last_draw = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = f"{(total - done) / rate:.0f}s" if rate and done < total else '-'
+        self.stream.write(f"\r{phase}: {done}/{total} files  {rate:.1f} files/s  ETA {eta}  ")
+        self.stream.flush()
+
+    def finish(self):
+        """End the progress line so later output starts on a fresh line"""
+        if self.phase is not None:
+            self.stream.write('\n')
+            self.stream.flush()
+            self.phase = None
+
+
+def convert_files(paths: List[str], output_dir: str,
+                  on_progress: Optional[Callable[[str, int, int], None]] = None,
+                  rules: Optional[RenameRules] = None,
+                  shard: Optional[Tuple[int, int]] = None, store=None,
+                  fail_on_join_cycles: bool = False) -> Dict[str, int]:
+    """Convert every LookML file under paths into output_dir, returning counts of
+    written, unchanged, deleted and failed outputs
+
+    All files are loaded into one project first so extends and refinements
+    can be resolved across files; each view is written to <view>.view.yaml
+    and each explore to <explore>.topic.yaml next to where its source file
+    sits, with every join in relationships.yaml at the top of output_dir.
+    on_progress(phase, done, total) reports each file loaded ('loading') and
+    each output converted ('converting'). rules replaces the bundled rename
+    rules.
+
+    Only outputs whose content hash changed are written, atomically; the
+    hashes are kept in a manifest in output_dir. Outputs the previous run
+    wrote that this run no longer produces are deleted, unless some input
+    failed to load.
+
+    shard=(i, N) converts only the outputs assigned to shard i by shard_of.
+    Every file is still loaded, since extends and refinements cross files,
+    and a shard manifest records the sources seen, each output's hash and
+    conversion time, and every error, for merge_shards.py.
+
+    store holds the scanned views, in memory when not given; a SqliteStore
+    keeps projects larger than RAM on disk.
+
+    Cycles in the join graph are printed as warnings, or counted as
+    failures with fail_on_join_cycles.
+    """
+    started = time.perf_counter()
+    converter = LookMLToOmniConverter(rules)
+    project = LookMLProject(converter, store)
+    counts = {'written': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0}
+    previous = load_manifest(output_dir)
+    manifest: Dict[str, Dict[str, Any]] = {}
+    sizes: Dict[str, int] = {}
+    source_hashes: Dict[str, str] = {}
+    shard_outputs: Dict[str, Dict[str, Any]] = {}
+    errors: List[Dict[str, str]] = []
+    sources = list(iter_lookml_files(paths))
+    for loaded, (source, relative) in enumerate(sources):
+        if on_progress:
+            on_progress('loading', loaded, len(sources))
+        try:
+            with open(source, encoding='utf-8') as f:
+                lookml_code = f.read()
+            source_hashes[relative] = content_hash(lookml_code.encode('utf-8'))
+            project.add_file(relative, lookml_code)
+            sizes[relative] = len(lookml_code)
+        except Exception as e:
+            print(f"error: {source}: {e}", file=sys.stderr)
+            errors.append({'path': relative, 'error': str(e)})
+            counts['failed'] += 1
+    load_failed = counts['failed'] > 0
+    loaded_at = time.perf_counter()
+    # Explores joining each other's views both ways are common, so cycles only fail the run when asked
+    for cycle in project.join_graph.find_cycles():
+        message = f"join cycle: {' -> '.join(cycle)}"
+        if fail_on_join_cycles:
+            print(f"error: {message}", file=sys.stderr)
+            errors.append({'path': RELATIONSHIPS_PATH, 'error': message})
+            counts['failed'] += 1
+        else:
+            print(f"warning: {message}", file=sys.stderr)
+
+    # Every output must come from exactly one source, or one would silently overwrite another
+    claims: Dict[str, List[Tuple[Optional[str], Tuple[str, Optional[str]]]]] = {}
+    for relative in project.files:
+        try:
+            file_outputs = project.output_paths(relative)
+        except ValueError as e:
+            print(f"error: {relative}: {e}", file=sys.stderr)
+            errors.append({'path': relative, 'error': str(e)})
+            counts['failed'] += 1
+            # Like a file that failed to load: its outputs are unknown
+            load_failed = True
+            continue
+        for output, target in file_outputs.items():
+            claims.setdefault(output, []).append((relative, target))
+    for output, target in project.project_outputs().items():
+        claims.setdefault(output, []).append((None, target))
+    outputs = []
+    for output, claimants in claims.items():
+        if len(claimants) == 1:
+            outputs.append((claimants[0][0], output, claimants[0][1]))
+            continue
+        error = f"{output} would be written from " + ', '.join(
+            f"{describe_target(target)} in {relative or 'the project'}" for relative, target in claimants)
+        print(f"error: {error}", file=sys.stderr)
+        errors.append({'path': output, 'error': error})
+        counts['failed'] += 1
+        if output in previous:
+            manifest[output] = previous[output]
+    if shard is not None:
+        outputs = [item for item in outputs if shard_of(item[1], shard[1]) == shard[0]]
+    if on_progress and sources:
+        on_progress('loading', len(sources), len(sources))
+    for done, (relative, output, target) in enumerate(outputs):
+        if on_progress:
+            on_progress('converting', done, len(outputs))
+        size = sizes[relative] if relative is not None else sum(sizes.values())
+        output_started = time.perf_counter()
+        try:
+            with CONVERSION_SECONDS.time(engine='rules', size=size_class(size)):
+                omni_yaml = project.convert_output(relative, target)
+        except Exception as e:
+            print(f"error: {output}: {e}", file=sys.stderr)
+            errors.append({'path': output, 'error': str(e)})
+            CONVERSIONS.inc(engine='rules', outcome='error')
+            counts['failed'] += 1
+            # Keep the last good output and its entry
+            if output in previous:
+                manifest[output] = previous[output]
+            continue
+        CONVERSIONS.inc(engine='rules', outcome='success')
+        data = (omni_yaml + '\n').encode('utf-8')
+        digest = content_hash(data)
+        destination = os.path.join(output_dir, output)
+        if file_matches(destination, digest, previous.get(output)):
+            CACHE_LOOKUPS.inc(cache='batch_output', result='hit')
+            counts['unchanged'] += 1
+        else:
+            CACHE_LOOKUPS.inc(cache='batch_output', result='miss')
+            write_atomic(destination, data)
+            counts['written'] += 1
+        manifest[output] = manifest_entry(destination, digest)
+        shard_outputs[output] = {'hash': digest, 'source': relative,
+                                 'seconds': round(time.perf_counter() - output_started, 6)}
+    if on_progress and outputs:
+        on_progress('converting', len(outputs), len(outputs))
+
+    stale = [output for output in previous if output not in manifest]
+    if load_failed:
+        # The outputs of files that failed to load are unknown, so keep everything
+        manifest.update((output, previous[output]) for output in stale)
+    else:
+        for output in stale:
+            try:
+                os.remove(os.path.join(output_dir, output))
+                counts['deleted'] += 1
+            except FileNotFoundError:
+                pass
+    if manifest != previous:
+        save_manifest(output_dir, manifest)
+    if shard is not None:
+        finished = time.perf_counter()
+        save_manifest(output_dir, {
+            'shard': shard[0],
+            'shards': shard[1],
+            'rules': converter.rules.digest,
+            'sources': source_hashes,
+            'outputs': shard_outputs,
+            'errors': errors,
+            'seconds': {'load': round(loaded_at - started, 6), 'convert': round(finished - loaded_at, 6),
+                        'total': round(finished - started, 6)},
+        }, SHARD_MANIFEST_NAME)
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert LookML files to Omni YAML")
+    parser.add_argument('paths', nargs='+', help=".lkml files or directories to convert")
+    parser.add_argument('-o', '--output-dir', required=True, help="directory to write the YAML files to")
+    parser.add_argument('--rules', help="rename rules file to use instead of the bundled rename_rules.yaml")
+    parser.add_argument('--progress', action=argparse.BooleanOptionalAction, default=sys.stderr.isatty(),
+                        help="show live progress, throughput and ETA on stderr (default: when stderr is a terminal)")
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help="convert only shard I of N (from 1), and write a shard manifest for merge_shards.py")
+    parser.add_argument('--store', metavar='DB',
+                        help="keep scanned views in this SQLite file (overwritten) instead of memory, "
+                             "for projects too large for RAM")
+    parser.add_argument('--store-cache', type=int, default=256, metavar='VIEWS',
+                        help="views held in memory with --store (default: %(default)s)")
+    parser.add_argument('--fail-on-join-cycles', action='store_true',
+                        help="count cycles in the join graph as failures instead of warnings")
+    parser.add_argument('--metrics-file', help="write Prometheus metrics to this file during and after the run")
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help="seconds between metrics file updates (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    rules = None
+    if args.rules:
+        try:
+            rules = RenameRules.load(args.rules)
+        except (OSError, RuleError) as e:
+            parser.error(f"cannot use rules file {args.rules}: {e}")
+    store = SqliteStore(args.store, cache_views=args.store_cache) if args.store else None
+    reporter = ProgressReporter() if args.progress else None
+    metrics_writer = MetricsFileWriter(args.metrics_file, args.metrics_interval).start() if args.metrics_file else None
+    try:
+        counts = convert_files(args.paths, args.output_dir, reporter, rules, args.shard, store,
+                               args.fail_on_join_cycles)
+    except KeyboardInterrupt:
+        if reporter:
+            reporter.finish()
+        print("interrupted", file=sys.stderr)
+        return 130
+    finally:
+        if metrics_writer:
+            metrics_writer.stop()
+        if store:
+            store.close()
+    if reporter:
+        reporter.finish()
+    print(f"{counts['written']} written, {counts['unchanged']} unchanged, "
+          f"{counts['deleted']} deleted, {counts['failed']} failed")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
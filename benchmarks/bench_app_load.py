@@ -0,0 +1,370 @@
+"""Concurrent-user load test for the Streamlit app, fully offline.
+
+Starts ``streamlit run lookml_converter.py`` headless with the LLM fallback
+pointed at benchmarks/mock_anthropic_server.py, then drives it with N
+simulated browser sessions speaking Streamlit's websocket protocol. Each
+session loops: paste an input (small, medium, large, or one the rule engine
+cannot convert so the stubbed LLM path runs), click Convert, click Download
+and fetch the file, and click Clear All. Load is ramped through the given
+session counts, and each level reports per-action latency percentiles,
+completed conversions per second, the server's CPU and peak memory, and
+"busy" rejections; the saturation point is the first level where throughput
+stops growing, Convert's p95 exceeds the SLO, or conversions are rejected.
+
+    python benchmarks/bench_app_load.py --sessions 1,2,4,8 --iterations 5
+    python benchmarks/bench_app_load.py --sessions 4,16 --workers 2 --queue 8 --json load.json
+
+The client runs in this process on the same machine as the server, so on a
+small machine it competes with the server for CPU; its own CPU time is
+reported alongside. Server CPU and memory are read from /proc (Linux).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from typing import Any, Dict, List, Optional
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState, WidgetStates
+from tornado.httpclient import AsyncHTTPClient
+from tornado.websocket import websocket_connect
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_llm_fallback import generate_view, percentile  # noqa: E402
+from mock_anthropic_server import MockConfig, server_url, start_server  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACTIONS = ('paste', 'convert', 'download', 'clear')
+# Input kind -> generated fields; 'llm' is an explore the rule engine leaves empty
+INPUT_SIZES = {'small': 20, 'medium': 400, 'large': 4000, 'llm': 0}
+BUSY_TEXT = 'busy'
+
+
+def make_input(kind: str, index: int) -> str:
+    """A unique input of the given kind, so every conversion really runs"""
+    tag = f"# load test {uuid.uuid4().hex}\n"
+    if kind == 'llm':
+        return tag + f"explore: orders_{index} {{\n  label: \"Orders {index}\"\n}}\n"
+    return tag + generate_view(index, INPUT_SIZES[kind])
+
+
+class ServerMonitor:
+    """Samples a process's CPU time and resident memory from /proc"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.peak_rss = 0
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime, fields 14 and 15 of the full line
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def rss_bytes(self) -> Optional[int]:
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    async def sample(self, interval: float = 0.25):
+        while True:
+            rss = self.rss_bytes()
+            if rss:
+                self.peak_rss = max(self.peak_rss, rss)
+            await asyncio.sleep(interval)
+
+
+class AppSession:
+    """One simulated browser tab: a websocket session with the widget state the frontend would keep"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.connection = None
+        # Messages the server may later send only by hash
+        self.cache: Dict[str, ForwardMsg] = {}
+        # Widgets of the last run: (element type, label) -> widget id, and download URLs
+        self.widgets: Dict[tuple, str] = {}
+        self.download_url: Optional[str] = None
+        self.alerts: List[str] = []
+        self.exceptions: List[str] = []
+        self.input_id: Optional[str] = None
+        self.input_value = ''
+
+    async def connect(self):
+        url = self.base_url.replace('http', 'ws', 1) + '/_stcore/stream'
+        self.connection = await websocket_connect(url, subprotocols=['streamlit'],
+                                                  max_message_size=512 * 1024 * 1024)
+        await self.rerun()
+
+    async def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    async def _resolve(self, msg: ForwardMsg) -> ForwardMsg:
+        if msg.WhichOneof('type') != 'ref_hash':
+            if msg.metadata.cacheable and msg.hash:
+                self.cache[msg.hash] = msg
+            return msg
+        cached = self.cache.get(msg.ref_hash)
+        if cached is None:
+            response = await AsyncHTTPClient().fetch(f"{self.base_url}/_stcore/message?hash={msg.ref_hash}")
+            cached = ForwardMsg()
+            cached.ParseFromString(response.body)
+            self.cache[msg.ref_hash] = cached
+        return cached
+
+    def _record(self, msg: ForwardMsg):
+        if msg.WhichOneof('type') != 'delta' or msg.delta.WhichOneof('type') != 'new_element':
+            return
+        element = msg.delta.new_element
+        kind = element.WhichOneof('type')
+        proto = getattr(element, kind)
+        if kind == 'alert':
+            self.alerts.append(proto.body)
+        elif kind == 'exception':
+            self.exceptions.append(f"{proto.type}: {proto.message}")
+        elif kind == 'download_button':
+            self.download_url = proto.url
+        if getattr(proto, 'id', '') and hasattr(proto, 'label'):
+            self.widgets[(kind, proto.label)] = proto.id
+            if kind == 'text_area' and proto.id.endswith('lookml_input'):
+                self.input_id = proto.id
+
+    async def rerun(self, trigger: Optional[str] = None):
+        """Send the current widget states, optionally clicking a button, and wait for the run to finish"""
+        self.widgets = {}
+        self.download_url = None
+        self.alerts = []
+        states = WidgetStates()
+        if self.input_id:
+            states.widgets.append(WidgetState(id=self.input_id, string_value=self.input_value))
+        if trigger:
+            states.widgets.append(WidgetState(id=trigger, trigger_value=True))
+        back = BackMsg(rerun_script=ClientState(query_string='', widget_states=states))
+        await self.connection.write_message(back.SerializeToString(), binary=True)
+        while True:
+            payload = await self.connection.read_message()
+            if payload is None:
+                raise ConnectionError("server closed the session")
+            msg = ForwardMsg()
+            msg.ParseFromString(payload)
+            msg = await self._resolve(msg)
+            if msg.WhichOneof('type') == 'script_finished':
+                return
+            self._record(msg)
+
+    def button(self, label: str) -> Optional[str]:
+        return self.widgets.get(('button', label)) or self.widgets.get(('download_button', label))
+
+
+async def run_session(session_id: int, base_url: str, iterations: int, kinds: List[str], seed: int,
+                      latencies: Dict[str, List[float]], counters: Dict[str, int]):
+    rng = random.Random(seed + session_id)
+    session = AppSession(base_url)
+    await session.connect()
+    try:
+        for iteration in range(iterations):
+            kind = rng.choice(kinds)
+            # Paste: the text area's value reaches the server on the next rerun
+            session.input_value = make_input(kind, session_id * 1000 + iteration)
+            start = time.perf_counter()
+            await session.rerun()
+            latencies['paste'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await session.rerun(session.button('CONVERT TO OMNI'))
+            latencies['convert'].append(time.perf_counter() - start)
+            # A rejected conversion returns quickly; it is counted, not credited to throughput
+            busy = any(BUSY_TEXT in alert for alert in session.alerts)
+            counters['busy' if busy else 'conversions'] += 1
+            if session.exceptions:
+                counters['exceptions'] += len(session.exceptions)
+                session.exceptions = []
+
+            download = session.button('DOWNLOAD YAML')
+            if download:
+                start = time.perf_counter()
+                url = session.download_url
+                await session.rerun(download)
+                if url:
+                    await AsyncHTTPClient().fetch(base_url + url, request_timeout=120)
+                latencies['download'].append(time.perf_counter() - start)
+            elif not busy:
+                counters['no_output'] += 1
+
+            start = time.perf_counter()
+            session.input_value = ''
+            await session.rerun(session.button('CLEAR ALL'))
+            latencies['clear'].append(time.perf_counter() - start)
+    except Exception as e:
+        counters['errors'] += 1
+        print(f"session {session_id}: {type(e).__name__}: {e}", file=sys.stderr)
+    finally:
+        await session.close()
+
+
+async def run_level(sessions: int, base_url: str, monitor: ServerMonitor, args) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {action: [] for action in ACTIONS}
+    counters = {'conversions': 0, 'busy': 0, 'no_output': 0, 'errors': 0, 'exceptions': 0}
+    monitor.peak_rss = 0
+    sampler = asyncio.ensure_future(monitor.sample())
+    cpu_before = monitor.cpu_seconds()
+    client_before = time.process_time()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(i, base_url, args.iterations, args.inputs, args.seed, latencies, counters)
+                           for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    cpu_after = monitor.cpu_seconds()
+    sampler.cancel()
+    result = {
+        'sessions': sessions,
+        'seconds': round(elapsed, 3),
+        'conversions_per_second': round(counters['conversions'] / elapsed, 3) if elapsed else 0.0,
+        'server_cpu_percent': round(100 * (cpu_after - cpu_before) / elapsed, 1)
+        if cpu_before is not None and cpu_after is not None else None,
+        'client_cpu_percent': round(100 * (time.process_time() - client_before) / elapsed, 1),
+        'server_peak_rss_mb': round(monitor.peak_rss / 2 ** 20, 1) if monitor.peak_rss else None,
+        **counters,
+        'latency_ms': {},
+    }
+    for action, values in latencies.items():
+        if values:
+            result['latency_ms'][action] = {
+                'count': len(values),
+                'p50': round(percentile(values, 50) * 1000, 1),
+                'p95': round(percentile(values, 95) * 1000, 1),
+                'p99': round(percentile(values, 99) * 1000, 1),
+                'max': round(max(values) * 1000, 1),
+            }
+    return result
+
+
+def saturation_point(levels: List[Dict[str, Any]], slo_ms: float) -> Optional[int]:
+    """First session count where conversions were rejected as busy, Convert's p95 broke the SLO, or
+    throughput grew less than 10% over the previous level"""
+    for previous, level in zip([None] + levels[:-1], levels):
+        convert = level['latency_ms'].get('convert')
+        if level['busy'] or (convert and convert['p95'] > slo_ms):
+            return level['sessions']
+        if previous and level['conversions_per_second'] < previous['conversions_per_second'] * 1.1:
+            return level['sessions']
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_app(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Start the app headless and wait until its health check answers"""
+    command = [sys.executable, '-m', 'streamlit', 'run', os.path.join(REPO_DIR, 'lookml_converter.py'),
+               '--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+               '--browser.gatherUsageStats', 'false', '--server.fileWatcherType', 'none']
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited: {process.stderr.read().decode(errors='replace')[-2000:]}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("app did not become healthy within 60 s")
+
+
+def print_level(level: Dict[str, Any]):
+    cpu = f"{level['server_cpu_percent']}%" if level['server_cpu_percent'] is not None else 'n/a'
+    rss = f"{level['server_peak_rss_mb']} MB" if level['server_peak_rss_mb'] is not None else 'n/a'
+    print(f"{level['sessions']:>3} sessions  {level['conversions_per_second']:6.2f} conversions/s  "
+          f"server cpu {cpu}  peak rss {rss}  client cpu {level['client_cpu_percent']}%  "
+          f"busy {level['busy']}  errors {level['errors'] + level['exceptions']}")
+    for action in ACTIONS:
+        stats = level['latency_ms'].get(action)
+        if stats:
+            print(f"      {action:<9} p50 {stats['p50']:8.1f}  p95 {stats['p95']:8.1f}  "
+                  f"p99 {stats['p99']:8.1f}  max {stats['max']:8.1f} ms  (n={stats['count']})")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit app with concurrent simulated sessions")
+    parser.add_argument('--sessions', default='1,2,4,8', help="comma-separated session counts to ramp through")
+    parser.add_argument('--iterations', type=int, default=3, help="paste/convert/download/clear cycles per session")
+    parser.add_argument('--inputs', default='small,medium,large,llm',
+                        help=f"input kinds to pick from: {', '.join(INPUT_SIZES)}")
+    parser.add_argument('--workers', type=int, help="LOOKML_CONVERSION_WORKERS for the app")
+    parser.add_argument('--queue', type=int, help="LOOKML_CONVERSION_QUEUE for the app")
+    parser.add_argument('--llm-latency-ms', type=float, default=500.0, help="mock LLM response time")
+    parser.add_argument('--slo-ms', type=float, default=10_000.0, help="Convert p95 beyond which the app is saturated")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the results to this file for tracking across commits")
+    args = parser.parse_args(argv)
+    levels = [int(count) for count in args.sessions.split(',')]
+    args.inputs = args.inputs.split(',')
+    unknown = [kind for kind in args.inputs if kind not in INPUT_SIZES]
+    if unknown:
+        parser.error(f"unknown input kinds: {', '.join(unknown)}")
+
+    mock_config = MockConfig(latency_ms=args.llm_latency_ms, mode='canned')
+    mock = start_server(mock_config)
+    env = dict(os.environ, ANTHROPIC_BASE_URL=server_url(mock), ANTHROPIC_API_KEY='mock-key')
+    env.pop('LOOKML_METRICS_PORT', None)
+    if args.workers:
+        env['LOOKML_CONVERSION_WORKERS'] = str(args.workers)
+    if args.queue:
+        env['LOOKML_CONVERSION_QUEUE'] = str(args.queue)
+    port = free_port()
+    app = start_app(port, env)
+    monitor = ServerMonitor(app.pid)
+    results = []
+    try:
+        loop = asyncio.new_event_loop()
+        for sessions in levels:
+            level = loop.run_until_complete(run_level(sessions, f"http://127.0.0.1:{port}", monitor, args))
+            results.append(level)
+            print_level(level)
+        loop.close()
+    finally:
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        mock.shutdown()
+
+    saturated = saturation_point(results, args.slo_ms)
+    print(f"saturation: {saturated} sessions" if saturated else
+          f"saturation: not reached up to {levels[-1]} sessions")
+    print(f"mock llm requests: {mock_config.stats.get('total', 0)}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'levels': results, 'saturation_sessions': saturated, 'slo_ms': args.slo_ms}, f, indent=1)
+    failed = any(level['errors'] or level['exceptions'] for level in results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Offline throughput benchmark for the LLM fallback against the mock Anthropic server.
+
+Starts benchmarks/mock_anthropic_server.py in-process, points a real SDK
+client at it and converts a workload of generated views through the app's
+own memoized LLM path (run_llm_conversion and its shared ResultCache),
+reporting throughput, latency percentiles, server-side retries and the cache
+hit ratio that path records.
+
+    python benchmarks/bench_llm_fallback.py --conversions 200 --concurrency 8 \\
+        --latency-ms 300 --rate-429 0.05 --distinct 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conversion_jobs import LLM_CACHE_ENTRIES, ConversionJob, ResultCache, run_llm_conversion  # noqa: E402
+from metrics import CACHE_LOOKUPS  # noqa: E402
+from mock_anthropic_server import MockConfig, server_url, start_server  # noqa: E402
+from omni_converter import LookMLToOmniConverter, conversion_cache_key, create_anthropic_client  # noqa: E402
+
+
+def generate_view(index: int, fields: int) -> str:
+    """Generate a LookML snippet with a mix of dimensions and measures"""
+    blocks = []
+    for i in range(fields):
+        if i % 3 == 2:
+            blocks.append(f"measure: total_{index}_{i} {{\n  type: sum\n  sql: ${{amount_{i}}} ;;\n}}")
+        else:
+            blocks.append(
+                f"dimension: field_{index}_{i} {{\n  label: \"Field {i}\"\n  type: string\n"
+                f"  sql: ${{TABLE}}.\"FIELD_{i}\" ;;\n}}"
+            )
+    return '\n\n'.join(blocks)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the LLM fallback against a local mock API")
+    parser.add_argument('--conversions', type=int, default=100, help="logical conversions to run")
+    parser.add_argument('--distinct', type=int, default=25, help="distinct inputs; repeats exercise the cache")
+    parser.add_argument('--fields', type=int, default=40, help="fields per generated input")
+    parser.add_argument('--concurrency', type=int, default=4, help="concurrent conversions")
+    parser.add_argument('--latency-ms', type=float, default=200.0)
+    parser.add_argument('--jitter-ms', type=float, default=50.0)
+    parser.add_argument('--ms-per-output-token', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-500', type=float, default=0.0)
+    parser.add_argument('--max-retries', type=int, default=2, help="SDK retry budget per request")
+    parser.add_argument('--cache-entries', type=int, default=LLM_CACHE_ENTRIES,
+                        help="size of the LLM result cache (default: the app's, %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="disable result memoization")
+    args = parser.parse_args(argv)
+
+    config = MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429,
+                        rate_500=args.rate_500, ms_per_output_token=args.ms_per_output_token)
+    server = start_server(config)
+    os.environ['ANTHROPIC_BASE_URL'] = server_url(server)
+    os.environ['ANTHROPIC_MAX_RETRIES'] = str(args.max_retries)
+
+    converter = LookMLToOmniConverter()
+    client = create_anthropic_client('mock-key')
+    inputs = [generate_view(i, args.fields) for i in range(args.distinct)]
+
+    # The app's LLM cache and conversion path, keyed as the app keys them
+    cache = ResultCache(0 if args.no_cache else args.cache_entries)
+    lookups_before = dict(CACHE_LOOKUPS.values)
+    failures = []
+    latencies = []
+
+    def convert(n: int):
+        lookml_code = inputs[n % len(inputs)]
+        key = conversion_cache_key(lookml_code, {'llm_fallback': True})
+        messages = []
+        start = time.perf_counter()
+        run_llm_conversion(lookml_code, key, "Benchmark", converter, client, cache, ConversionJob(n, key), messages)
+        if messages:
+            failures.append(messages)
+        else:
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(convert, range(args.conversions)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    stats = config.stats
+    api_calls = stats.get('total', 0)
+    retried = stats.get('429', 0) + stats.get('500', 0)
+    # Hits and misses as run_llm_conversion records them in the app's metrics
+    hits = CACHE_LOOKUPS.values.get(('llm', 'hit'), 0) - lookups_before.get(('llm', 'hit'), 0)
+    lookups = hits + CACHE_LOOKUPS.values.get(('llm', 'miss'), 0) - lookups_before.get(('llm', 'miss'), 0)
+    print(f"conversions      {args.conversions} in {elapsed:.2f} s ({args.conversions / elapsed:.1f}/s)")
+    if latencies:
+        print(f"latency          p50 {percentile(latencies, 50) * 1000:.0f} ms  "
+              f"p95 {percentile(latencies, 95) * 1000:.0f} ms  "
+              f"mean {statistics.mean(latencies) * 1000:.0f} ms")
+    print(f"api requests     {api_calls} ({stats.get('200', 0)} ok, {stats.get('429', 0)} x 429, "
+          f"{stats.get('500', 0)} x 500)")
+    print(f"retried          {retried} requests, {len(failures)} conversions failed after retries")
+    if not args.no_cache:
+        ratio = hits / lookups if lookups else 0.0
+        print(f"cache            {hits:g} hits / {lookups:g} lookups ({ratio:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Cold-start benchmark for the converter engine, the batch CLI and the Streamlit script.
+
+Each target is started in a fresh interpreter with ``python -X importtime`` so
+nothing is cached between runs. Reports the median wall time, the median total
+import time and the slowest top-level imports.
+
+    python benchmarks/bench_startup.py --runs 10 --json startup.json
+    python benchmarks/bench_startup.py --budget engine=150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'engine': ['-c', 'import omni_converter'],
+    'cli': ['-c', 'import batch_convert'],
+    # Running the script outside `streamlit run` executes it in bare mode, which
+    # still pays for every import and top-level statement of the page
+    'ui': ['lookml_converter.py'],
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """Return (module, cumulative_us) for top-level imports in -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        # Nested imports are indented further under the module that triggered them
+        if not name[1:].startswith(' '):
+            imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+def run_once(args: List[str]) -> Tuple[float, List[Tuple[str, int]], subprocess.CompletedProcess]:
+    """Start one interpreter for the target and return (wall_ms, imports, process)"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    return wall_ms, parse_importtime(proc.stderr), proc
+
+
+def bench_target(name: str, runs: int) -> Dict:
+    """Benchmark one target over several cold starts"""
+    walls = []
+    import_totals = []
+    imports = []
+    for _ in range(runs):
+        wall_ms, imports, proc = run_once(TARGETS[name])
+        if proc.returncode != 0:
+            last_line = (proc.stderr.strip().splitlines() or [''])[-1]
+            return {'target': name, 'error': f"exited with status {proc.returncode}: {last_line}"}
+        walls.append(wall_ms)
+        import_totals.append(sum(us for _, us in imports) / 1000)
+    slowest = sorted(imports, key=lambda item: item[1], reverse=True)[:5]
+    return {
+        'target': name,
+        'runs': runs,
+        'wall_ms_median': round(statistics.median(walls), 2),
+        'wall_ms_min': round(min(walls), 2),
+        'import_ms_median': round(statistics.median(import_totals), 2),
+        'slowest_imports': [{'module': module, 'ms': round(us / 1000, 2)} for module, us in slowest],
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the converter entry points")
+    parser.add_argument('--runs', type=int, default=5, help="cold starts per target")
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument('--json', help="write results to this file for tracking across commits")
+    parser.add_argument('--budget', action='append', default=[], metavar='TARGET=MS',
+                        help="fail if the median wall time of TARGET exceeds MS")
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    for item in args.budget:
+        target, ms = item.split('=', 1)
+        budgets[target] = float(ms)
+
+    results = [bench_target(name, args.runs) for name in args.targets]
+    exit_code = 0
+    for result in results:
+        if 'error' in result:
+            print(f"{result['target']:<8} {result['error']}")
+            continue
+        print(f"{result['target']:<8} wall {result['wall_ms_median']:8.1f} ms (min {result['wall_ms_min']:.1f})"
+              f"   imports {result['import_ms_median']:8.1f} ms")
+        for item in result['slowest_imports']:
+            print(f"{'':<10}{item['module']:<40}{item['ms']:8.1f} ms")
+        budget = budgets.get(result['target'])
+        if budget is not None and result['wall_ms_median'] > budget:
+            print(f"{result['target']}: median {result['wall_ms_median']} ms exceeds budget {budget} ms")
+            exit_code = 1
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
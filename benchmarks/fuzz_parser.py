@@ -0,0 +1,217 @@
+"""Pathological-input fuzz and timing harness for the rule-based parser.
+
+Generates adversarial LookML (huge single lines, whitespace runs before
+``;;``, unterminated SQL, deep ``case:`` nesting, unbalanced braces,
+million-entry ``timeframes`` arrays, named blocks and random mutations),
+converts each at growing sizes in a child process and checks:
+
+* a wall-clock and peak-memory budget per case,
+* that time grows roughly linearly with input size (superlinear growth is
+  reported with the measured exponent),
+* for well-formed cases, that no field falls outside its view.
+
+    python benchmarks/fuzz_parser.py
+    python benchmarks/fuzz_parser.py --cases whitespace_terminator --base-size 20000 --timeout 30
+    # million-entry timeframes arrays (the largest step is ~1.1M entries)
+    python benchmarks/fuzz_parser.py --cases timeframes_inline timeframes_multiline --base-size 1000000 --steps 3
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from omni_converter import LookMLToOmniConverter  # noqa: E402
+
+
+def huge_single_line(n: int) -> str:
+    """One label value n characters long"""
+    return f'dimension: wide {{\n  label: "{"x" * n}"\n  sql: ${{TABLE}}.wide ;;\n}}'
+
+
+def whitespace_terminator(n: int) -> str:
+    """Long whitespace runs in values that never reach a ;; terminator"""
+    padding = ' ' * n
+    return (
+        f'dimension: spaced {{\n'
+        f'  label: "a{padding}b"{padding}x\n'
+        f'  sql: ${{TABLE}}.spaced{padding}+{padding}1 ;;\n'
+        f'  description: tail{padding};{padding};x\n'
+        f'}}'
+    )
+
+
+def multiline_sql_whitespace(n: int) -> str:
+    """Multi-line SQL whose joined body ends in a long whitespace run"""
+    return 'dimension: sql_ws {\n  sql: CASE\n' + ('    WHEN a THEN b' + ' ' * 50 + '\n') * (n // 66) \
+        + '    END' + ' ' * n + ';;\n}'
+
+
+def unterminated_sql(n: int) -> str:
+    """A sql: without ;; followed by many objects that must still be parsed"""
+    fields = '\n'.join(
+        f'dimension: f{i} {{\n  type: string\n  sql: ${{TABLE}}.f{i} ;;\n}}' for i in range(n // 50)
+    )
+    return f'dimension: broken {{\n  sql: SELECT 1\n}}\n{fields}'
+
+
+def deep_case_nesting(n: int) -> str:
+    """case: blocks nested n levels deep"""
+    depth = n // 20
+    return 'dimension: nested {\n  case: {\n' + '    when: {\n' * depth + '    }\n' * depth + '  }\n}'
+
+
+def unbalanced_braces(n: int) -> str:
+    """Many more opening than closing braces, then stray closers"""
+    return 'dimension: open {\n' + '  {\n' * (n // 8) + 'measure: m {\n  type: count\n' + '}\n' * (n // 4)
+
+
+def timeframes_inline(n: int) -> str:
+    """A single-line timeframes array with n/6 entries"""
+    entries = ', '.join('date' for _ in range(n // 6))
+    return f'dimension_group: t {{\n  type: time\n  timeframes: [{entries}]\n  sql: ${{TABLE}}.t ;;\n}}'
+
+
+def timeframes_multiline(n: int) -> str:
+    """A multi-line timeframes array with n/8 entries"""
+    return 'dimension_group: t {\n  type: time\n  timeframes: [\n' + '    date,\n' * (n // 8) \
+        + '    year\n  ]\n  sql: ${TABLE}.t ;;\n}'
+
+
+def unterminated_lists(n: int) -> str:
+    """A set and a drill_fields list that never close, followed by many fields"""
+    fields = '\n'.join(
+        f'dimension: f{i} {{\n  drill_fields: [\n    a{i},\n    detail*\n  ]\n}}' for i in range(n // 60)
+    )
+    return f'view: v {{\n  set: detail {{\n    fields: [a, b,\n  measure: m {{\n    drill_fields: [\n{fields}\n}}'
+
+
+def named_blocks(n: int) -> str:
+    """Named view-level blocks (filter: name {, explore_source: name {) between fields, plus a
+    long whitespace run before { on a line that never opens one"""
+    blocks = '\n'.join(
+        f'  filter: f{i} {{\n    type: date\n  }}\n'
+        f'  derived_table: {{\n    explore_source: e{i} {{\n      column: c {{ field: e{i}.c }}\n'
+        f'      column: d {{\n        field: e{i}.d\n      }}\n    }}\n  }}\n'
+        f'  dimension: d{i} {{\n    sql: ${{TABLE}}.d{i} ;;\n  }}' for i in range(n // 250)
+    )
+    return f'view: v {{\n  label:{" " * (n // 10)}x\n{blocks}\n}}\n'
+
+
+def random_mutations(n: int) -> str:
+    """Seeded random soup of LookML tokens"""
+    rng = random.Random(n)
+    tokens = ['dimension: a {', 'measure: b {', '}', '{', 'sql:', ';;', '${TABLE}.', '"', 'case: {',
+              'timeframes: [', ']', 'allowed_value: {', 'label:', ' ' * 40, 'x', '\n', '#', 'parameter: p {']
+    return ''.join(rng.choice(tokens) for _ in range(n // 8))
+
+
+CASES: Dict[str, Callable[[int], str]] = {
+    'huge_single_line': huge_single_line,
+    'whitespace_terminator': whitespace_terminator,
+    'multiline_sql_whitespace': multiline_sql_whitespace,
+    'unterminated_sql': unterminated_sql,
+    'deep_case_nesting': deep_case_nesting,
+    'unbalanced_braces': unbalanced_braces,
+    'timeframes_inline': timeframes_inline,
+    'timeframes_multiline': timeframes_multiline,
+    'unterminated_lists': unterminated_lists,
+    'named_blocks': named_blocks,
+    'random_mutations': random_mutations,
+}
+# Well-formed cases, where a field outside every view means a block closed its view early
+WELL_FORMED = {'named_blocks'}
+
+
+def _measure(case: str, size: int, queue):
+    """Child process: convert one generated input and report (seconds, peak_bytes, input_bytes, loose_fields)"""
+    lookml_code = CASES[case](size)
+    converter = LookMLToOmniConverter()
+    start = time.perf_counter()
+    converter.convert_to_yaml(converter.parse_lookml(lookml_code))
+    elapsed = time.perf_counter() - start
+    loose = sum(len(view['fields']) for view in converter.scan_lookml(lookml_code) if view['name'] is None)
+    # Memory is traced on a second pass since tracemalloc distorts timings
+    tracemalloc.start()
+    converter.convert_to_yaml(converter.parse_lookml(lookml_code))
+    _, peak = tracemalloc.get_traced_memory()
+    queue.put((elapsed, peak, len(lookml_code), loose))
+
+
+def measure(case: str, size: int, timeout: float) -> Optional[Tuple[float, int, int, int]]:
+    """Run one measurement in a child process so a hang can be killed; None on timeout"""
+    ctx = multiprocessing.get_context()
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(case, size, queue))
+    proc.start()
+    proc.join(timeout)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+        return None
+    if proc.exitcode != 0:
+        raise RuntimeError(f"{case} crashed at size {size} with exit code {proc.exitcode}")
+    return queue.get()
+
+
+def growth_exponent(points: List[Tuple[int, float]]) -> float:
+    """Least-squares slope of log(time) against log(size)"""
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(max(seconds, 1e-6)) for _, seconds in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator if denominator else 0.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz the LookML parser with adversarial inputs")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument('--base-size', type=int, default=50_000, help="input size in characters at step 1")
+    parser.add_argument('--steps', type=int, default=4, help="number of doublings to measure")
+    parser.add_argument('--timeout', type=float, default=20.0, help="seconds before a conversion counts as hung")
+    parser.add_argument('--seconds-per-mb', type=float, default=2.0, help="time budget per MB of input")
+    parser.add_argument('--memory-factor', type=float, default=40.0,
+                        help="peak traced memory budget as a multiple of the input size")
+    parser.add_argument('--max-exponent', type=float, default=1.3, help="growth exponent counted as superlinear")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for case in args.cases:
+        points = []
+        problems = []
+        for step in range(args.steps):
+            size = args.base_size * 2 ** step
+            result = measure(case, size, args.timeout)
+            if result is None:
+                problems.append(f"hung at size {size} (>{args.timeout:.0f} s)")
+                break
+            seconds, peak, input_bytes, loose = result
+            if case in WELL_FORMED and loose:
+                problems.append(f"{loose} field(s) fell outside their view at size {size}")
+            points.append((input_bytes, seconds))
+            if seconds > args.seconds_per_mb * max(input_bytes / 1e6, 0.05):
+                problems.append(f"{seconds:.2f} s for {input_bytes / 1e6:.2f} MB exceeds the time budget")
+            if peak > args.memory_factor * max(input_bytes, 100_000):
+                problems.append(f"peak {peak / 1e6:.1f} MB for {input_bytes / 1e6:.2f} MB exceeds the memory budget")
+        exponent = growth_exponent(points) if len(points) > 1 else 0.0
+        if len(points) > 1 and exponent > args.max_exponent:
+            problems.append(f"superlinear growth, time ~ size^{exponent:.2f}")
+        largest = points[-1] if points else (0, 0.0)
+        status = 'FAIL' if problems else 'ok'
+        print(f"{status:<5}{case:<28} exponent {exponent:5.2f}   largest {largest[0] / 1e6:6.2f} MB "
+              f"in {largest[1]:7.3f} s")
+        for problem in problems:
+            print(f"       {problem}")
+        failures += bool(problems)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
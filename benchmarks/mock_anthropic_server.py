@@ -0,0 +1,245 @@
+"""Local stand-in for the Anthropic messages API used by the LLM fallback.
+
+Serves ``POST /v1/messages`` with the response shape the SDK expects, with
+configurable latency, injected 429/500 errors and either canned or
+rule-engine-derived YAML, so the fallback can be benchmarked offline and
+deterministically. Point the client at it with ``ANTHROPIC_BASE_URL``:
+
+    python benchmarks/mock_anthropic_server.py --port 8787 --latency-ms 400 --rate-429 0.05
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8787 ANTHROPIC_API_KEY=mock streamlit run lookml_converter.py
+
+``GET /stats`` returns request counts by status code; ``POST /stats/reset`` clears them.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_fallback import estimate_tokens  # noqa: E402
+from omni_converter import LookMLToOmniConverter  # noqa: E402
+
+DEFAULT_CANNED_RESPONSE = """dimensions:
+  id:
+    sql: '"ID"'
+    description: Id
+    format: ID
+
+measures:
+  count:
+    aggregate_type: count
+    description: Count"""
+
+PROMPT_START = 'LookML code:\n'
+PROMPT_END = '\n\nPlease provide only the converted YAML output'
+
+
+class MockConfig:
+    """Behaviour knobs for the stand-in server"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_429: float = 0.0,
+                 rate_500: float = 0.0, mode: str = 'rules', canned_response: str = DEFAULT_CANNED_RESPONSE,
+                 ms_per_output_token: float = 0.0, seed: Optional[int] = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.mode = mode
+        self.canned_response = canned_response
+        self.ms_per_output_token = ms_per_output_token
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.converter = LookMLToOmniConverter()
+        self.stats: Dict[str, int] = {}
+
+    def record(self, status: int):
+        with self.lock:
+            self.stats[str(status)] = self.stats.get(str(status), 0) + 1
+            self.stats['total'] = self.stats.get('total', 0) + 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def jitter(self) -> float:
+        with self.lock:
+            return self.random.uniform(-self.jitter_ms, self.jitter_ms)
+
+
+def extract_lookml(prompt: str) -> str:
+    """Pull the LookML the fallback embedded in its prompt"""
+    start = prompt.find(PROMPT_START)
+    if start < 0:
+        return prompt
+    start += len(PROMPT_START)
+    end = prompt.find(PROMPT_END, start)
+    return prompt[start:end if end >= 0 else len(prompt)]
+
+
+def _message_text(content: Any) -> str:
+    """Messages may carry a plain string or a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return ''.join(block.get('text', '') for block in content if isinstance(block, dict))
+
+
+def build_completion(config: MockConfig, request: Dict[str, Any]) -> Tuple[str, str, int]:
+    """Return (text, stop_reason, input_tokens) for a messages request"""
+    messages = request.get('messages', [])
+    prompt = _message_text(messages[0]['content']) if messages else ''
+    prefill = ''
+    if len(messages) > 1 and messages[-1].get('role') == 'assistant':
+        prefill = _message_text(messages[-1]['content'])
+
+    if config.mode == 'rules':
+        converter = config.converter
+        full_text = converter.convert_to_yaml(converter.parse_lookml(extract_lookml(prompt)))
+    else:
+        full_text = config.canned_response
+
+    # Continue after an assistant prefill the way the real API does
+    text = full_text[len(prefill):] if prefill and full_text.startswith(prefill) else full_text
+
+    max_chars = int(request.get('max_tokens', 1024) * 3.5)
+    stop_reason = 'end_turn'
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        stop_reason = 'max_tokens'
+    input_tokens = sum(estimate_tokens(_message_text(m['content'])) for m in messages)
+    return text, stop_reason, input_tokens
+
+
+class MockAnthropicHandler(BaseHTTPRequestHandler):
+    """HTTP handler implementing the subset of the API the converter uses"""
+
+    config: MockConfig = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.config.record(status)
+
+    def _send_error(self, status: int, error_type: str, message: str, headers: Dict[str, str] = None):
+        self._send_json(status, {'type': 'error', 'error': {'type': error_type, 'message': message}}, headers)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            body = json.dumps(self.config.stats).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_error(404, 'not_found_error', f"Unknown path {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        if self.path == '/stats/reset':
+            with self.config.lock:
+                self.config.stats.clear()
+            self._send_json(200, {})
+            return
+        if self.path.split('?')[0] != '/v1/messages':
+            self._send_error(404, 'not_found_error', f"Unknown path {self.path}")
+            return
+
+        config = self.config
+        delay_ms = max(0.0, config.latency_ms + config.jitter())
+        roll = config.roll()
+        if roll < config.rate_429:
+            time.sleep(delay_ms / 1000)
+            self._send_error(429, 'rate_limit_error', "Mock rate limit", {'retry-after': '0'})
+            return
+        if roll < config.rate_429 + config.rate_500:
+            time.sleep(delay_ms / 1000)
+            self._send_error(500, 'api_error', "Mock internal error")
+            return
+
+        try:
+            request = json.loads(raw)
+            text, stop_reason, input_tokens = build_completion(config, request)
+        except Exception as e:
+            self._send_error(400, 'invalid_request_error', str(e))
+            return
+        output_tokens = estimate_tokens(text)
+        time.sleep((delay_ms + output_tokens * config.ms_per_output_token) / 1000)
+        self._send_json(200, {
+            'id': f"msg_mock_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'mock'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': stop_reason,
+            'stop_sequence': None,
+            'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens},
+        })
+
+
+def start_server(config: MockConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread; port 0 picks a free port"""
+    handler = type('ConfiguredMockAnthropicHandler', (MockAnthropicHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic messages API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="base latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="uniform +/- jitter on the latency")
+    parser.add_argument('--ms-per-output-token', type=float, default=0.0, help="extra latency per generated token")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--rate-500', type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument('--mode', choices=['rules', 'canned'], default='rules',
+                        help="derive responses from the rule engine or return a fixed document")
+    parser.add_argument('--canned-file', help="YAML file to return in canned mode")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for latency and error injection")
+    args = parser.parse_args(argv)
+
+    canned = DEFAULT_CANNED_RESPONSE
+    if args.canned_file:
+        with open(args.canned_file, encoding='utf-8') as f:
+            canned = f.read()
+    config = MockConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429, rate_500=args.rate_500,
+        mode=args.mode, canned_response=canned, ms_per_output_token=args.ms_per_output_token, seed=args.seed
+    )
+    server = start_server(config, args.host, args.port)
+    print(f"Mock Anthropic API listening on {server_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
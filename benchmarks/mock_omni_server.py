@@ -0,0 +1,170 @@
+"""Local stand-in for the Omni model YAML API used by omni_push.py.
+
+Accepts ``POST /api/v1/models/<model id>/yaml`` with a JSON body holding
+``fileName`` and ``yaml``, keeps the latest upload per file in memory, and
+can add latency and inject 429 (with Retry-After) and 500 responses. It
+also counts the TCP connections clients open, to check connection reuse:
+
+    python benchmarks/mock_omni_server.py --port 8788 --latency-ms 50 --rate-429 0.05
+    OMNI_API_KEY=mock python omni_push.py omni_yaml/ --base-url http://127.0.0.1:8788 --model-id demo
+
+``GET /stats`` returns request counts by status code, the number of
+connections and the uploaded file names; ``POST /stats/reset`` clears them.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+UPLOAD_PATH_RE = re.compile(r'^/api/v1/models/([^/]+)/yaml$')
+
+
+class MockOmniConfig:
+    """Behaviour knobs and recorded state for the stand-in server"""
+
+    def __init__(self, latency_ms: float = 0.0, rate_429: float = 0.0, rate_500: float = 0.0,
+                 retry_after: float = 0.0, api_key: Optional[str] = None, seed: Optional[int] = 0):
+        self.latency_ms = latency_ms
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.api_key = api_key
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.connections = 0
+        self.files: Dict[str, Dict[str, str]] = {}
+
+    def record(self, status: int):
+        with self.lock:
+            self.stats[str(status)] = self.stats.get(str(status), 0) + 1
+            self.stats['total'] = self.stats.get('total', 0) + 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.connections = 0
+            self.files.clear()
+
+
+class MockOmniHandler(BaseHTTPRequestHandler):
+    """HTTP handler implementing the YAML upload endpoint"""
+
+    config: MockOmniConfig = None
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, delayed ACKs stall keep-alive clients
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # One handler instance serves every request on a keep-alive connection
+        with self.config.lock:
+            self.config.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.config.record(status)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            config = self.config
+            with config.lock:
+                payload = {**config.stats, 'connections': config.connections, 'files': sorted(config.files)}
+            self._send_json(200, payload)
+        else:
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        config = self.config
+        if self.path == '/stats/reset':
+            config.reset()
+            self._send_json(200, {})
+            return
+        match = UPLOAD_PATH_RE.match(self.path.split('?')[0])
+        if not match:
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        if config.api_key and self.headers.get('Authorization') != f"Bearer {config.api_key}":
+            self._send_json(401, {'error': "Invalid API key"})
+            return
+
+        time.sleep(config.latency_ms / 1000)
+        roll = config.roll()
+        if roll < config.rate_429:
+            self._send_json(429, {'error': "Mock rate limit"}, {'Retry-After': f"{config.retry_after:g}"})
+            return
+        if roll < config.rate_429 + config.rate_500:
+            self._send_json(500, {'error': "Mock internal error"})
+            return
+        try:
+            request = json.loads(raw)
+            file_name, yaml_text = request['fileName'], request['yaml']
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f"Invalid request: {e}"})
+            return
+        with config.lock:
+            config.files[file_name] = {'model_id': match.group(1), 'yaml': yaml_text}
+        self._send_json(200, {'success': True, 'fileName': file_name})
+
+
+def start_server(config: MockOmniConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread; port 0 picks a free port"""
+    handler = type('ConfiguredMockOmniHandler', (MockOmniHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Omni model YAML API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8788)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="latency per request")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="fraction of uploads answered with 429")
+    parser.add_argument('--rate-500', type=float, default=0.0, help="fraction of uploads answered with 500")
+    parser.add_argument('--retry-after', type=float, default=0.0, help="Retry-After seconds sent with a 429")
+    parser.add_argument('--api-key', help="reject requests without this bearer token")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for error injection")
+    args = parser.parse_args(argv)
+
+    config = MockOmniConfig(latency_ms=args.latency_ms, rate_429=args.rate_429, rate_500=args.rate_500,
+                            retry_after=args.retry_after, api_key=args.api_key, seed=args.seed)
+    server = start_server(config, args.host, args.port)
+    print(f"Mock Omni API listening on {server_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
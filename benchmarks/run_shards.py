@@ -0,0 +1,120 @@
+"""Run a sharded batch conversion locally, one process per shard, then merge it.
+
+Stands in for N nodes on one machine: each shard is a separate
+``batch_convert.py --shard i/N`` process writing to its own directory, and
+merge_shards.py combines them. With --verify the merged output is compared
+file by file with an unsharded run of the same input.
+
+    python benchmarks/run_shards.py path/to/lookml_project --shards 4 -o omni_yaml/ --verify
+    python benchmarks/run_shards.py --generate 2000 --shards 4 --verify
+"""
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate_project(directory: str, views: int) -> str:
+    """Write a synthetic project whose views extend a shared base in another file"""
+    os.makedirs(os.path.join(directory, 'views'), exist_ok=True)
+    with open(os.path.join(directory, 'views', 'base.view.lkml'), 'w') as f:
+        f.write('view: base {\n  extension: required\n'
+                + ''.join(f'  dimension: shared_{i} {{\n    type: string\n    sql: ${{TABLE}}.shared_{i} ;;\n  }}\n'
+                          for i in range(20))
+                + '  set: detail {\n    fields: [shared_0, shared_1]\n  }\n}\n')
+    for v in range(views):
+        with open(os.path.join(directory, 'views', f'v{v}.view.lkml'), 'w') as f:
+            f.write(f'view: v{v} {{\n  extends: [base]\n  sql_table_name: schema.v{v} ;;\n'
+                    + ''.join(f'  measure: total_{i} {{\n    type: sum\n    sql: ${{TABLE}}.amount_{i} ;;\n'
+                              f'    drill_fields: [detail*]\n  }}\n' for i in range(10))
+                    + '}\n')
+    with open(os.path.join(directory, 'model.model.lkml'), 'w') as f:
+        f.write(''.join(f'explore: v{v} {{\n  join: v{(v + 1) % views} {{\n'
+                        f'    sql_on: ${{v{v}.shared_0}} = ${{v{(v + 1) % views}.shared_0}} ;;\n'
+                        f'    relationship: many_to_one\n  }}\n}}\n' for v in range(views)))
+    return directory
+
+
+def run_shards(paths: List[str], shard_root: str, shards: int) -> Tuple[List[str], float]:
+    """Run every shard as its own process at once, returning the shard directories and wall time"""
+    started = time.perf_counter()
+    processes = []
+    shard_dirs = []
+    for index in range(1, shards + 1):
+        shard_dir = os.path.join(shard_root, f'shard_{index}')
+        shard_dirs.append(shard_dir)
+        command = [sys.executable, os.path.join(REPO_DIR, 'batch_convert.py'), *paths, '-o', shard_dir,
+                   '--shard', f'{index}/{shards}', '--no-progress']
+        processes.append(subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True))
+    for index, process in enumerate(processes, start=1):
+        output, _ = process.communicate()
+        print(f"shard {index}/{shards}: {output.strip().splitlines()[-1] if output.strip() else ''}")
+    return shard_dirs, time.perf_counter() - started
+
+
+def compare_dirs(expected: str, actual: str) -> List[str]:
+    """Files that are missing, extra or different in actual, manifests aside"""
+    differences = []
+    for root, _, files in os.walk(expected):
+        for name in files:
+            if name.startswith('.omni_'):
+                continue
+            relative = os.path.relpath(os.path.join(root, name), expected)
+            other = os.path.join(actual, relative)
+            if not os.path.exists(other):
+                differences.append(f"missing {relative}")
+            elif not filecmp.cmp(os.path.join(root, name), other, shallow=False):
+                differences.append(f"differs {relative}")
+    for root, _, files in os.walk(actual):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), actual)
+            if not name.startswith('.omni_') and not os.path.exists(os.path.join(expected, relative)):
+                differences.append(f"extra {relative}")
+    return differences
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a sharded batch conversion locally and merge it")
+    parser.add_argument('paths', nargs='*', help=".lkml files or directories to convert")
+    parser.add_argument('--generate', type=int, metavar='VIEWS',
+                        help="convert a synthetic project with this many views instead of paths")
+    parser.add_argument('--shards', type=int, default=4, help="number of shard processes (default: %(default)s)")
+    parser.add_argument('-o', '--output-dir', help="merged output directory (default: a temporary one)")
+    parser.add_argument('--verify', action='store_true',
+                        help="also run unsharded and check the merged output is identical")
+    args = parser.parse_args(argv)
+    if not args.paths and not args.generate:
+        parser.error("give paths to convert or --generate")
+
+    with tempfile.TemporaryDirectory(prefix='lookml_shards_') as work:
+        paths = args.paths or [generate_project(os.path.join(work, 'project'), args.generate)]
+        shard_dirs, sharded_seconds = run_shards(paths, os.path.join(work, 'shards'), args.shards)
+        output_dir = args.output_dir or os.path.join(work, 'merged')
+        merge = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'merge_shards.py'), *shard_dirs,
+                                '-o', output_dir, '--timings'])
+        print(f"{args.shards} shards: {sharded_seconds:.2f}s wall")
+        if merge.returncode:
+            return merge.returncode
+        if not args.verify:
+            return 0
+        single_dir = os.path.join(work, 'single')
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, 'batch_convert.py'), *paths, '-o', single_dir,
+                        '--no-progress'], stdout=subprocess.DEVNULL)
+        print(f"unsharded: {time.perf_counter() - started:.2f}s wall")
+        differences = compare_dirs(single_dir, output_dir)
+        for difference in differences[:20]:
+            print(difference)
+        print("merged output matches the unsharded run" if not differences
+              else f"{len(differences)} difference(s) from the unsharded run")
+        return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
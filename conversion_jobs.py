@@ -0,0 +1,203 @@
+"""Bounded background execution for conversions started from the app.
+
+Conversions run on one thread pool shared by every session: the session's
+script thread only submits a job and polls its handle, so reruns (a
+download click, a widget change) no longer interrupt a conversion, and one
+user's large input or slow LLM call cannot hold up anyone else's page. At
+most max_workers jobs run at once and at most max_queued wait for a worker;
+further submissions are refused with ExecutorBusy, so a burst of users
+queues instead of oversubscribing the CPU.
+
+A job carries its progress, a partial result for display and a cancel flag
+that conversions poll through should_stop. Threads rather than processes
+are used because progress, cancellation and the app's conversion caches
+all need shared memory, and most of a slow conversion's time is spent
+waiting on the LLM.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import CACHE_LOOKUPS, CONVERSION_SECONDS, CONVERSIONS, JOB_WAIT_SECONDS, size_class
+from omni_converter import ConversionCancelled, LookMLToOmniConverter
+
+# Sizes of the app's shared rule and LLM result caches
+RULE_CACHE_ENTRIES = 256
+LLM_CACHE_ENTRIES = 64
+
+
+class ResultCache:
+    """Thread-safe LRU of conversion results, shared by every session and worker"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Any, Any]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """(found, value) for key, marking it most recently used"""
+        with self.lock:
+            if key not in self.entries:
+                return False, None
+            self.entries.move_to_end(key)
+            return True, self.entries[key]
+
+    def put(self, key: Any, value: Any):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ExecutorBusy(Exception):
+    """The job queue is full; the caller should try again later"""
+
+
+class ConversionJob:
+    """Handle for one submitted conversion, kept in the submitting session's state"""
+
+    def __init__(self, job_id: int, key: str):
+        self.id = job_id
+        self.key = key
+        # queued, running, done, cancelled or failed
+        self.state = 'queued'
+        self.status = ''
+        self.done = 0
+        self.total = 0
+        # Whatever the conversion has finished so far, for display or after a cancel
+        self.partial: Any = None
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+
+    def should_stop(self) -> bool:
+        """Whether the job was cancelled; passed to conversions as should_stop"""
+        return self.cancelled.is_set()
+
+    def report(self, done: int, total: int, status: str = None):
+        """Record progress from the worker thread"""
+        self.done = done
+        self.total = total
+        if status is not None:
+            self.status = status
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the job finishes or timeout seconds pass, returning whether it finished"""
+        return self.finished.wait(timeout)
+
+
+def cached_rule_conversion(cache_key: str, lookml_code: str, converter: LookMLToOmniConverter, cache: ResultCache,
+                           on_progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+                           should_stop: Optional[Callable[[], bool]] = None) -> str:
+    """Rule-based conversion memoized by the hash of its input and settings
+
+    Kept in a shared LRU rather than st.cache_data so a conversion can report
+    its progress while it runs, and so workers can use it without a script
+    context.
+    """
+    found, omni_yaml = cache.get(cache_key)
+    CACHE_LOOKUPS.inc(cache='rules', result='hit' if found else 'miss')
+    if found:
+        return omni_yaml
+    with CONVERSION_SECONDS.time(engine='rules', size=size_class(len(lookml_code))):
+        omni_yaml = converter.convert_to_yaml(converter.parse_lookml(lookml_code, on_progress, should_stop))
+    cache.put(cache_key, omni_yaml)
+    return omni_yaml
+
+
+def run_llm_conversion(lookml_code: str, cache_key: str, error_msg: str, converter: LookMLToOmniConverter,
+                       client: Any, cache: ResultCache, job: ConversionJob, messages: list) -> Optional[str]:
+    """Run the AI fallback memoized like the rule-based one, recording failures as page messages"""
+    try:
+        found, omni_yaml = cache.get((cache_key, error_msg))
+        CACHE_LOOKUPS.inc(cache='llm', result='hit' if found else 'miss')
+        if not found:
+            omni_yaml = converter.get_llm_conversion(lookml_code, error_msg, client=client, should_stop=job.should_stop)
+            cache.put((cache_key, error_msg), omni_yaml)
+    except ConversionCancelled:
+        raise
+    except Exception as e:
+        CONVERSIONS.inc(engine='llm', outcome='error')
+        messages.append(('error', f"LLM conversion failed: {str(e)}"))
+        return None
+    CONVERSIONS.inc(engine='llm', outcome='success' if omni_yaml else 'incomplete')
+    return omni_yaml
+
+
+class ConversionExecutor:
+    """Thread pool with a bounded queue, queue positions and cancellable jobs"""
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 64):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='conversion')
+        # Jobs waiting for a worker, oldest first
+        self.queued: 'OrderedDict[int, ConversionJob]' = OrderedDict()
+        self.running = 0
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def submit(self, key: str, fn: Callable[[ConversionJob], Any]) -> ConversionJob:
+        """Queue fn(job) and return the job, raising ExecutorBusy when the queue is full"""
+        with self.lock:
+            if len(self.queued) >= self.max_queued:
+                raise ExecutorBusy(f"{len(self.queued)} conversions are already waiting")
+            job = ConversionJob(next(self.ids), key)
+            self.queued[job.id] = job
+        self.pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: ConversionJob, fn: Callable[[ConversionJob], Any]):
+        with self.lock:
+            if self.queued.pop(job.id, None) is None:
+                # Cancelled while it was waiting
+                return
+            self.running += 1
+        job.started = time.monotonic()
+        JOB_WAIT_SECONDS.observe(job.started - job.submitted)
+        job.state = 'running'
+        try:
+            job.result = fn(job)
+            job.state = 'done'
+        except ConversionCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.error = e
+            job.state = 'failed'
+        finally:
+            with self.lock:
+                self.running -= 1
+            job.finished.set()
+
+    def cancel(self, job: ConversionJob):
+        """Drop a waiting job, or ask a running one to stop at its next should_stop check"""
+        job.cancelled.set()
+        with self.lock:
+            if self.queued.pop(job.id, None) is None:
+                return
+        job.state = 'cancelled'
+        job.finished.set()
+
+    def position(self, job: ConversionJob) -> int:
+        """Place of a waiting job in the queue, starting at 1, or 0 once it has started"""
+        with self.lock:
+            for position, job_id in enumerate(self.queued, start=1):
+                if job_id == job.id:
+                    return position
+        return 0
+
+    def stats(self) -> Dict[str, int]:
+        """Jobs running and waiting right now"""
+        with self.lock:
+            return {'running': self.running, 'queued': len(self.queued)}
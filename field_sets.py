@@ -0,0 +1,93 @@
+"""Expansion of LookML set references in drill_fields.
+
+``drill_fields: [detail*, orders.detail*, users.id]`` refers to
+``set: detail { fields: [...] }`` blocks, whose fields may reference other
+sets in turn, possibly in other views, and may exclude fields with ``-``.
+Each (view, set) is expanded once and memoized, so a set shared by
+thousands of measures costs one expansion; a set that references itself,
+directly or through others, raises ValueError like circular extends.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+SetKey = Tuple[Optional[str], str]
+
+
+class FieldSets:
+    """Set definitions of every view, expanded on demand and memoized
+
+    sets_of(view) returns a view's sets as {set name: [field references]};
+    it may resolve extends and refinements lazily. The None view holds sets
+    defined outside any view block.
+    """
+
+    def __init__(self, sets_of: Callable[[Optional[str]], Dict[str, List[str]]]):
+        self.sets_of = sets_of
+        self._expanded: Dict[SetKey, Tuple[str, ...]] = {}
+        self._expanding: List[SetKey] = []
+        # (view, drill_fields) -> expansion; measures usually repeat the same few lists
+        self._references: Dict[Tuple[Optional[str], Tuple[str, ...]], Tuple[str, ...]] = {}
+
+    def expand(self, view: Optional[str], name: str) -> Tuple[str, ...]:
+        """Fields of a set, relative to its view; unknown sets are empty"""
+        key = (view, name)
+        if key in self._expanded:
+            return self._expanded[key]
+        if key in self._expanding:
+            chain = self._expanding[self._expanding.index(key):] + [key]
+            raise ValueError("Circular set reference: " + ' -> '.join(
+                f"{v}.{n}" if v else n for v, n in chain))
+        try:
+            definition = self.sets_of(view).get(name)
+        except ValueError:
+            # The view itself does not resolve
+            definition = None
+        if definition is None:
+            self._expanded[key] = ()
+            return ()
+        self._expanding.append(key)
+        try:
+            fields = tuple(self._expand_references(view, definition))
+        finally:
+            self._expanding.pop()
+        self._expanded[key] = fields
+        return fields
+
+    def expand_references(self, view: Optional[str], references: List[str]) -> List[str]:
+        """Field references with set references (name*, view.name*) expanded, in order and deduplicated
+
+        Fields of another view's set come back qualified with that view;
+        ``-field`` removes a field from the result.
+        """
+        key = (view, tuple(references))
+        expanded = self._references.get(key)
+        if expanded is None:
+            expanded = self._references[key] = tuple(self._expand_references(view, references))
+        return list(expanded)
+
+    def _expand_references(self, view: Optional[str], references: List[str]) -> List[str]:
+        fields: List[str] = []
+        excluded = set()
+        for reference in references:
+            reference = reference.strip()
+            if not reference:
+                continue
+            if reference.startswith('-'):
+                excluded.add(reference[1:].strip())
+                continue
+            if not reference.endswith('*'):
+                fields.append(reference)
+                continue
+            set_view, _, set_name = reference[:-1].rpartition('.')
+            if not set_view or set_view == view:
+                fields.extend(self.expand(view, set_name))
+            else:
+                fields.extend(field if '.' in field else f"{set_view}.{field}"
+                              for field in self.expand(set_view, set_name))
+        seen = set()
+        expanded = []
+        for field in fields:
+            if field in excluded or field in seen:
+                continue
+            seen.add(field)
+            expanded.append(field)
+        return expanded
@@ -0,0 +1,286 @@
+"""Explore and join conversion backed by an indexed join graph.
+
+``explore:`` blocks and their ``join:`` entries are scanned into a graph with
+adjacency indexes by source view, target view and explore. Once built,
+reachability and cycle detection are O(views + edges) and "which explores
+use this view" is a dictionary lookup, so nothing re-scans model files per
+query. The graph converts to Omni ``relationships.yaml`` and one topic file
+per explore.
+"""
+import re
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Set
+
+from omni_converter import BLOCK_START_RE, LookMLToOmniConverter, SQL_START_RE, SqlSpan, sql_block_lines, strip_terminator
+
+EXPLORE_RE = re.compile(r'^explore:\s*(\+?)\s*(\w+)\s*{')
+JOIN_RE = re.compile(r'^join:\s*(\w+)\s*{')
+FIELD_REF_RE = re.compile(r'\$\{(\w+)\.\w+\}')
+
+JOIN_TYPE_MAPPINGS = {
+    'left_outer': 'always_left',
+    'inner': 'inner',
+    'full_outer': 'full_outer',
+    'cross': 'cross',
+}
+
+
+def scan_explores(converter: LookMLToOmniConverter, lookml_code: str) -> List[Dict[str, Any]]:
+    """Scan explore blocks into dicts with name, refinement, props and joins (alias -> props)"""
+    explores = []
+    explore = None
+    join = None
+    block_depth = 0
+    in_sql = False
+    sql_start = 0
+    sql_key = None
+    sql_target = None
+
+    offset = 0
+    for line in lookml_code.split('\n'):
+        line_start = offset
+        offset += len(line) + 1
+        trimmed = line.strip()
+        if not trimmed or trimmed.startswith('#'):
+            continue
+
+        if in_sql:
+            # Multi-line sql_on / sql_where, ended by ;; or the block's closing brace
+            if trimmed == '}':
+                sql_target[sql_key] = SqlSpan(lookml_code, sql_start, line_start)
+                in_sql = False
+            else:
+                if trimmed.endswith(';;'):
+                    sql_end = line_start + len(line.rstrip()) - 2
+                    sql_target[sql_key] = SqlSpan(lookml_code, sql_start, sql_end)
+                    in_sql = False
+                continue
+
+        explore_match = EXPLORE_RE.match(trimmed)
+        if explore_match:
+            explore = {
+                'name': explore_match.group(2),
+                'refinement': bool(explore_match.group(1)),
+                'props': {},
+                'joins': {},
+            }
+            explores.append(explore)
+            join = None
+            block_depth = 0
+            continue
+        if explore is None:
+            continue
+
+        if trimmed == '}':
+            if block_depth:
+                block_depth -= 1
+            elif join is not None:
+                join = None
+            else:
+                explore = None
+            continue
+        if block_depth:
+            # Net braces, so one-line { ... } blocks and ${...} references leave the depth alone
+            block_depth = max(block_depth + trimmed.count('{') - trimmed.count('}'), 0)
+            continue
+
+        join_match = JOIN_RE.match(trimmed)
+        if join_match and join is None:
+            join = explore['joins'].setdefault(join_match.group(1), {})
+            continue
+        if BLOCK_START_RE.match(trimmed):
+            # always_filter: { ... }, aggregate_table: name { ... } and similar are not converted
+            block_depth = 1
+            continue
+
+        target = join if join is not None else explore['props']
+        sql_match = SQL_START_RE.match(trimmed)
+        if sql_match:
+            sql_key, sql_value = sql_match.group(1), sql_match.group(2)
+            if sql_value.endswith(';;'):
+                target[sql_key] = strip_terminator(sql_value)
+            else:
+                in_sql = True
+                sql_target = target
+                sql_start = line_start + len(line) - len(line.lstrip()) + sql_match.start(2)
+            continue
+        prop = converter._parse_property(trimmed)
+        if prop:
+            target[prop[0]] = prop[1]
+
+    if in_sql:
+        sql_target[sql_key] = SqlSpan(lookml_code, sql_start, len(lookml_code))
+    return explores
+
+
+class JoinGraph:
+    """Join graph over views with adjacency indexes by source view, target view and explore"""
+
+    def __init__(self):
+        self.explores: Dict[str, Dict[str, Any]] = {}
+        self.edges: List[Dict[str, Any]] = []
+        self.out_edges: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.in_edges: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.edges_by_explore: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # view -> explores built on it; joins into a view are found through in_edges
+        self.explores_by_base_view: Dict[str, Set[str]] = defaultdict(set)
+
+    def is_defined(self, name: str) -> bool:
+        """Whether a base (not refining) definition of an explore has been added"""
+        return self.explores.get(name, {}).get('defined', False)
+
+    def add_explore(self, explore: Dict[str, Any]):
+        """Index an explore and its joins; refinements add joins to an existing explore"""
+        name = explore['name']
+        existing = self.explores.get(name)
+        if existing is None:
+            existing = {'name': name, 'props': {}, 'aliases': {}, 'defined': False}
+            self.explores[name] = existing
+        if not explore['refinement']:
+            existing['defined'] = True
+        existing['props'].update(explore['props'])
+        props = existing['props']
+        if 'base_view' in existing:
+            # A refinement can change the base view
+            self.explores_by_base_view[existing['base_view']].discard(name)
+        existing['base_view'] = props.get('from') or props.get('view_name') or name
+        existing['aliases'][name] = existing['base_view']
+        self.explores_by_base_view[existing['base_view']].add(name)
+
+        for alias, join_props in explore['joins'].items():
+            to_view = join_props.get('from') or join_props.get('view_name') or alias
+            from_alias = self._join_source(existing, alias, join_props.get('sql_on', ''))
+            edge = {
+                'explore': name,
+                'from_alias': from_alias,
+                'from_view': existing['aliases'][from_alias],
+                'alias': alias,
+                'to_view': to_view,
+                'props': join_props,
+            }
+            existing['aliases'][alias] = to_view
+            self.edges.append(edge)
+            self.out_edges[edge['from_view']].append(edge)
+            self.in_edges[to_view].append(edge)
+            self.edges_by_explore[name].append(edge)
+
+    def _join_source(self, explore: Dict[str, Any], alias: str, sql_on: str) -> str:
+        """The alias a join hangs off: the first other alias its sql_on references, else the base view"""
+        for referenced in FIELD_REF_RE.findall(str(sql_on or '')):
+            if referenced != alias and referenced in explore['aliases']:
+                return referenced
+        return explore['name']
+
+    def explores_using(self, view: str) -> Set[str]:
+        """Explores that use a view as base view or join"""
+        explores = set(self.explores_by_base_view.get(view, ()))
+        explores.update(edge['explore'] for edge in self.in_edges.get(view, []))
+        return explores
+
+    def reachable(self, view: str) -> Set[str]:
+        """Views reachable from a view by following joins, in O(views + edges)"""
+        seen = {view}
+        queue = deque([view])
+        while queue:
+            for edge in self.out_edges.get(queue.popleft(), []):
+                if edge['to_view'] not in seen:
+                    seen.add(edge['to_view'])
+                    queue.append(edge['to_view'])
+        seen.discard(view)
+        return seen
+
+    def find_cycles(self) -> List[List[str]]:
+        """Join cycles between views, found with one iterative depth-first pass
+
+        An aliased self-join (join: manager { from: users } on users) joins a
+        second copy of the view, not the view back into itself, so it is not
+        a cycle.
+        """
+        white, grey, black = 0, 1, 2
+        color: Dict[str, int] = defaultdict(int)
+        cycles = []
+        for start in list(self.out_edges):
+            if color[start] != white:
+                continue
+            color[start] = grey
+            path = [start]
+            stack = [iter(self.out_edges.get(start, []))]
+            while stack:
+                edge = next(stack[-1], None)
+                if edge is None:
+                    color[path.pop()] = black
+                    stack.pop()
+                    continue
+                target = edge['to_view']
+                if target == edge['from_view'] and edge['alias'] != target:
+                    continue
+                if color[target] == grey:
+                    cycles.append(path[path.index(target):] + [target])
+                elif color[target] == white:
+                    color[target] = grey
+                    path.append(target)
+                    stack.append(iter(self.out_edges.get(target, [])))
+        return cycles
+
+    def relationships(self) -> List[Dict[str, Any]]:
+        """Omni relationships, one per distinct join across all explores"""
+        relationships = []
+        seen = set()
+        for edge in self.edges:
+            props = edge['props']
+            relationship = {
+                'join_from_view': edge['from_view'],
+                'join_to_view': edge['to_view'],
+            }
+            if edge['alias'] != edge['to_view']:
+                relationship['join_to_view_as'] = edge['alias']
+            relationship['join_type'] = JOIN_TYPE_MAPPINGS.get(props.get('type', 'left_outer'), props.get('type'))
+            if 'sql_on' in props:
+                relationship['on_sql'] = '\n'.join(sql_block_lines(props['sql_on']))
+            if 'relationship' in props:
+                relationship['relationship_type'] = props['relationship']
+            key = tuple(sorted((k, str(v)) for k, v in relationship.items()))
+            if key not in seen:
+                seen.add(key)
+                relationships.append(relationship)
+        return relationships
+
+    def topic(self, name: str) -> Dict[str, Any]:
+        """Omni topic for an explore, with joins nested under the alias they join from"""
+        explore = self.explores[name]
+        topic = {'base_view': explore['base_view']}
+        for key in ('label', 'description', 'group_label'):
+            if key in explore['props']:
+                topic[key] = explore['props'][key]
+        if explore['props'].get('hidden') in ['yes', True]:
+            topic['hidden'] = True
+
+        children: Dict[str, List[str]] = defaultdict(list)
+        for edge in self.edges_by_explore.get(name, []):
+            children[edge['from_alias']].append(edge['alias'])
+
+        def nest(alias: str, path: Set[str]) -> Dict[str, Any]:
+            return {child: nest(child, path | {child}) for child in children.get(alias, []) if child not in path}
+
+        joins = nest(name, {name})
+        if joins:
+            topic['joins'] = joins
+        return topic
+
+
+def dump_yaml(data: Any) -> str:
+    """Serialize relationships and topics; PyYAML is imported only when they are written"""
+    import yaml
+
+    class Dumper(yaml.SafeDumper):
+        pass
+
+    def represent_str(dumper, value):
+        # Multi-line SQL keeps its line breaks, as in view files
+        style = '|' if '\n' in value else None
+        return dumper.represent_scalar('tag:yaml.org,2002:str', value, style=style)
+
+    Dumper.add_representer(str, represent_str)
+    return yaml.dump(data, Dumper=Dumper, sort_keys=False, default_flow_style=False,
+                     allow_unicode=True).rstrip('\n')
+
@@ -0,0 +1,224 @@
+"""Translate Looker Liquid in field values to Omni's templated filter syntax.
+
+Supported, everything else is left exactly as written:
+
+- ``{% parameter x %}`` and ``{{ x._parameter_value }}`` (optionally
+  ``view.x``) become ``{{filters.<view>.x.value}}``
+- ``{{ _user_attributes['a'] }}`` becomes ``{{omni_attributes.a}}``
+- in field SQL, ``{% if %}`` / ``{% elsif %}`` / ``{% else %}`` /
+  ``{% endif %}`` over comparisons of those references become
+  ``CASE WHEN ... THEN ... ELSE ... END``, with the references compared as
+  SQL strings and an empty branch as NULL; a block with a condition that
+  cannot be translated (``contains``, ``_is_filtered``, ...) is kept whole
+
+Templates repeat across many fields, so each distinct string is compiled
+once into a node tree and each (template, view, mode) is rendered once; both
+steps are memoized with lru_cache and keyed by the template text.
+"""
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
+
+# Quick check for values that contain any Liquid at all
+LIQUID_RE = re.compile(r'\{[{%]')
+TOKEN_RE = re.compile(r'\{%-?\s*(\w+)\s*(.*?)\s*-?%\}|\{\{-?\s*(.*?)\s*-?\}\}', re.DOTALL)
+PARAMETER_VALUE_RE = re.compile(r'^(?:(\w+)\.)?(\w+)\._parameter_value$')
+PARAMETER_TAG_RE = re.compile(r'^(?:(\w+)\.)?(\w+)$')
+USER_ATTRIBUTE_RE = re.compile(r'''^_user_attributes\[\s*(?P<q>['"])(\w+)(?P=q)\s*\]$''')
+CONDITION_TOKEN_RE = re.compile(r'''\s*(?:
+    (?P<string>"[^"]*"|'[^']*')
+  | (?P<op>==|!=|<>|>=|<=|>|<)
+  | (?P<attr>_user_attributes\[\s*(?P<q>['"])\w+(?P=q)\s*\])
+  | (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<word>[A-Za-z_][\w.]*)
+)''', re.VERBOSE)
+SQL_OPERATORS = {'==': '=', '!=': '<>', '<>': '<>', '>=': '>=', '<=': '<=', '>': '>', '<': '<'}
+
+# Compiled nodes: ('text', raw), ('output', raw, expression), ('parameter', raw, argument)
+# and ('if', raw, [(condition, body nodes)...], else body nodes or None)
+Node = Tuple
+
+
+class _Unbalanced(Exception):
+    """An if block without its endif; the template is then left as written"""
+
+
+def _compile(tokens: List[Tuple[str, 're.Match']], position: int, inside_if: bool) -> Tuple[List[Node], int]:
+    """Nodes from tokens[position:] up to the elsif/else/endif closing the enclosing block"""
+    nodes: List[Node] = []
+    while position < len(tokens):
+        kind, value = tokens[position]
+        if kind == 'text':
+            nodes.append(('text', value))
+            position += 1
+            continue
+        match = value
+        tag, argument, expression = match.group(1), match.group(2), match.group(3)
+        if tag in ('elsif', 'else', 'endif'):
+            if not inside_if:
+                raise _Unbalanced(tag)
+            return nodes, position
+        if tag == 'if':
+            start = position
+            branches = []
+            else_body = None
+            condition = argument
+            position += 1
+            while True:
+                body, position = _compile(tokens, position, True)
+                if position >= len(tokens):
+                    raise _Unbalanced('if')
+                closing = tokens[position][1]
+                if else_body is None and condition is not None:
+                    branches.append((condition, body))
+                else:
+                    else_body = body
+                position += 1
+                if closing.group(1) == 'endif':
+                    break
+                if closing.group(1) == 'else':
+                    condition = None
+                    else_body = []
+                else:
+                    condition = closing.group(2)
+            raw = ''.join(token[1].group(0) if token[0] == 'tag' else token[1] for token in tokens[start:position])
+            nodes.append(('if', raw, branches, else_body))
+            continue
+        if tag == 'parameter':
+            nodes.append(('parameter', match.group(0), argument))
+        elif tag is None:
+            nodes.append(('output', match.group(0), expression))
+        else:
+            # Tags this translator does not know stay as written
+            nodes.append(('text', match.group(0)))
+        position += 1
+    return nodes, position
+
+
+@lru_cache(maxsize=4096)
+def compile_template(text: str) -> Optional[Tuple[Node, ...]]:
+    """Node tree for a template, or None if its if blocks do not balance"""
+    tokens = []
+    last = 0
+    for match in TOKEN_RE.finditer(text):
+        if match.start() > last:
+            tokens.append(('text', text[last:match.start()]))
+        tokens.append(('tag', match))
+        last = match.end()
+    if last < len(text):
+        tokens.append(('text', text[last:]))
+    try:
+        nodes, _ = _compile(tokens, 0, False)
+    except _Unbalanced:
+        return None
+    return tuple(nodes)
+
+
+def filter_reference(view: Optional[str], field: str) -> str:
+    """Omni templated filter value for a parameter; unqualified when the view is unknown"""
+    path = f"{view}.{field}" if view else field
+    return f"{{{{filters.{path}.value}}}}"
+
+
+def _translate_reference(expression: str, view: Optional[str]) -> Optional[str]:
+    """Omni form of a parameter value or user attribute reference, or None"""
+    match = PARAMETER_VALUE_RE.match(expression)
+    if match:
+        return filter_reference(match.group(1) or view, match.group(2))
+    match = USER_ATTRIBUTE_RE.match(expression)
+    if match:
+        return f"{{{{omni_attributes.{match.group(2)}}}}}"
+    return None
+
+
+def _sql_literal(token: str) -> str:
+    """SQL literal for a Liquid string; "'yes'", the usual way to compare quoted parameter values, stays 'yes'"""
+    content = token[1:-1]
+    if len(content) >= 2 and content[0] == content[-1] == "'":
+        return content
+    return "'" + content.replace("'", "''") + "'"
+
+
+def _condition_reference(expression: str, view: Optional[str]) -> Optional[str]:
+    """A reference inside a condition; filter values and attributes both render as bare text, so compare them as SQL strings"""
+    reference = _translate_reference(expression, view)
+    return None if reference is None else "'" + reference + "'"
+
+
+def _translate_condition(condition: str, view: Optional[str]) -> Optional[str]:
+    """SQL for a Liquid condition built from comparisons, and/or; None if it uses anything else"""
+    parts = []
+    position = 0
+    comparisons = 0
+    condition = condition.strip()
+    while position < len(condition):
+        match = CONDITION_TOKEN_RE.match(condition, position)
+        if match is None or match.end() == position:
+            return None
+        position = match.end()
+        if match.group('string'):
+            parts.append(_sql_literal(match.group('string')))
+        elif match.group('op'):
+            parts.append(SQL_OPERATORS[match.group('op')])
+            comparisons += 1
+        elif match.group('attr'):
+            parts.append(_condition_reference(match.group('attr').replace(' ', ''), view))
+        elif match.group('number'):
+            parts.append(match.group('number'))
+        else:
+            word = match.group('word')
+            if word in ('and', 'or'):
+                parts.append(word.upper())
+            elif word in ('true', 'false'):
+                parts.append(word.upper())
+            else:
+                reference = _condition_reference(word, view)
+                if reference is None:
+                    # contains, _is_filtered, _in_query, blank, ... have no SQL equivalent here
+                    return None
+                parts.append(reference)
+    if not comparisons:
+        return None
+    return ' '.join(parts)
+
+
+def _render(nodes: Union[List[Node], Tuple[Node, ...]], view: Optional[str], conditionals: bool) -> str:
+    output = []
+    for node in nodes:
+        kind = node[0]
+        if kind == 'text':
+            output.append(node[1])
+        elif kind == 'output':
+            output.append(_translate_reference(node[2], view) or node[1])
+        elif kind == 'parameter':
+            match = PARAMETER_TAG_RE.match(node[2])
+            output.append(filter_reference(match.group(1) or view, match.group(2)) if match else node[1])
+        else:
+            _, raw, branches, else_body = node
+            conditions = [_translate_condition(condition, view) for condition, _ in branches] if conditionals else [None]
+            if any(condition is None for condition in conditions):
+                output.append(raw)
+                continue
+            case = ['CASE']
+            for condition, (_, body) in zip(conditions, branches):
+                # An empty branch yields nothing in Liquid, which is NULL in SQL
+                result = _render(body, view, conditionals).strip() or 'NULL'
+                case.append(f" WHEN {condition} THEN {result}")
+            if else_body is not None:
+                result = _render(else_body, view, conditionals).strip()
+                if result:
+                    case.append(f" ELSE {result}")
+            case.append(' END')
+            output.append(''.join(case))
+    return ''.join(output)
+
+
+@lru_cache(maxsize=16384)
+def translate_liquid(text: str, view: Optional[str] = None, conditionals: bool = False) -> str:
+    """Omni form of a value containing Liquid; conditionals turns if blocks into CASE expressions"""
+    if not LIQUID_RE.search(text):
+        return text
+    nodes = compile_template(text)
+    if nodes is None:
+        return text
+    return _render(nodes, view, conditionals)
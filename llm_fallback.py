@@ -0,0 +1,262 @@
+"""Token-aware LLM conversion for inputs too large for a single prompt.
+
+The input is split at LookML object boundaries into prompt-sized batches,
+the batches are converted concurrently, truncated responses are continued,
+and the partial YAML documents are merged into one with deduplicated
+top-level sections.
+"""
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+from omni_converter import ConversionCancelled
+
+MODEL = "claude-3-opus-20240229"
+# Rough average for English text and code; only used to size batches
+CHARS_PER_TOKEN = 3.5
+MAX_INPUT_TOKENS = 1500
+MAX_OUTPUT_TOKENS = 4096
+MAX_CONTINUATIONS = 4
+MAX_WORKERS = 4
+
+SECTION_ORDER = ['dimensions', 'measures', 'filters']
+
+OBJECT_START_RE = re.compile(r'^\s*(\w+):\s*\+?[\w.]*\s*\{')
+SECTION_HEADER_RE = re.compile(r'^(\w+):\s*$')
+ENTRY_HEADER_RE = re.compile(r'^  (\S[^:]*):')
+CODE_FENCE_RE = re.compile(r'^```\w*\s*$')
+
+PROMPT_TEMPLATE = """You are an expert in converting LookML code to Omni YAML syntax.
+
+Convert the following LookML code to Omni YAML format following these rules:
+- Extract ${{TABLE}}."FIELD" to just "FIELD" (with quotes) in format: sql: '"FIELD"'
+- Keep complex SQL statements (CASE, etc) as-is, just remove ;;
+- hidden: yes → hidden: true
+- hidden: no → don't include hidden field (do NOT add any tags)
+- Only add tags if they are explicitly defined in the LookML
+- type: yesno → don't include type in output
+- type: sum_distinct → aggregate_type: sum_distinct_on
+- sql_distinct_key → custom_primary_key_sql (keep field references as-is, no table prefixes)
+- value_format_name → format (with mappings like decimal_0 → NUMBER, usd → CURRENCY)
+- measure types (count, sum, etc) → aggregate_type
+- dimension_groups should be under dimensions in the output
+- dimension_groups only keep: sql, label, group_label, description
+- Always include description field (use label as description if not provided)
+- Fields ending with _id or _sk should have format: ID
+- Clean up group_label (remove leading spaces)
+- Don't include drill_fields that contain wildcards (*)
+- Convert aliases, tags, links, required_access_grants to arrays if needed
+- Convert parameters to filters with type: string and suggestion_list
+- Map allowed_value blocks to suggestion_list items
+- Convert default_value to default_filter: {{ is: value }}
+- For measures, use format: big_2 for counts/numbers when appropriate
+- Preserve timeframes arrays with proper formatting
+- Map LookML parameters to Omni equivalents (see documentation)
+
+{error_note}
+
+LookML code:
+{lookml_code}
+
+Please provide only the converted YAML output without any explanations."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used to size prompt batches"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def build_prompt(lookml_code: str, error_msg: str = None) -> str:
+    """Fill the conversion prompt for one batch of LookML"""
+    error_note = "Previous conversion attempt failed with: " + error_msg if error_msg else ""
+    return PROMPT_TEMPLATE.format(error_note=error_note, lookml_code=lookml_code)
+
+
+def split_lookml_objects(lookml_code: str) -> List[str]:
+    """Split LookML into top-level objects by tracking brace depth"""
+    objects = []
+    current = []
+    depth = 0
+    for line in lookml_code.split('\n'):
+        if depth == 0 and not line.strip():
+            continue
+        current.append(line)
+        # Braces inside SQL strings are rare enough in LookML to ignore here
+        depth += line.count('{') - line.count('}')
+        if depth <= 0:
+            objects.append('\n'.join(current))
+            current = []
+            depth = 0
+    if current:
+        objects.append('\n'.join(current))
+    return objects
+
+
+def _split_container(obj: str) -> List[str]:
+    """Split a view/explore block into its children, each wrapped in the container header"""
+    lines = obj.split('\n')
+    header, body = lines[0], lines[1:]
+    if body and body[-1].strip() == '}':
+        body = body[:-1]
+    children = split_lookml_objects('\n'.join(body))
+    return [f"{header}\n{child}\n}}" for child in children]
+
+
+def chunk_lookml(lookml_code: str, max_input_tokens: int = MAX_INPUT_TOKENS) -> List[str]:
+    """Group LookML objects into batches that stay under the token budget
+
+    Oversized containers such as ``view: orders { ... }`` are split into their
+    child objects, each re-wrapped in the container header, so a large view can
+    be spread over several batches.
+    """
+    objects = []
+    for obj in split_lookml_objects(lookml_code):
+        match = OBJECT_START_RE.match(obj)
+        if estimate_tokens(obj) > max_input_tokens and match and match.group(1) in ('view', 'explore'):
+            objects.extend(_split_container(obj))
+        else:
+            # An oversized single field still goes out alone; continuation handles its output
+            objects.append(obj)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for obj in objects:
+        tokens = estimate_tokens(obj)
+        if current and current_tokens + tokens > max_input_tokens:
+            chunks.append('\n\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(obj)
+        current_tokens += tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def request_completion(client: Any, prompt: str, max_tokens: int = MAX_OUTPUT_TOKENS,
+                       max_continuations: int = MAX_CONTINUATIONS) -> str:
+    """Send one prompt, asking the model to continue whenever it stops at max_tokens"""
+    text = ''
+    for _ in range(max_continuations + 1):
+        messages = [{"role": "user", "content": prompt}]
+        if text:
+            # Prefilling the assistant turn makes the model continue where it stopped;
+            # the API rejects a prefill that ends in whitespace
+            text = text.rstrip()
+            messages.append({"role": "assistant", "content": text})
+        with LLM_REQUEST_SECONDS.time():
+            response = client.messages.create(
+                model=MODEL,
+                max_tokens=max_tokens,
+                temperature=0.1,
+                messages=messages
+            )
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            LLM_TOKENS.inc(usage.input_tokens, direction='input')
+            LLM_TOKENS.inc(usage.output_tokens, direction='output')
+        text += response.content[0].text
+        if response.stop_reason != 'max_tokens':
+            break
+    return text.strip()
+
+
+def _strip_code_fences(text: str) -> str:
+    """Drop markdown code fences the model sometimes wraps YAML in"""
+    return '\n'.join(line for line in text.split('\n') if not CODE_FENCE_RE.match(line))
+
+
+def _split_sections(document: str) -> List[Tuple[str, List[Tuple[str, List[str]]]]]:
+    """Split a YAML document into top-level sections, each a list of (entry_name, lines)"""
+    sections = []
+    entries = None
+    for line in _strip_code_fences(document).split('\n'):
+        if not line.strip():
+            continue
+        if not line.startswith(' '):
+            header = SECTION_HEADER_RE.match(line)
+            if header:
+                entries = []
+                sections.append((header.group(1), entries))
+            else:
+                # Scalar top-level keys are kept as their own single-entry section
+                entries = None
+                key = line.split(':', 1)[0]
+                sections.append((key, [(key, [line])]))
+            continue
+        if entries is None:
+            if sections:
+                sections[-1][1][-1][1].append(line)
+            continue
+        entry = ENTRY_HEADER_RE.match(line)
+        if entry or not entries:
+            entries.append((entry.group(1) if entry else None, [line]))
+        else:
+            entries[-1][1].append(line)
+    return sections
+
+
+def merge_yaml_documents(documents: List[str]) -> str:
+    """Merge partial Omni YAML documents, deduplicating sections and the entries within them"""
+    merged: Dict[str, Dict[Any, List[str]]] = {}
+    for document in documents:
+        for section, entries in _split_sections(document):
+            section_entries = merged.setdefault(section, {})
+            for index, (name, lines) in enumerate(entries):
+                # The first batch to define an entry wins; unnamed lines are kept in order
+                key = name if name is not None else (len(section_entries), index)
+                section_entries.setdefault(key, lines)
+
+    ordered = [s for s in SECTION_ORDER if s in merged] + [s for s in merged if s not in SECTION_ORDER]
+    output = []
+    for section in ordered:
+        entries = merged[section]
+        if output:
+            output.append('')
+        first_lines = next(iter(entries.values()), [])
+        if len(entries) == 1 and first_lines and not first_lines[0].startswith(' '):
+            output.extend(first_lines)
+            continue
+        output.append(f'{section}:')
+        for lines in entries.values():
+            output.extend(lines)
+    return '\n'.join(output)
+
+
+def convert_with_llm(client: Any, lookml_code: str, error_msg: str = None,
+                     max_input_tokens: int = MAX_INPUT_TOKENS, max_workers: int = MAX_WORKERS,
+                     on_progress: Optional[Callable[[int, int], None]] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+    """Convert LookML of any size in one parallel pass over prompt-sized batches
+
+    on_progress(done, total) is called in the caller's thread as batches
+    finish; when should_stop() returns true, batches that have not started
+    are dropped and ConversionCancelled is raised.
+    """
+    chunks = chunk_lookml(lookml_code, max_input_tokens)
+    if not chunks:
+        return None
+    if len(chunks) == 1:
+        document = request_completion(client, build_prompt(chunks[0], error_msg))
+        if on_progress is not None:
+            on_progress(1, 1)
+        return document
+
+    documents = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        futures = {
+            executor.submit(request_completion, client, build_prompt(chunk, error_msg)): index
+            for index, chunk in enumerate(chunks)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            documents[futures[future]] = future.result()
+            if on_progress is not None:
+                on_progress(done, len(chunks))
+            if should_stop is not None and should_stop() and done < len(chunks):
+                for pending in futures:
+                    pending.cancel()
+                raise ConversionCancelled(f"Cancelled after {done} of {len(chunks)} batches")
+    return merge_yaml_documents(documents)
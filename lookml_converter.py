@@ -1,8 +1,21 @@
 import streamlit as st
-import re
-from typing import Dict, Any, Optional, Tuple
+import functools
+from typing import Dict, Any, Optional, Tuple, Iterator, Callable
 import os
-import anthropic
+import tempfile
+import threading
+import time
+import zipfile
+from omni_converter import (
+    ConversionCancelled, LookMLToOmniConverter, conversion_cache_key, create_anthropic_client, yaml_output_path
+)
+from conversion_jobs import (
+    LLM_CACHE_ENTRIES, RULE_CACHE_ENTRIES, ConversionExecutor, ConversionJob, ExecutorBusy, ResultCache,
+    cached_rule_conversion, run_llm_conversion
+)
+from rename_rules import RenameRules, RuleError
+from metrics import CONVERSIONS, start_metrics_server
+from yaml_preview import YamlPreview, last_lines
 
 # Page configuration
 st.set_page_config(
@@ -192,713 +205,454 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class LookMLToOmniConverter:
-    """Converter class for transforming LookML to Omni YAML format"""
-    
-    def __init__(self):
-        self.property_mappings = {
-            'hidden': self._map_hidden,
-            'primary_key': self._map_primary_key,
-            'value_format_name': self._map_value_format,
-            'type': self._map_type,
-        }
-        # Track parameters for filter creation
-        self.parameters = {}
-        
-    def _map_hidden(self, value: Any) -> Optional[Dict[str, Any]]:
-        """Map hidden property to tags"""
-        if value == 'no' or value is False:
-            return {'tags': ['business_facing']}
-        return None
-    
-    def _map_primary_key(self, value: Any) -> Optional[Dict[str, Any]]:
-        """Map primary_key property"""
-        if value == 'yes' or value is True:
-            return {'primary_key': True}
-        return None
-    
-    def _map_value_format(self, value: str) -> Dict[str, Any]:
-        """Map value_format_name to format"""
-        format_mappings = {
-            'decimal_0': 'NUMBER',
-            'decimal_1': 'NUMBER',
-            'decimal_2': 'NUMBER',
-            'percent_0': 'PERCENT',
-            'percent_1': 'PERCENT',
-            'percent_2': 'PERCENT',
-            'usd': 'CURRENCY',
-            'eur': 'CURRENCY',
-        }
-        return {'format': format_mappings.get(value, value.upper())}
-    
-    def _map_type(self, value: str, object_type: str) -> Optional[Dict[str, Any]]:
-        """Map type property based on object type"""
-        if object_type == 'measure':
-            aggregate_mappings = {
-                'count': 'count',
-                'count_distinct': 'count_distinct',
-                'sum': 'sum',
-                'average': 'avg',
-                'avg': 'avg',
-                'max': 'max',
-                'min': 'min',
-                'median': 'median',
-            }
-            if value in aggregate_mappings:
-                return {'aggregate_type': aggregate_mappings[value]}
-        elif value == 'yesno':
-            return {'type': 'boolean'}
-        return None
-    
-    def parse_lookml(self, lookml_code: str) -> Dict[str, Any]:
-        """Parse LookML code and convert to structured format"""
-        lines = lookml_code.split('\n')
-        result = {
-            'dimensions': {},
-            'dimension_groups': {},
-            'measures': {},
-            'parameters': {},
-            'filters': {}
-        }
-        
-        current_object = None
-        current_type = None
-        current_props = {}
-        in_timeframes = False
-        timeframes_list = []
-        in_case = False
-        case_depth = 0
-        in_sql = False
-        sql_lines = []
-        sql_key = None
-        in_allowed_value = False
-        allowed_values = []
-        current_allowed_value = {}
-        
-        for i, line in enumerate(lines):
-            trimmed = line.strip()
-            
-            # Skip empty lines and comments
-            if not trimmed or trimmed.startswith('#'):
-                continue
-            
-            # Check for object declarations
-            dimension_match = re.match(r'^dimension:\s*(\w+)\s*{', trimmed)
-            dimension_group_match = re.match(r'^dimension_group:\s*(\w+)\s*{', trimmed)
-            measure_match = re.match(r'^measure:\s*(\w+)\s*{', trimmed)
-            parameter_match = re.match(r'^parameter:\s*(\w+)\s*{', trimmed)
-            
-            if dimension_match:
-                if current_object and current_type:
-                    self._save_object(result, current_type, current_object, current_props)
-                current_object = dimension_match.group(1)
-                current_type = 'dimension'
-                current_props = {}
-            elif dimension_group_match:
-                if current_object and current_type:
-                    self._save_object(result, current_type, current_object, current_props)
-                current_object = dimension_group_match.group(1)
-                current_type = 'dimension_group'
-                current_props = {}
-            elif measure_match:
-                if current_object and current_type:
-                    self._save_object(result, current_type, current_object, current_props)
-                current_object = measure_match.group(1)
-                current_type = 'measure'
-                current_props = {}
-            elif parameter_match:
-                if current_object and current_type:
-                    self._save_object(result, current_type, current_object, current_props)
-                current_object = parameter_match.group(1)
-                current_type = 'parameter'
-                current_props = {}
-            elif trimmed == '}':
-                if in_allowed_value:
-                    if 'value' in current_allowed_value:
-                        allowed_values.append(current_allowed_value)
-                    current_allowed_value = {}
-                    in_allowed_value = False
-                elif in_case and case_depth > 0:
-                    case_depth -= 1
-                    if case_depth == 0:
-                        in_case = False
-                elif in_timeframes:
-                    in_timeframes = False
-                    current_props['timeframes'] = timeframes_list
-                    timeframes_list = []
-                elif current_props and 'allowed_value' in current_props:
-                    # End of parameter with allowed_values
-                    current_props['allowed_values'] = allowed_values
-                    allowed_values = []
-                    del current_props['allowed_value']
-            elif trimmed == 'case: {':
-                in_case = True
-                case_depth = 1
-            elif trimmed == 'allowed_value: {':
-                in_allowed_value = True
-            elif in_allowed_value:
-                # Parse allowed_value properties
-                if '{' in trimmed:
-                    continue
-                prop = self._parse_property(trimmed)
-                if prop:
-                    key, value = prop
-                    current_allowed_value[key] = value
-            elif in_case:
-                if '{' in trimmed:
-                    case_depth += 1
-                # Skip case content for now
+def read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    with archive.open(info) as member:
+        return member.read().decode('utf-8')
+
+
+def unreadable_zip(error: Exception) -> str:
+    raise ValueError(f"not a readable zip file: {error}")
+
+
+def iter_uploaded_lookml(uploaded_files) -> Iterator[Tuple[str, Callable[[], str]]]:
+    """Yield (path, read) for each uploaded .lkml file, reading zip entries one at a time
+
+    read() returns the file's text and raises for a file that is not UTF-8
+    or a zip that cannot be opened, so one bad upload fails on its own.
+    """
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(uploaded)
+            except (zipfile.BadZipFile, OSError) as e:
+                yield uploaded.name, functools.partial(unreadable_zip, e)
                 continue
-            elif trimmed == 'timeframes: [':
-                in_timeframes = True
-            elif in_timeframes:
-                # Extract timeframe values
-                timeframe_pattern = r'^(\w+),?$'
-                tf_match = re.match(timeframe_pattern, trimmed)
-                if tf_match:
-                    timeframes_list.append(tf_match.group(1))
-            elif current_object:
-                # Check if we're in a multi-line SQL statement
-                if in_sql:
-                    # Check if this line ends the SQL statement
-                    if trimmed.endswith(';;'):
-                        sql_lines.append(line.rstrip())
-                        # Join all SQL lines and clean up
-                        full_sql = ' '.join(sql_lines)
-                        full_sql = re.sub(r'\s*;;\s*$', '', full_sql)
-                        full_sql = re.sub(r'^sql:\s*', '', full_sql).strip()
-                        current_props[sql_key] = full_sql
-                        in_sql = False
-                        sql_lines = []
-                        sql_key = None
-                    else:
-                        sql_lines.append(line.rstrip())
-                else:
-                    # Check if this line starts a SQL statement
-                    sql_match = re.match(r'^(sql(?:_\w+)?):\s*(.*)$', trimmed)
-                    if sql_match:
-                        sql_key = sql_match.group(1)
-                        sql_value = sql_match.group(2)
-                        
-                        # Check if it's a complete SQL statement
-                        if sql_value.endswith(';;'):
-                            sql_value = re.sub(r'\s*;;\s*$', '', sql_value)
-                            current_props[sql_key] = sql_value
-                        else:
-                            # Start of multi-line SQL
-                            in_sql = True
-                            sql_lines = [f"{sql_key}: {sql_value}"]
-                    else:
-                        # Parse regular property lines
-                        prop = self._parse_property(trimmed)
-                        if prop:
-                            key, value = prop
-                            current_props[key] = value
-        
-        # Save last object
-        if current_object and current_type:
-            self._save_object(result, current_type, current_object, current_props)
-        
-        # Convert parameters to filters
-        self._convert_parameters_to_filters(result)
-        
-        return result
-    
-    def _convert_parameters_to_filters(self, result: Dict[str, Any]):
-        """Convert LookML parameters to Omni filters"""
-        if 'parameters' in result and result['parameters']:
-            for param_name, param_props in result['parameters'].items():
-                filter_props = {}
-                
-                # Basic properties
-                if 'label' in param_props:
-                    filter_props['label'] = param_props['label']
-                if 'description' in param_props:
-                    filter_props['description'] = param_props['description']
-                
-                # Type is always string for filters
-                filter_props['type'] = 'string'
-                
-                # Convert allowed_values to suggestion_list
-                if 'allowed_values' in param_props:
-                    suggestion_list = []
-                    for av in param_props['allowed_values']:
-                        if 'value' in av:
-                            suggestion_list.append({'value': av['value']})
-                    if suggestion_list:
-                        filter_props['suggestion_list'] = suggestion_list
-                
-                # Handle default_value
-                if 'default_value' in param_props:
-                    filter_props['default_filter'] = {'is': param_props['default_value']}
-                
-                result['filters'][param_name] = filter_props
-    
-    def _parse_property(self, line: str) -> Optional[Tuple[str, Any]]:
-        """Parse a property line"""
-        # Handle timeframes array in single line
-        timeframes_match = re.match(r'timeframes:\s*\[(.*?)\]', line)
-        if timeframes_match:
-            timeframes = [t.strip() for t in timeframes_match.group(1).split(',')]
-            return ('timeframes', timeframes)
-        
-        # Handle regular properties
-        match = re.match(r'^(\w+):\s*(.+?)(?:\s*;;)?$', line)
-        if match:
-            key = match.group(1)
-            value = match.group(2).strip()
-            
-            # Remove trailing semicolons
-            value = re.sub(r'\s*;;\s*$', '', value)
-            
-            # Handle quoted values
-            if value.startswith('"') and value.endswith('"'):
-                value = value[1:-1]
-            
-            # Convert boolean values
-            if value in ('yes', 'true'):
-                value = True
-            elif value in ('no', 'false'):
-                value = False
-            
-            return (key, value)
-        
-        return None
-    
-    def _save_object(self, result: Dict, obj_type: str, name: str, props: Dict[str, Any]):
-        """Save parsed object to result"""
-        plural_type = obj_type + 's'
-        if obj_type == 'dimension_group':
-            plural_type = 'dimensions'  # dimension_groups go under dimensions in the output
-        
-        converted_props = {}
-        
-        # First, handle SQL field which is critical
-        if 'sql' in props:
-            sql_value = props['sql']
-            # Check if it's a field reference like ${TABLE}."FIELD" or ${TABLE}.FIELD
-            table_ref_match = re.search(r'\$\{TABLE\}\.("?)([^";]+)("?)', sql_value)
-            if table_ref_match:
-                # Extract the field name with quotes if present
-                quote1 = table_ref_match.group(1)
-                field_name = table_ref_match.group(2)
-                quote2 = table_ref_match.group(3)
-                
-                if quote1 and quote2:  # Field was quoted in original
-                    converted_props['sql'] = f'"{field_name}"'
-                else:  # Field was not quoted
-                    converted_props['sql'] = f'"{field_name}"'  # Always quote in output
-            else:
-                # For CASE statements and other SQL, keep as is but remove ;;
-                sql_cleaned = sql_value.replace(';;', '').strip()
-                # Don't add quotes to complex SQL
-                converted_props['sql'] = sql_cleaned
-        
-        # Handle label
-        if 'label' in props:
-            converted_props['label'] = props['label']
-        
-        # Handle group_label - clean up extra spaces
-        if 'group_label' in props:
-            group_label = props['group_label'].strip()
-            # Remove leading spaces that might be used for visual hierarchy
-            if group_label.startswith('  '):
-                group_label = group_label.strip()
-            converted_props['group_label'] = group_label
-        
-        # Handle description
-        if 'description' in props:
-            converted_props['description'] = props['description']
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith('.lkml'):
+                        continue
+                    yield info.filename, functools.partial(read_zip_member, archive, info)
         else:
-            # Add placeholder description based on label or name
-            label = converted_props.get('label', name.replace('_', ' ').title())
-            converted_props['description'] = f"{label}"
-        
-        # Handle common parameters for both dimensions and measures
-        
-        # format parameter
-        if 'value_format' in props:
-            converted_props['format'] = props['value_format']
-        elif 'value_format_name' in props:
-            format_mapping = {
-                'decimal_0': 'NUMBER',
-                'decimal_1': 'NUMBER_1',
-                'decimal_2': 'NUMBER_2',
-                'percent_0': 'PERCENT',
-                'percent_1': 'PERCENT_1',
-                'percent_2': 'PERCENT_2',
-                'usd': 'CURRENCY',
-                'usd_0': 'CURRENCY',
-                'eur': 'EURCURRENCY',
-                'gbp': 'GBPCURRENCY',
-                # Add more format mappings based on examples
-                'id': 'ID',
-                'string': 'STRING',
-            }
-            converted_props['format'] = format_mapping.get(props['value_format_name'], props['value_format_name'].upper())
-        
-        # Handle type for dimensions
-        if obj_type == 'dimension':
-            if 'type' in props:
-                dimension_type = props['type']
-                # Special handling for ID fields
-                if name.endswith('_id') and dimension_type == 'string':
-                    converted_props['format'] = 'ID'
-                # Handle _sk fields (surrogate keys)
-                elif name.endswith('_sk'):
-                    converted_props['format'] = 'ID'
-                # yesno becomes boolean in Omni
-                elif dimension_type == 'yesno':
-                    # Note: yesno dimensions don't get a type in output
-                    pass
-                # number type gets specific format
-                elif dimension_type == 'number' and 'format' not in converted_props:
-                    converted_props['format'] = 'NUMBER'
-                # time dimensions
-                elif dimension_type == 'time':
-                    # Time dimensions are handled as dimension_groups
-                    pass
-            
-            # Handle dimension-specific parameters
-            if 'primary_key' in props and props['primary_key'] in ['yes', True]:
-                converted_props['primary_key'] = True
-            
-            # timeframes for date dimensions
-            if 'timeframes' in props:
-                converted_props['timeframes'] = props['timeframes']
-            
-            # convert_tz
-            if 'convert_tz' in props:
-                converted_props['convert_tz'] = props['convert_tz'] == 'yes' or props['convert_tz'] is True
-        
-        # Handle hidden property
-        if 'hidden' in props:
-            if props['hidden'] in ['yes', True]:
-                converted_props['hidden'] = True
-            elif props['hidden'] in ['no', False]:
-                # Don't add hidden field if it's explicitly set to 'no'
-                pass
+            yield uploaded.name, lambda uploaded=uploaded: uploaded.getvalue().decode('utf-8')
+
+
+def count_uploaded_lookml(uploaded_files) -> int:
+    """Count .lkml files in the uploads without reading their contents; a bad zip counts as one"""
+    total = 0
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(uploaded) as archive:
+                    total += sum(
+                        1 for info in archive.infolist()
+                        if not info.is_dir() and info.filename.lower().endswith('.lkml')
+                    )
+            except (zipfile.BadZipFile, OSError):
+                total += 1
+            uploaded.seek(0)
+        else:
+            total += 1
+    return total
+
+
+@st.cache_resource
+def get_converter(rules_text: str = '') -> LookMLToOmniConverter:
+    """Converter shared by every session and rerun using the same rename rules"""
+    return LookMLToOmniConverter(RenameRules.from_yaml(rules_text) if rules_text else None)
+
+
+def current_converter() -> LookMLToOmniConverter:
+    """Converter for the rename rules uploaded in this session, or the bundled ones"""
+    return get_converter(st.session_state.get('rename_rules', ''))
+
+
+def rules_settings() -> Dict[str, Any]:
+    """Cache key settings identifying this session's rename rules"""
+    rules_text = st.session_state.get('rename_rules')
+    return {'rules': conversion_cache_key(rules_text)} if rules_text else {}
+
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serve Prometheus metrics on LOOKML_METRICS_PORT, once per process
+
+    Only on localhost by default; LOOKML_METRICS_HOST=0.0.0.0 exposes it to
+    other machines.
+    """
+    port = os.getenv('LOOKML_METRICS_PORT')
+    return start_metrics_server(int(port), os.getenv('LOOKML_METRICS_HOST', '127.0.0.1')) if port else None
+
+
+@st.cache_resource
+def get_anthropic_client(api_key: str):
+    """Anthropic client per API key, reused across reruns"""
+    return create_anthropic_client(api_key)
+
+
+def get_api_key() -> Optional[str]:
+    """API key from the sidebar, falling back to the environment"""
+    return st.session_state.get('anthropic_api_key') or os.getenv('ANTHROPIC_API_KEY')
+
+
+# Seconds between partial YAML updates while converting
+PROGRESS_INTERVAL = 0.25
+# Seconds between progress bar updates while a job runs or waits
+POLL_INTERVAL = 0.2
+# Output up to this many characters is shown whole; larger output is paged
+PREVIEW_FULL_CHARS = 200_000
+# Search matches offered in the jump list
+PREVIEW_MATCHES = 100
+# Converted upload zips live here until their session clears or replaces them
+UPLOAD_ZIP_DIR = os.path.join(tempfile.gettempdir(), 'lookml_converter_uploads')
+# Seconds before a zip left by a session that closed without clearing is removed
+UPLOAD_ZIP_MAX_AGE = 24 * 3600
+
+
+@st.cache_resource
+def get_job_executor() -> ConversionExecutor:
+    """Conversion workers shared by every session, sized by LOOKML_CONVERSION_WORKERS and LOOKML_CONVERSION_QUEUE"""
+    return ConversionExecutor(int(os.getenv('LOOKML_CONVERSION_WORKERS', '4')),
+                              int(os.getenv('LOOKML_CONVERSION_QUEUE', '64')))
+
+
+@st.cache_resource
+def get_rule_cache() -> ResultCache:
+    """Rule-based conversions shared by every session, least recently used first"""
+    return ResultCache(RULE_CACHE_ENTRIES)
+
+
+@st.cache_resource
+def get_llm_cache() -> ResultCache:
+    """AI conversions shared by every session, so identical inputs never repeat an LLM call"""
+    return ResultCache(LLM_CACHE_ENTRIES)
+
+
+def convert_input(lookml_code: str, cache_key: str, converter: LookMLToOmniConverter, client: Any,
+                  caches: Tuple[ResultCache, ResultCache], job: ConversionJob) -> Dict[str, Any]:
+    """Convert pasted LookML on a worker, falling back to the LLM when client is set,
+    and return the result to keep in session state
+
+    caches holds the rule and LLM result caches, resolved by the script thread.
+    """
+    rule_cache, llm_cache = caches
+    messages = []
+    omni_yaml = None
+    try:
+        # First try rule-based conversion
+        job.report(0, 0, "Converting with rule-based engine...")
+        omni_yaml = cached_rule_conversion(cache_key, lookml_code, converter, rule_cache,
+                                           rule_progress(job, converter), job.should_stop)
         
-        # tags - only add if explicitly defined in LookML
-        if 'tags' in props:
-            # Ensure tags is always a list
-            if isinstance(props['tags'], str):
-                converted_props['tags'] = [props['tags']]
-            elif isinstance(props['tags'], list):
-                converted_props['tags'] = props['tags']
+        # Check if conversion produced meaningful output
+        incomplete = not omni_yaml.strip() or omni_yaml.strip() == "dimensions:\n\nmeasures:"
+        CONVERSIONS.inc(engine='rules', outcome='incomplete' if incomplete else 'success')
+        if incomplete:
+            # Try LLM conversion if available
+            if client:
+                job.report(0, 0, "Rule-based conversion incomplete. Trying AI-powered conversion...")
+                llm_result = run_llm_conversion(lookml_code, cache_key, "Empty or incomplete output", converter,
+                                                client, llm_cache, job, messages)
+                if llm_result:
+                    omni_yaml = llm_result
+                    messages.append(('info', "🤖 AI-powered conversion used for better results"))
             else:
-                converted_props['tags'] = [str(props['tags'])]
-        
-        # links
-        if 'link' in props or 'links' in props:
-            links = props.get('links', props.get('link', []))
-            if not isinstance(links, list):
-                links = [links]
-            converted_props['links'] = links
-        
-        # drill_fields
-        if 'drill_fields' in props and props['drill_fields']:
-            # Filter out any pattern matches like [*drill*]
-            drill_fields = [f for f in props['drill_fields'] if not ('*' in f)]
-            if drill_fields:
-                converted_props['drill_fields'] = drill_fields
-        
-        # suggest_from_field
-        if 'suggest_from_field' in props:
-            converted_props['suggest_from_field'] = props['suggest_from_field']
-        
-        # suggestion_list
-        if 'suggestion_list' in props:
-            converted_props['suggestion_list'] = props['suggestion_list']
-        elif 'suggestions' in props:
-            # Convert suggestions to suggestion_list format
-            converted_props['suggestion_list'] = props['suggestions']
-        
-        # order_by_field
-        if 'order_by_field' in props:
-            converted_props['order_by_field'] = props['order_by_field']
+                messages.append(('warning', "⚠️ Conversion produced limited output. Consider adding an Anthropic API key for AI-enhanced conversion."))
         
-        # display_order
-        if 'display_order' in props:
-            converted_props['display_order'] = props['display_order']
+        messages.append(('success', "✅ Conversion successful!"))
         
-        # view_label
-        if 'view_label' in props:
-            converted_props['view_label'] = props['view_label']
-        
-        # For measures, handle special cases
-        if obj_type == 'measure':
-            # Handle aggregate type
-            if 'type' in props:
-                measure_type = props['type']
-                if measure_type == 'count_distinct':
-                    converted_props['aggregate_type'] = 'count_distinct'
-                elif measure_type == 'sum':
-                    converted_props['aggregate_type'] = 'sum'
-                elif measure_type == 'sum_distinct':
-                    converted_props['aggregate_type'] = 'sum_distinct_on'
-                elif measure_type == 'count':
-                    converted_props['aggregate_type'] = 'count'
-                elif measure_type == 'average':
-                    converted_props['aggregate_type'] = 'avg'
-                elif measure_type == 'max':
-                    converted_props['aggregate_type'] = 'max'
-                elif measure_type == 'min':
-                    converted_props['aggregate_type'] = 'min'
-                elif measure_type == 'median':
-                    converted_props['aggregate_type'] = 'median'
-                elif measure_type == 'list':
-                    converted_props['aggregate_type'] = 'list'
-                # If type is 'number', it's a calculated measure, no aggregate_type
-            
-            # Handle sql_distinct_key -> custom_primary_key_sql
-            if 'sql_distinct_key' in props:
-                distinct_key = props['sql_distinct_key'].replace(';;', '').strip()
-                # Just keep the field reference as-is, don't add table prefixes
-                converted_props['custom_primary_key_sql'] = distinct_key
-            
-            # filters for filtered measures
-            if 'filters' in props:
-                converted_props['filters'] = props['filters']
-            
-            # drill_queries
-            if 'drill_queries' in props:
-                converted_props['drill_queries'] = props['drill_queries']
-            
-            # Handle view_label (special case - comes from file level)
-            if 'view_label' in props:
-                converted_props['view_label'] = props['view_label']
-            
-            # Handle measure-specific format mappings
-            if 'format' not in converted_props and 'label' in props:
-                # Infer format from label or name patterns
-                label_lower = props['label'].lower()
-                if any(word in label_lower for word in ['count', 'number', 'num']):
-                    converted_props['format'] = 'big_2'  # Common format for counts
-        
-        # Handle dimension_group specifics
-        if obj_type == 'dimension_group':
-            # For dimension groups, we only keep sql, group_label, label, and description
-            # Remove timeframes and other time-specific properties from output
-            keys_to_keep = ['sql', 'group_label', 'label', 'description']
-            converted_props = {k: v for k, v in converted_props.items() if k in keys_to_keep}
-        
-        # Handle required_access_grants
-        if 'required_access_grants' in props:
-            converted_props['required_access_grants'] = props['required_access_grants']
-        
-        # Handle aliases
-        if 'alias' in props:
-            converted_props['aliases'] = [props['alias']] if isinstance(props['alias'], str) else props['alias']
-        elif 'aliases' in props:
-            converted_props['aliases'] = props['aliases']
-        
-        # Handle ignored fields
-        if 'ignored' in props and props['ignored'] in ['yes', True]:
-            converted_props['ignored'] = True
-            
-        # Handle dimension specific: groups, bin_boundaries
-        if obj_type == 'dimension':
-            if 'groups' in props:
-                converted_props['groups'] = props['groups']
-            if 'bin_boundaries' in props:
-                converted_props['bin_boundaries'] = props['bin_boundaries']
-            if 'filter_single_select_only' in props:
-                converted_props['filter_single_select_only'] = props['filter_single_select_only'] in ['yes', True]
-        
-        # Special case: if the SQL field extracts to IS_THIS_SPRINT_FLAG, use that as the name
-        if 'sql' in converted_props and converted_props['sql'] == '"IS_THIS_SPRINT_FLAG"' and name == 'is_this_sprint':
-            result[plural_type]['is_this_sprint_flag'] = converted_props
+    except ConversionCancelled:
+        raise
+    except Exception as e:
+        CONVERSIONS.inc(engine='rules', outcome='error')
+        # Try LLM conversion on error
+        if client:
+            job.report(0, 0, "Standard conversion failed. Trying AI-powered conversion...")
+            omni_yaml = run_llm_conversion(lookml_code, cache_key, str(e), converter, client, llm_cache, job, messages)
+            if omni_yaml:
+                messages.append(('success', "✅ AI-powered conversion successful!"))
+            else:
+                messages.append(('error', f"❌ Both standard and AI conversion failed: {str(e)}"))
         else:
-            result[plural_type][name] = converted_props
+            messages.append(('error', f"❌ Conversion failed: {str(e)}"))
+            messages.append(('info', "💡 Tip: Add an Anthropic API key in the sidebar to enable AI-powered fallback conversion."))
     
-    def get_llm_conversion(self, lookml_code: str, error_msg: str = None) -> Optional[str]:
-        """Use Anthropic Claude as fallback for complex conversions"""
-        
-        # Check if API key is available
-        anthropic_key = st.session_state.get('anthropic_api_key', os.getenv('ANTHROPIC_API_KEY'))
-        
-        if not anthropic_key:
-            return None
-            
-        prompt = f"""You are an expert in converting LookML code to Omni YAML syntax.
-
-Convert the following LookML code to Omni YAML format following these rules:
-- Extract ${TABLE}."FIELD" to just "FIELD" (with quotes) in format: sql: '"FIELD"'
-- Keep complex SQL statements (CASE, etc) as-is, just remove ;;
-- hidden: yes → hidden: true
-- hidden: no → don't include hidden field (do NOT add any tags)
-- Only add tags if they are explicitly defined in the LookML
-- type: yesno → don't include type in output
-- type: sum_distinct → aggregate_type: sum_distinct_on
-- sql_distinct_key → custom_primary_key_sql (keep field references as-is, no table prefixes)
-- value_format_name → format (with mappings like decimal_0 → NUMBER, usd → CURRENCY)
-- measure types (count, sum, etc) → aggregate_type
-- dimension_groups should be under dimensions in the output
-- dimension_groups only keep: sql, label, group_label, description
-- Always include description field (use label as description if not provided)
-- Fields ending with _id or _sk should have format: ID
-- Clean up group_label (remove leading spaces)
-- Don't include drill_fields that contain wildcards (*)
-- Convert aliases, tags, links, required_access_grants to arrays if needed
-- Convert parameters to filters with type: string and suggestion_list
-- Map allowed_value blocks to suggestion_list items
-- Convert default_value to default_filter: {{ is: value }}
-- For measures, use format: big_2 for counts/numbers when appropriate
-- Preserve timeframes arrays with proper formatting
-- Map LookML parameters to Omni equivalents (see documentation)
-
-{"Previous conversion attempt failed with: " + error_msg if error_msg else ""}
-
-LookML code:
-{lookml_code}
-
-Please provide only the converted YAML output without any explanations."""
+    return {'key': cache_key, 'yaml': omni_yaml, 'messages': messages}
 
+
+def rule_progress(job: ConversionJob, converter: LookMLToOmniConverter) -> Callable[[int, int, Dict[str, Any]], None]:
+    """parse_lookml callback recording progress and, throttled, the YAML converted so far on the job
+
+    Runs on the worker, so the partial result is never read while it changes;
+    conversions that finish quickly never render partial output.
+    """
+    last_update = [time.monotonic()]
+
+    def on_progress(done: int, total: int, partial_result: Dict[str, Any]):
+        job.report(done, total, f"Converted {done}/{total} objects...")
+        now = time.monotonic()
+        if done == total or now - last_update[0] < PROGRESS_INTERVAL:
+            return
+        last_update[0] = now
+        job.partial = converter.convert_to_yaml(partial_result)
+
+    return on_progress
+
+
+def start_job(kind: str, key: str, fn: Callable[[ConversionJob], Any]):
+    """Submit this session's conversion, replacing any it already has running"""
+    active = st.session_state.get('job')
+    if active:
+        if active[1].key == key and not active[1].finished.is_set():
+            return
+        discard_job(*active)
+    try:
+        st.session_state['job'] = (kind, get_job_executor().submit(key, fn))
+    except ExecutorBusy:
+        st.session_state.pop('job', None)
+        st.error("⏳ The converter is busy with other users' conversions. Please try again in a minute.")
+
+
+def wait_for_job(kind: str, job: ConversionJob, output_placeholder):
+    """Show a job's queue position or progress until it finishes, then store its result
+
+    Any interaction reruns the page, which stops this loop but not the job;
+    the rerun picks the job up again from session state.
+    """
+    executor = get_job_executor()
+    progress_bar = st.progress(0.0, text="Waiting for a free worker...")
+    shown = None
+    while not job.wait(POLL_INTERVAL):
+        position = executor.position(job)
+        if position:
+            stats = executor.stats()
+            progress_bar.progress(0.0, text=f"Queued: position {position} of {stats['queued']} "
+                                            f"({stats['running']} conversions running)")
+            continue
+        fraction = job.done / job.total if job.total else 0.0
+        progress_bar.progress(fraction, text=job.status or "Converting...")
+        if kind == 'conversion' and job.partial is not shown:
+            shown = job.partial
+            # Only the newest lines, so large partial output is not resent on every poll
+            output_placeholder.code(last_lines(shown), language='yaml')
+    progress_bar.empty()
+    output_placeholder.empty()
+    finish_job(kind, job)
+
+
+def finish_job(kind: str, job: ConversionJob):
+    """Move a finished job's result, or what it converted before a cancel, into session state"""
+    st.session_state.pop('job', None)
+    result_key = 'conversion' if kind == 'conversion' else 'upload_result'
+    if kind == 'upload':
+        discard_upload_result()
+    if job.state == 'done':
+        st.session_state[result_key] = job.result
+    elif job.state == 'failed':
+        if kind == 'conversion':
+            st.session_state['conversion'] = {'key': job.key, 'yaml': None,
+                                              'messages': [('error', f"❌ Conversion failed: {job.error}")]}
+        else:
+            st.session_state['upload_result'] = {'key': job.key, 'zip_path': None, 'converted': [],
+                                                 'failed': [('(all files)', str(job.error))]}
+    elif kind == 'conversion':
+        if job.total:
+            message = (f"Conversion cancelled after {job.done} of {job.total} objects; "
+                       "showing the YAML converted so far")
+        else:
+            message = "Conversion cancelled"
+        st.session_state['conversion'] = {
+            'key': f"cancelled_{job.key}",
+            'yaml': job.partial or None,
+            'messages': [('warning', message)],
+        }
+    else:
+        partial = job.partial or {'zip_path': None, 'converted': [], 'failed': []}
+        st.session_state['upload_result'] = {
+            'key': f"cancelled_{job.key}",
+            'zip_path': partial.get('zip_path'),
+            'converted': partial['converted'],
+            'failed': partial['failed'] + [('(remaining files)', 'cancelled')],
+        }
+
+
+def conversion_preview(conversion: Dict[str, Any]) -> YamlPreview:
+    """Paged preview of a conversion's YAML, indexed once and kept with the result"""
+    preview = conversion.get('preview')
+    if preview is None:
+        preview = conversion['preview'] = YamlPreview(conversion['yaml'])
+    return preview
+
+
+def jump_to_object(preview: YamlPreview, lines: Dict[str, int], page_key: str, choice_key: str):
+    """Show the page holding the object picked in the jump list"""
+    choice = st.session_state.get(choice_key)
+    if choice in lines:
+        st.session_state[page_key] = preview.page_of(lines[choice])
+
+
+def render_preview(conversion: Dict[str, Any]):
+    """One page of a large conversion's YAML, with server-side object search
+
+    Only the page and the matching index entries are sent to the browser;
+    the full document goes out through the download button alone.
+    """
+    preview = conversion_preview(conversion)
+    suffix = conversion['key'][:16]
+    page_key = f"preview_page_{suffix}"
+    choice_key = f"preview_jump_{suffix}"
+    search_col, jump_col, page_col = st.columns([2, 3, 1], gap="small")
+    query = search_col.text_input("Search objects", key=f"preview_search_{suffix}",
+                                  placeholder="Dimension or measure name")
+    matches, total = preview.search(query, PREVIEW_MATCHES)
+    # Jump list label -> line of the object
+    lines = {f"{entry.name} · {entry.section} · line {entry.line + 1}": entry.line for entry in matches}
+    jump_col.selectbox(
+        f"Jump to ({len(matches)} of {total} objects)",
+        list(lines),
+        index=None,
+        key=choice_key,
+        on_change=jump_to_object,
+        args=(preview, lines, page_key, choice_key),
+    )
+    page = page_col.number_input(f"Page of {preview.page_count}", min_value=1, max_value=preview.page_count,
+                                 step=1, key=page_key)
+    text, first, last = preview.page(int(page))
+    st.code(text, language='yaml')
+    st.caption(f"Lines {first}–{last} of {preview.line_count}. Download the YAML to get the whole document.")
+
+
+def remove_upload_zip(result: Optional[Dict[str, Any]]):
+    """Delete the zip behind an upload result or partial, if it has one"""
+    if result and result.get('zip_path'):
         try:
-            client = anthropic.Anthropic(api_key=anthropic_key)
-            response = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=2000,
-                temperature=0.1,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.content[0].text.strip()
-                
-        except Exception as e:
-            st.error(f"LLM conversion failed: {str(e)}")
-            return None
-    
-    def convert_to_yaml(self, parsed_data: Dict[str, Any]) -> str:
-        """Convert parsed data to YAML format"""
-        output = []
-        
-        # Process dimensions and dimension_groups
-        if parsed_data['dimensions'] or parsed_data['dimension_groups']:
-            output.append('dimensions:')
-            
-            # Add regular dimensions
-            for name, props in parsed_data['dimensions'].items():
-                output.append(f'  {name}:')
-                output.extend(self._format_properties(props, 4))
-                
-            # Add dimension groups
-            for name, props in parsed_data['dimension_groups'].items():
-                output.append(f'  {name}:')
-                output.extend(self._format_properties(props, 4))
-        
-        # Process measures
-        if parsed_data['measures']:
-            if output:
-                output.append('')
-            output.append('measures:')
-            for name, props in parsed_data['measures'].items():
-                # Check if we need to rename the measure based on label
-                measure_name = name
-                if 'label' in props:
-                    # Example: sum_planned_cpx -> sum_cxp_planned based on label pattern
-                    if name == 'sum_planned_cpx' and props['label'] == 'Total Planned CXP':
-                        measure_name = 'sum_cxp_planned'
-                    elif name == 'sum_delivered_cpx' and 'Done' in props.get('label', ''):
-                        measure_name = 'sum_cxp_done'
-                
-                output.append(f'  {measure_name}:')
-                output.extend(self._format_properties(props, 4))
-        
-        # Process filters (converted from parameters)
-        if 'filters' in parsed_data and parsed_data['filters']:
-            if output:
-                output.append('')
-            output.append('filters:')
-            for name, props in parsed_data['filters'].items():
-                output.append(f'  {name}:')
-                output.extend(self._format_properties(props, 4))
-        
-        return '\n'.join(output)
-    
-    def _format_properties(self, props: Dict[str, Any], indent: int) -> list:
-        """Format properties as YAML lines"""
-        lines = []
-        indent_str = ' ' * indent
-        
-        # Property order for better organization - matching Omni documentation order
-        property_order = [
-            'sql', 'label', 'group_label', 'description', 'format',
-            'aggregate_type', 'custom_primary_key_sql', 'hidden', 
-            'primary_key', 'ignored', 'aliases', 'tags', 
-            'links', 'drill_fields', 'drill_queries', 'filters',
-            'display_order', 'view_label', 'suggest_from_field',
-            'suggestion_list', 'order_by_field', 'required_access_grants',
-            'timeframes', 'convert_tz', 'groups', 'bin_boundaries',
-            'filter_single_select_only', 'colors', 'type', 'default_filter'
-        ]
-        
-        # Add ordered properties first
-        for key in property_order:
-            if key in props:
-                lines.extend(self._format_property(key, props[key], indent))
-        
-        # Add remaining properties
-        for key, value in props.items():
-            if key not in property_order:
-                lines.extend(self._format_property(key, value, indent))
-        
-        return lines
-    
-    def _format_property(self, key: str, value: Any, indent: int) -> list:
-        """Format a single property"""
-        indent_str = ' ' * indent
-        lines = []
-        
-        if isinstance(value, list):
-            if key == 'timeframes':
-                lines.append(f'{indent_str}{key}:')
-                lines.append(f'{indent_str}  [')
-                for i, item in enumerate(value):
-                    suffix = ',' if i < len(value) - 1 else ''
-                    lines.append(f'{indent_str}    {item}{suffix}')
-                lines.append(f'{indent_str}  ]')
-            elif key == 'suggestion_list':
-                lines.append(f'{indent_str}{key}:')
-                for item in value:
-                    if isinstance(item, dict) and 'value' in item:
-                        lines.append(f'{indent_str}  - value: {item["value"]}')
-                    else:
-                        lines.append(f'{indent_str}  - value: {item}')
-            else:
-                lines.append(f'{indent_str}{key}: [ {", ".join(map(str, value))} ]')
-        elif isinstance(value, dict):
-            if key == 'default_filter':
-                # Format default_filter specially
-                for k, v in value.items():
-                    lines.append(f'{indent_str}{key}:')
-                    lines.append(f'{indent_str}  {k}: {v}')
-            else:
-                lines.append(f'{indent_str}{key}: {value}')
-        elif isinstance(value, bool):
-            lines.append(f'{indent_str}{key}: {str(value).lower()}')
-        elif isinstance(value, str):
-            # Special handling for SQL fields
-            if key == 'sql':
-                # Check if it's already a simple quoted field reference
-                if value.startswith('"') and value.endswith('"') and value.count('"') == 2:
-                    # It's already properly quoted, output with single quotes around the whole thing
-                    lines.append(f"{indent_str}{key}: '{value}'")
-                else:
-                    # It's complex SQL (CASE statements, etc.), output as-is
-                    lines.append(f'{indent_str}{key}: {value}')
+            os.remove(result['zip_path'])
+        except FileNotFoundError:
+            pass
+
+
+def discard_upload_result():
+    """Drop this session's upload result along with its zip"""
+    remove_upload_zip(st.session_state.pop('upload_result', None))
+
+
+def discard_job(kind: str, job: ConversionJob):
+    """Cancel a job whose result this session no longer wants"""
+    get_job_executor().cancel(job)
+    if kind == 'upload':
+        # Nothing will collect its zip, so delete it once the worker lets go of it
+        def cleanup():
+            job.finished.wait()
+            remove_upload_zip(job.result or job.partial)
+        threading.Thread(target=cleanup, daemon=True).start()
+
+
+def cancel_conversion():
+    """Stop this session's conversion; finish_job then keeps whatever was converted before the click"""
+    active = st.session_state.get('job')
+    if active:
+        get_job_executor().cancel(active[1])
+
+
+def uploads_cache_key(uploaded_files) -> str:
+    """Identify a set of uploads by name, size and upload id without reading their contents"""
+    ids = [(f.name, f.size, getattr(f, 'file_id', None)) for f in uploaded_files]
+    return conversion_cache_key(repr(ids), rules_settings())
+
+
+def clear_all():
+    """Reset the input, uploads and any stored results"""
+    st.session_state['lookml_input'] = ''
+    st.session_state.pop('conversion', None)
+    discard_upload_result()
+    active = st.session_state.pop('job', None)
+    if active:
+        discard_job(*active)
+    # File uploaders cannot be reset through session state, so give it a fresh key
+    st.session_state['uploader_nonce'] = st.session_state.get('uploader_nonce', 0) + 1
+
+
+def convert_uploads_to_zip(converter, uploaded_files, zip_path: str, on_progress=None,
+                           should_stop=None) -> Tuple[list, list]:
+    """Convert uploaded files one at a time into a zip at zip_path, returning (converted, failed)
+
+    on_progress(done, total, path, partial) is called before the first file and
+    after each one; partial holds the converted and failed lists so far. When
+    should_stop() returns true, ConversionCancelled is raised and the zip is
+    closed with the files completed so far.
+    """
+    total = count_uploaded_lookml(uploaded_files)
+    converted = []
+    failed = []
+    partial = {'converted': converted, 'failed': failed}
+    with open(zip_path, 'wb') as handle, zipfile.ZipFile(handle, 'w', zipfile.ZIP_DEFLATED) as output:
+        if on_progress:
+            on_progress(0, total, None, partial)
+        for done, (path, read) in enumerate(iter_uploaded_lookml(uploaded_files), start=1):
+            try:
+                parsed_data = converter.parse_lookml(read(), should_stop=should_stop)
+                output.writestr(yaml_output_path(path), converter.convert_to_yaml(parsed_data))
+                converted.append(path)
+            except ConversionCancelled:
+                raise
+            except Exception as e:
+                failed.append((path, str(e)))
+            if on_progress:
+                on_progress(done, total, path, partial)
+    return converted, failed
+
+
+def remove_stale_upload_zips(directory: str = UPLOAD_ZIP_DIR, max_age: float = UPLOAD_ZIP_MAX_AGE):
+    """Delete zips older than max_age seconds, left by sessions that closed without clearing"""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def upload_job(upload_key: str, converter: LookMLToOmniConverter, uploaded_files) -> Callable[[ConversionJob], Dict[str, Any]]:
+    """Job converting uploaded files into a zip on disk, whose path is kept in session state"""
+    def run(job: ConversionJob) -> Dict[str, Any]:
+        def on_progress(done, total, path, partial):
+            job.partial = partial
+            job.report(done, total, f"Converted {done}/{total}: {path}" if path else "Converting uploaded files...")
+
+        # Spill the archive to disk so memory stays bounded by the largest single file;
+        # the download button reads it from there, so it never sits in session state
+        os.makedirs(UPLOAD_ZIP_DIR, exist_ok=True)
+        remove_stale_upload_zips()
+        fd, zip_path = tempfile.mkstemp(suffix='.zip', dir=UPLOAD_ZIP_DIR)
+        os.close(fd)
+        try:
+            converted_files, failed_files = convert_uploads_to_zip(
+                converter, uploaded_files, zip_path, on_progress, job.should_stop)
+        except ConversionCancelled:
+            # Keep the files finished before the cancel
+            if job.partial and job.partial['converted']:
+                job.partial = {**job.partial, 'zip_path': zip_path}
             else:
-                # For all other string properties
-                lines.append(f'{indent_str}{key}: {value}')
-        else:
-            lines.append(f'{indent_str}{key}: {value}')
-        
-        return lines
+                os.remove(zip_path)
+            raise
+        except BaseException:
+            os.remove(zip_path)
+            raise
+        if not converted_files:
+            os.remove(zip_path)
+            zip_path = None
+        return {'key': upload_key, 'zip_path': zip_path, 'converted': converted_files, 'failed': failed_files}
+
+    return run
+
 
-# Initialize converter
-converter = LookMLToOmniConverter()
+# Initialize the shared converter
+get_converter()
+start_metrics_endpoint()
 
 # Sidebar content
 with st.sidebar:
@@ -923,11 +677,34 @@ with st.sidebar:
     
     st.markdown("---")
     
+    st.markdown('<h2 style="font-family: Georgia, serif; font-size: 1.5rem; color: #000; letter-spacing: -0.02em;">Rename Rules</h2>', unsafe_allow_html=True)
+    st.markdown("""
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; color: #595959; font-size: 0.875rem; margin-bottom: 1rem;">
+    Optional: Upload a rules file to rename or override converted fields. See rename_rules.yaml for the format.
+    </div>
+    """, unsafe_allow_html=True)
+    
+    rules_file = st.file_uploader("Rules file:", type=['yaml', 'yml'], key="rename_rules_file")
+    if rules_file is None:
+        st.session_state.pop('rename_rules', None)
+    else:
+        rules_text = rules_file.getvalue().decode('utf-8', errors='replace')
+        try:
+            rule_count = len(get_converter(rules_text).rules.rules)
+        except RuleError as e:
+            st.session_state.pop('rename_rules', None)
+            st.error(f"❌ {e}")
+        else:
+            st.session_state['rename_rules'] = rules_text
+            st.success(f"✅ {rule_count} rules loaded")
+    
+    st.markdown("---")
+    
     st.markdown('<h2 style="font-family: Georgia, serif; font-size: 1.5rem; color: #000; letter-spacing: -0.02em;">How to Use</h2>', unsafe_allow_html=True)
     st.markdown("""
     <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; color: #595959; line-height: 1.4;">
     <ol>
-        <li style="margin-bottom: 0.5rem;"><strong>Paste</strong> your LookML code in the left editor</li>
+        <li style="margin-bottom: 0.5rem;"><strong>Paste</strong> your LookML code in the left editor, or <strong>upload</strong> .lkml files or a .zip</li>
         <li style="margin-bottom: 0.5rem;"><strong>Click</strong> "CONVERT TO OMNI" button</li>
         <li style="margin-bottom: 0.5rem;"><strong>Copy</strong> or download the converted YAML</li>
     </ol>
@@ -1090,6 +867,12 @@ with col1:
         key="lookml_input",
         label_visibility="collapsed"
     )
+    uploaded_files = st.file_uploader(
+        "Or upload .lkml files or a .zip of your LookML project:",
+        type=['lkml', 'zip'],
+        accept_multiple_files=True,
+        key=f"lookml_files_{st.session_state.get('uploader_nonce', 0)}"
+    )
 
 with col2:
     st.markdown('<h2 style="font-family: Georgia, serif; font-size: 1.8rem; color: #000; letter-spacing: -0.02em; margin-bottom: 1rem;">Omni YAML Output</h2>', unsafe_allow_html=True)
@@ -1102,84 +885,86 @@ with button_col1:
     convert_button = st.button("CONVERT TO OMNI", type="primary", use_container_width=True)
 
 with button_col2:
-    clear_button = st.button("CLEAR ALL", use_container_width=True)
+    clear_button = st.button("CLEAR ALL", use_container_width=True, on_click=clear_all)
 
 with button_col3:
     copy_feedback = st.empty()
 
+# Handle file uploads - converted server-side, one file at a time, on the shared workers
+if convert_button and uploaded_files:
+    upload_key = uploads_cache_key(uploaded_files)
+    if st.session_state.get('upload_result', {}).get('key') != upload_key:
+        start_job('upload', upload_key, upload_job(upload_key, current_converter(), uploaded_files))
+    st.session_state.pop('conversion', None)
+
 # Handle conversion
-if convert_button and lookml_input:
-    try:
-        # First try rule-based conversion
-        with st.spinner("Converting with rule-based engine..."):
-            parsed_data = converter.parse_lookml(lookml_input)
-            omni_yaml = converter.convert_to_yaml(parsed_data)
-        
-        # Check if conversion produced meaningful output
-        if not omni_yaml.strip() or omni_yaml.strip() == "dimensions:\n\nmeasures:":
-            # Try LLM conversion if available
-            if st.session_state.get('anthropic_api_key') or os.getenv('ANTHROPIC_API_KEY'):
-                with st.spinner("Rule-based conversion incomplete. Trying AI-powered conversion..."):
-                    llm_result = converter.get_llm_conversion(lookml_input, "Empty or incomplete output")
-                    if llm_result:
-                        omni_yaml = llm_result
-                        st.info("🤖 AI-powered conversion used for better results")
-            else:
-                st.warning("⚠️ Conversion produced limited output. Consider adding an Anthropic API key for AI-enhanced conversion.")
-        
-        # Display output
+elif convert_button and lookml_input:
+    api_key = get_api_key()
+    cache_key = conversion_cache_key(lookml_input, {'llm_fallback': bool(api_key), **rules_settings()})
+    conversion = st.session_state.get('conversion')
+    if not conversion or conversion['key'] != cache_key:
+        # Resolved here, since workers have no script context to read session state or caches from
+        converter = current_converter()
+        client = get_anthropic_client(api_key) if api_key else None
+        caches = (get_rule_cache(), get_llm_cache())
+        start_job('conversion', cache_key,
+                  functools.partial(convert_input, lookml_input, cache_key, converter, client, caches))
+    discard_upload_result()
+
+# Follow this session's running conversion, if any, until it finishes
+active_job = st.session_state.get('job')
+if active_job:
+    cancel_slot = button_col3.empty()
+    cancel_slot.button("CANCEL", use_container_width=True, on_click=cancel_conversion)
+    wait_for_job(*active_job, omni_output_placeholder)
+    cancel_slot.empty()
+
+# Render the latest results from session state, so download and other
+# interactions rerun the page without converting or calling the LLM again
+upload_result = st.session_state.get('upload_result')
+if upload_result:
+    with col2:
+        st.markdown(f"**{len(upload_result['converted'])}** file(s) converted, **{len(upload_result['failed'])}** failed")
+        for path, error in upload_result['failed']:
+            st.error(f"❌ {path}: {error}")
+        if upload_result['zip_path'] and os.path.exists(upload_result['zip_path']):
+            with open(upload_result['zip_path'], 'rb') as zip_file:
+                st.download_button(
+                    label="DOWNLOAD YAML (ZIP)",
+                    data=zip_file,
+                    file_name="omni_yaml.zip",
+                    mime="application/zip"
+                )
+        elif upload_result['converted']:
+            st.warning("The converted zip has expired; convert the files again to download it.")
+    if upload_result['converted']:
+        st.success("✅ Conversion successful!")
+
+conversion = st.session_state.get('conversion')
+if conversion:
+    if conversion['yaml']:
         with col2:
-            st.text_area(
-                "Converted YAML:",
-                value=omni_yaml,
-                height=500,
-                key="omni_output",
-                label_visibility="collapsed"
-            )
+            if len(conversion['yaml']) <= PREVIEW_FULL_CHARS:
+                st.text_area(
+                    "Converted YAML:",
+                    value=conversion['yaml'],
+                    height=500,
+                    key=f"omni_output_{conversion['key'][:16]}",
+                    label_visibility="collapsed"
+                )
+            else:
+                render_preview(conversion)
             
-            # Download button
+            # Download button, the only place the full document is sent
             st.download_button(
                 label="DOWNLOAD YAML",
-                data=omni_yaml,
+                data=conversion['yaml'],
                 file_name="omni_config.yaml",
                 mime="text/yaml"
             )
-        
-        st.success("✅ Conversion successful!")
-        
-    except Exception as e:
-        # Try LLM conversion on error
-        if st.session_state.get('anthropic_api_key') or os.getenv('ANTHROPIC_API_KEY'):
-            with st.spinner("Standard conversion failed. Trying AI-powered conversion..."):
-                llm_result = converter.get_llm_conversion(lookml_input, str(e))
-                if llm_result:
-                    with col2:
-                        st.text_area(
-                            "Converted YAML:",
-                            value=llm_result,
-                            height=500,
-                            key="omni_output",
-                            label_visibility="collapsed"
-                        )
-                        
-                        # Download button
-                        st.download_button(
-                            label="DOWNLOAD YAML",
-                            data=llm_result,
-                            file_name="omni_config.yaml",
-                            mime="text/yaml"
-                        )
-                    
-                    st.success("✅ AI-powered conversion successful!")
-                else:
-                    st.error(f"❌ Both standard and AI conversion failed: {str(e)}")
-        else:
-            st.error(f"❌ Conversion failed: {str(e)}")
-            st.info("💡 Tip: Add an Anthropic API key in the sidebar to enable AI-powered fallback conversion.")
-
-# Handle clear button
-if clear_button:
-    st.rerun()
+    
+    for level, message in conversion['messages']:
+        getattr(st, level)(message)
 
 # Footer
 st.markdown("---")
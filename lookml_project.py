@@ -0,0 +1,234 @@
+"""Project-level LookML conversion with extends, refinement and explore resolution.
+
+Views are collected from every file of a project, then resolved on demand:
+refinement layers (``view: +orders``) are merged onto the base view in file
+order, and ``extends: [...]`` chains are merged parent-first. Each resolved
+view is memoized, so a base view extended by hundreds of others is merged
+once, and fields a child does not override are shared with the parent
+rather than copied. Fields are still converted per view, since Liquid
+filter references and drill_fields sets are qualified by the view that
+outputs them. Sets are inherited and refined the same way, and their
+expansion for drill_fields is memoized per project (field_sets.py).
+Explores from every file feed one indexed join graph (join_graph.py) that
+produces relationships.yaml and a topic per explore.
+
+Scanned views live in a store (project_store.py): in memory by default, or
+in SQLite for projects too large for RAM, in which case the memos here are
+bounded LRUs sized by the store.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from conversion_jobs import ResultCache
+from field_sets import FieldSets
+from join_graph import JoinGraph, dump_yaml, scan_explores
+from omni_converter import LookMLToOmniConverter, count_objects, yaml_output_path
+from project_store import MemoryStore
+
+RELATIONSHIPS_PATH = 'relationships.yaml'
+
+
+def describe_target(target: Tuple[str, Optional[str]]) -> str:
+    """Readable name of an output target from output_paths"""
+    kind, name = target
+    return 'fields outside any view' if kind == 'fields' else f"{kind} '{name}'"
+
+
+class LookMLProject:
+    """Views of a LookML project with memoized extends and refinement resolution"""
+
+    def __init__(self, converter: LookMLToOmniConverter = None, store=None):
+        self.converter = converter or LookMLToOmniConverter()
+        # Base views, refinements and fields outside any view, by name or file path
+        self.store = store if store is not None else MemoryStore()
+        # file path -> names of base views it defines
+        self.files: Dict[str, List[str]] = {}
+        self.file_explores: Dict[str, List[str]] = {}
+        self.join_graph = JoinGraph()
+        self._resolved = ResultCache(self.store.cache_views)
+        self._resolving: List[str] = []
+        # (view name or loose-fields file, field name) -> converted object
+        self._converted = ResultCache(self.store.cache_fields)
+        self.field_sets = FieldSets(self._view_sets)
+
+    def add_file(self, path: str, lookml_code: str) -> List[str]:
+        """Scan one file into the project, returning the names of the base views it defines"""
+        defined = []
+        # Only model files declare explores; skip the second scan for plain view files
+        explores = scan_explores(self.converter, lookml_code) if 'explore:' in lookml_code else []
+        explore_names = set()
+        for explore in explores:
+            if explore['refinement']:
+                continue
+            # Two models defining one explore would silently merge into one topic
+            if explore['name'] in explore_names or self.join_graph.is_defined(explore['name']):
+                raise ValueError(f"Explore '{explore['name']}' is defined more than once")
+            explore_names.add(explore['name'])
+        for view in self.converter.scan_lookml(lookml_code):
+            name = view['name']
+            if name is None:
+                self.store.add_loose(path, view)
+            elif view['refinement']:
+                self.store.add_refinement(view)
+            else:
+                if self.store.has_view(name):
+                    raise ValueError(f"View '{name}' is defined more than once")
+                self.store.add_view(view)
+                defined.append(name)
+        self.files[path] = defined
+        if explores:
+            for explore in explores:
+                self.join_graph.add_explore(explore)
+            self.file_explores[path] = [e['name'] for e in explores if not e['refinement']]
+        # New definitions can change any resolved view, and any set a converted field drills into
+        self._resolved.clear()
+        self._converted.clear()
+        self.field_sets = FieldSets(self._view_sets)
+        return defined
+
+    def resolve(self, name: str) -> Dict[str, Any]:
+        """Resolve a view's refinements and extends into its final props and fields"""
+        found, resolved = self._resolved.get(name)
+        if found:
+            return resolved
+        if name in self._resolving:
+            chain = ' -> '.join(self._resolving[self._resolving.index(name):] + [name])
+            raise ValueError(f"Circular extends: {chain}")
+        if not self.store.has_view(name):
+            raise ValueError(f"View '{name}' is not defined")
+
+        self._resolving.append(name)
+        try:
+            view = self._apply_refinements(name)
+            props: Dict[str, Any] = {}
+            fields: Dict[str, Dict[str, Any]] = {}
+            sets: Dict[str, List[str]] = {}
+            for parent_name in view['extends']:
+                parent = self.resolve(parent_name)
+                props.update(parent['props'])
+                fields.update(parent['fields'])
+                sets.update(parent['sets'])
+            props.pop('extension', None)
+            props.update(view['props'])
+            self._merge_fields(fields, view['fields'])
+            sets.update(view['sets'])
+        finally:
+            self._resolving.pop()
+
+        resolved = {'name': name, 'props': props, 'fields': fields, 'sets': sets}
+        self._resolved.put(name, resolved)
+        return resolved
+
+    def _apply_refinements(self, name: str) -> Dict[str, Any]:
+        """Merge the refinement layers of a view onto its base definition, in file order"""
+        base = self.store.view(name)
+        layers = self.store.refinements(name)
+        if not layers:
+            return base
+        merged = {
+            'name': name,
+            'refinement': False,
+            'extends': list(base['extends']),
+            'props': dict(base['props']),
+            'fields': dict(base['fields']),
+            'sets': dict(base['sets']),
+        }
+        for layer in layers:
+            # extends in a refinement add to the view's existing extends
+            merged['extends'].extend(e for e in layer['extends'] if e not in merged['extends'])
+            merged['props'].update(layer['props'])
+            merged['sets'].update(layer['sets'])
+            self._merge_fields(merged['fields'], layer['fields'])
+        return merged
+
+    def _view_sets(self, name: Optional[str]) -> Dict[str, List[str]]:
+        """Resolved sets of a view, for FieldSets; sets outside any view are not shared across files"""
+        if name is None or not self.store.has_view(name):
+            return {}
+        return self.resolve(name)['sets']
+
+    def _merge_fields(self, fields: Dict[str, Dict[str, Any]], overrides: Dict[str, Dict[str, Any]]):
+        """Overlay field definitions; only overridden fields get new dicts, the rest stay shared"""
+        for field_name, field in overrides.items():
+            existing = fields.get(field_name)
+            if existing is None:
+                fields[field_name] = field
+            else:
+                fields[field_name] = {
+                    'type': field['type'],
+                    'props': {**existing['props'], **field['props']},
+                }
+
+    def _build_result(self, fields: Dict[str, Dict[str, Any]], view_props: Dict[str, Any] = None,
+                      view_name: str = None, path: str = None) -> Dict[str, Any]:
+        """Convert resolved fields into the structure convert_to_yaml expects
+
+        path names the file of fields outside any view, which key the memo by file.
+        """
+        converter = self.converter
+        result = converter._empty_result()
+        for field_name, field in fields.items():
+            obj_type, props = field['type'], field['props']
+            if obj_type == 'parameter':
+                result['parameters'][field_name] = props
+                continue
+            key = (view_name, path, field_name)
+            found, converted = self._converted.get(key)
+            if not found:
+                converted = converter.convert_object(obj_type, field_name, props, view_name, self.field_sets)
+                self._converted.put(key, converted)
+            plural_type, output_name, converted_props = converted
+            result[plural_type][output_name] = converted_props
+        converter._convert_parameters_to_filters(result)
+        count_objects(field['type'] for field in fields.values())
+        if view_props:
+            result['view'] = converter.convert_view_properties(view_props, view_name)
+        return result
+
+    def convert_view(self, name: str) -> str:
+        """Convert a resolved view to Omni YAML"""
+        resolved = self.resolve(name)
+        return self.converter.convert_to_yaml(self._build_result(resolved['fields'], resolved['props'], name))
+
+    def output_paths(self, path: str) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Map each YAML output of a source file to what it is built from: (kind, name)
+
+        kind is 'fields' for fields outside any view, 'view' or 'topic'. Raises
+        ValueError when two of them would be written to the same path, e.g.
+        loose fields in orders.view.lkml and the view orders defined there.
+        """
+        outputs: Dict[str, Tuple[str, Optional[str]]] = {}
+        targets = []
+        if self.store.has_loose(path):
+            targets.append((yaml_output_path(path), ('fields', None)))
+        directory = os.path.dirname(path)
+        for name in self.files.get(path, []):
+            # Views marked extension: required only exist to be extended
+            if self.store.view(name)['props'].get('extension') == 'required':
+                continue
+            targets.append((os.path.join(directory, f"{name}.view.yaml"), ('view', name)))
+        for name in self.file_explores.get(path, []):
+            targets.append((os.path.join(directory, f"{name}.topic.yaml"), ('topic', name)))
+        for output, target in targets:
+            if output in outputs:
+                raise ValueError(f"{describe_target(outputs[output])} and {describe_target(target)} "
+                                 f"would both be written to {output}")
+            outputs[output] = target
+        return outputs
+
+    def project_outputs(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Outputs built from the whole project rather than one file"""
+        if self.join_graph.edges:
+            return {RELATIONSHIPS_PATH: ('relationships', None)}
+        return {}
+
+    def convert_output(self, path: str, target: Tuple[str, Optional[str]]) -> str:
+        """Convert one output, as listed by output_paths or project_outputs"""
+        kind, name = target
+        if kind == 'fields':
+            return self.converter.convert_to_yaml(self._build_result(self.store.loose(path)['fields'], path=path))
+        if kind == 'view':
+            return self.convert_view(name)
+        if kind == 'topic':
+            return dump_yaml(self.join_graph.topic(name))
+        return dump_yaml(self.join_graph.relationships())
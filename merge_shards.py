@@ -0,0 +1,179 @@
+"""Merge the outputs of a sharded batch conversion into one output directory.
+
+    python batch_convert.py repo/ -o shards/1 --shard 1/3     (one per node)
+    python merge_shards.py shards/1 shards/2 shards/3 -o omni_yaml/
+
+The merge is refused, and nothing is written, unless the shards are
+complete and consistent: every shard of the run is present exactly once,
+all shards converted the same source files with the same content and rename
+rules, no shard reported errors, no output was written by two shards with
+different content, and every output file still has the hash its shard
+recorded. The merged directory gets the same manifest as an unsharded run,
+so it can be converted into incrementally or pushed with omni_push.py.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+from batch_convert import (
+    SHARD_MANIFEST_NAME, file_matches, load_manifest, manifest_entry, save_manifest,
+    shard_of, write_atomic
+)
+
+
+class ShardError(Exception):
+    """A shard directory without a readable shard manifest"""
+
+
+def load_shard(directory: str) -> Dict[str, Any]:
+    """Shard manifest written by batch_convert.py --shard"""
+    path = os.path.join(directory, SHARD_MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            shard = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ShardError(f"{directory}: no readable {SHARD_MANIFEST_NAME}: {e}")
+    shard['directory'] = directory
+    return shard
+
+
+def check_shards(shards: List[Dict[str, Any]]) -> List[str]:
+    """Problems that make the shards incomplete or inconsistent; empty when they can be merged"""
+    problems = []
+    counts = {shard['shards'] for shard in shards}
+    if len(counts) > 1:
+        return [f"shards disagree on the number of shards: {sorted(counts)}"]
+    total = counts.pop()
+    seen: Dict[int, str] = {}
+    for shard in shards:
+        if shard['shard'] in seen:
+            problems.append(f"shard {shard['shard']}/{total} given twice: {seen[shard['shard']]} and {shard['directory']}")
+        seen[shard['shard']] = shard['directory']
+    missing = [str(index) for index in range(1, total + 1) if index not in seen]
+    if missing:
+        problems.append(f"missing shard(s) {', '.join(missing)} of {total}")
+
+    # Every node must have converted the same version of the project
+    reference = shards[0]
+    for shard in shards[1:]:
+        if shard['rules'] != reference['rules']:
+            problems.append(f"{shard['directory']} used different rename rules than {reference['directory']}")
+        if shard['sources'] != reference['sources']:
+            differing = sorted(path for path in set(shard['sources']) | set(reference['sources'])
+                               if shard['sources'].get(path) != reference['sources'].get(path))
+            problems.append(f"{shard['directory']} and {reference['directory']} converted different sources: "
+                            f"{', '.join(differing[:5])}{' ...' if len(differing) > 5 else ''}")
+
+    for shard in shards:
+        for error in shard['errors']:
+            problems.append(f"{shard['directory']}: {error['path']}: {error['error']}")
+        for output, entry in shard['outputs'].items():
+            # An output in the wrong shard means the nodes assigned files differently
+            owner = shard_of(output, total)
+            if owner != shard['shard']:
+                problems.append(f"{shard['directory']}: {output} belongs to shard {owner}, not {shard['shard']}")
+    return problems
+
+
+def collect_outputs(shards: List[Dict[str, Any]]) -> Tuple[Dict[str, Tuple[str, str]], List[str]]:
+    """Output path -> (shard directory, hash), and conflicts between shards"""
+    outputs: Dict[str, Tuple[str, str]] = {}
+    conflicts = []
+    for shard in shards:
+        for output, entry in shard['outputs'].items():
+            existing = outputs.get(output)
+            if existing is None:
+                outputs[output] = (shard['directory'], entry['hash'])
+            elif existing[1] != entry['hash']:
+                conflicts.append(f"{output} differs between {existing[0]} and {shard['directory']}")
+    return outputs, conflicts
+
+
+def merge_shards(shard_dirs: List[str], output_dir: str) -> Tuple[Dict[str, int], List[str]]:
+    """Copy the outputs of complete, consistent shards into output_dir
+
+    Returns counts of written, unchanged and deleted outputs, and the
+    problems that stopped the merge; nothing is written when there are any.
+    """
+    counts = {'written': 0, 'unchanged': 0, 'deleted': 0}
+    shards = [load_shard(directory) for directory in shard_dirs]
+    problems = check_shards(shards)
+    outputs, conflicts = collect_outputs(shards)
+    problems.extend(conflicts)
+    # Check every file before writing any, so a damaged shard leaves output_dir untouched
+    for output, (directory, digest) in sorted(outputs.items()):
+        try:
+            matches = file_matches(os.path.join(directory, output), digest, None)
+        except OSError as e:
+            problems.append(f"{directory}: cannot read {output}: {e}")
+            continue
+        if not matches:
+            problems.append(f"{directory}: {output} is missing or does not match its recorded hash")
+    if problems:
+        return counts, problems
+
+    previous = load_manifest(output_dir)
+    manifest: Dict[str, Dict[str, Any]] = {}
+    for output, (directory, digest) in sorted(outputs.items()):
+        destination = os.path.join(output_dir, output)
+        if file_matches(destination, digest, previous.get(output)):
+            counts['unchanged'] += 1
+        else:
+            with open(os.path.join(directory, output), 'rb') as f:
+                write_atomic(destination, f.read())
+            counts['written'] += 1
+        manifest[output] = manifest_entry(destination, digest)
+    for output in previous:
+        if output not in manifest:
+            try:
+                os.remove(os.path.join(output_dir, output))
+                counts['deleted'] += 1
+            except FileNotFoundError:
+                pass
+    if manifest != previous:
+        save_manifest(output_dir, manifest)
+    return counts, []
+
+
+def timing_summary(shard_dirs: List[str], slowest: int = 5) -> List[str]:
+    """Per-shard times and the slowest outputs, to spot badly balanced shards"""
+    shards = [load_shard(directory) for directory in shard_dirs]
+    lines = []
+    for shard in sorted(shards, key=lambda s: s['shard']):
+        seconds = shard['seconds']
+        lines.append(f"shard {shard['shard']}/{shard['shards']}: {len(shard['outputs'])} outputs, "
+                     f"load {seconds['load']:.2f}s, convert {seconds['convert']:.2f}s, total {seconds['total']:.2f}s")
+    outputs = sorted(((entry['seconds'], output) for shard in shards for output, entry in shard['outputs'].items()),
+                     reverse=True)
+    for seconds, output in outputs[:slowest]:
+        lines.append(f"  {seconds:.3f}s  {output}")
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge the output directories of a sharded batch conversion")
+    parser.add_argument('shard_dirs', nargs='+', help="output directories of batch_convert.py --shard runs")
+    parser.add_argument('-o', '--output-dir', required=True, help="directory to write the merged YAML files to")
+    parser.add_argument('--timings', action='store_true', help="print per-shard times and the slowest outputs")
+    args = parser.parse_args(argv)
+
+    try:
+        counts, problems = merge_shards(args.shard_dirs, args.output_dir)
+    except ShardError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if problems:
+        for problem in problems:
+            print(f"error: {problem}", file=sys.stderr)
+        print(f"not merged: {len(problems)} problem(s)", file=sys.stderr)
+        return 1
+    if args.timings:
+        print('\n'.join(timing_summary(args.shard_dirs)))
+    print(f"{counts['written']} written, {counts['unchanged']} unchanged, {counts['deleted']} deleted")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
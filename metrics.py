@@ -0,0 +1,227 @@
+"""Operational metrics in the Prometheus text exposition format.
+
+The converter records conversion latency by input size, objects by type,
+rule-engine vs LLM conversions, LLM request latency and tokens, and cache
+lookups into the process-wide REGISTRY. The Streamlit app serves it over
+HTTP when LOOKML_METRICS_PORT is set, on localhost unless
+LOOKML_METRICS_HOST names another interface; batch runs write it to a file
+(``--metrics-file``) that a node_exporter textfile collector can pick up.
+
+Only the standard library is used, and http.server is imported only when
+the endpoint is started.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+# Upper bounds of the input size label, in bytes
+SIZE_CLASSES = ((10_000, 'lt_10kb'), (100_000, '10kb_100kb'), (1_000_000, '100kb_1mb'))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def size_class(size: int) -> str:
+    """Label for an input size, so latency histograms can be compared across input sizes"""
+    for limit, label in SIZE_CLASSES:
+        if size < limit:
+            return label
+    return 'gt_1mb'
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value: str) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, list(counts)) for key, counts in self.values.items())
+        lines = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {counts[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative:g}")
+        return lines
+
+
+class Registry:
+    """Metrics rendered together in the text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+CONVERSION_SECONDS = REGISTRY.register(Histogram(
+    'lookml_conversion_seconds', "Time to convert one input, by engine and input size",
+    ('engine', 'size')))
+CONVERSIONS = REGISTRY.register(Counter(
+    'lookml_conversions_total', "Conversion requests by engine (rules, or llm when the rule engine fell short) and outcome",
+    ('engine', 'outcome')))
+OBJECTS = REGISTRY.register(Counter(
+    'lookml_objects_converted_total', "LookML objects converted by the rule engine, by type",
+    ('type',)))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'lookml_llm_request_seconds', "Latency of one Anthropic API request, continuations included separately"))
+LLM_TOKENS = REGISTRY.register(Counter(
+    'lookml_llm_tokens_total', "Anthropic API tokens used, by direction (input or output)",
+    ('direction',)))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'lookml_cache_lookups_total', "Conversion cache lookups by cache and result (hit or miss)",
+    ('cache', 'result')))
+JOB_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'lookml_job_wait_seconds', "Time app conversions wait in the queue for a free worker"))
+
+
+def write_metrics_file(path: str, registry: Registry = REGISTRY):
+    """Write the metrics atomically, so a collector never reads a partial file
+
+    The file is world-readable, since the textfile collector usually runs as
+    another user, and a failed write leaves no temporary file for it to find.
+    """
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class MetricsFileWriter:
+    """Rewrite a metrics file every interval seconds on a background thread, and once more on stop"""
+
+    def __init__(self, path: str, interval: float = 10.0, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            write_metrics_file(self.path, self.registry)
+
+    def start(self) -> 'MetricsFileWriter':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        write_metrics_file(self.path, self.registry)
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1', registry: Registry = REGISTRY) -> Any:
+    """Serve GET /metrics on a daemon thread, returning the server; local-only unless host says otherwise"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
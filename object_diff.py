@@ -0,0 +1,281 @@
+"""Structural diff of converted Omni YAML, field by field.
+
+    python object_diff.py snapshot omni_yaml/ -o before.json
+    python object_diff.py diff before.json omni_yaml/
+    python object_diff.py diff old_yaml/ new_yaml/ --json changes.json --cache
+
+Every object in the output (a dimension, measure or filter, a relationship,
+or a file's top-level properties) gets a hash of its properties, and hashes
+roll up Merkle-style into one per section, per file and per project. Hashes
+ignore property and object order, so reordered output is not a change.
+Diffing compares the rollups top-down and skips any subtree whose hashes
+match, so identical projects compare in O(1) and the work grows with the
+number of changes, not the size of the project. Changes are reported per
+property.
+
+A directory is snapshotted by splitting each YAML file on indentation, the
+layout the converter writes. The snapshot command, and diff with --cache,
+also cache the snapshot in the directory; a plain diff writes nothing. A
+file is not read again while its size and mtime still match the cached
+snapshot or the batch manifest. Any other file, such as one edited by hand,
+is read and hashed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from batch_convert import content_hash, load_manifest, save_manifest
+
+# Snapshot of a directory, cached next to the outputs it describes
+SNAPSHOT_NAME = '.omni_objects.json'
+SNAPSHOT_VERSION = 1
+# Top-level sections whose entries are objects
+OBJECT_SECTIONS = ('dimensions', 'measures', 'filters')
+# Section and object holding a file's top-level properties
+TOP_LEVEL = ''
+
+
+def rollup(children: Dict[str, str]) -> str:
+    """Hash of a node from its children's names and hashes, in any order"""
+    digest = hashlib.sha256()
+    for name in sorted(children):
+        digest.update(f"{name}\0{children[name]}\n".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def _entries(lines: List[str], indent: int) -> List[Tuple[str, List[str]]]:
+    """Split lines into entries that start at exactly indent spaces: (first line, continuation lines)"""
+    entries: List[Tuple[str, List[str]]] = []
+    for line in lines:
+        stripped = line.lstrip(' ')
+        if not stripped or stripped.startswith('#'):
+            # Blank and comment lines only ever continue an entry, e.g. inside a block scalar
+            if entries:
+                entries[-1][1].append(line)
+            continue
+        if len(line) - len(stripped) <= indent:
+            entries.append((stripped, []))
+        elif entries:
+            entries[-1][1].append(line)
+    return entries
+
+
+def _property(first: str, rest: List[str], indent: int) -> Tuple[str, str]:
+    """Key and value text of one property entry"""
+    key, _, value = first.partition(':')
+    lines = [value.strip()] + [line[indent:] if line[:indent].isspace() else line.strip() for line in rest]
+    return key.strip().strip('\'"'), '\n'.join(lines).strip()
+
+
+def _properties(lines: List[str], indent: int) -> Dict[str, str]:
+    return dict(_property(first, rest, indent) for first, rest in _entries(lines, indent))
+
+
+def parse_objects(text: str) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """Section -> object name -> property -> value text of one converted YAML file"""
+    sections: Dict[str, Dict[str, Dict[str, str]]] = {}
+    top_level: Dict[str, str] = {}
+    for position, (first, rest) in enumerate(_entries(text.split('\n'), 0)):
+        if first.startswith('- '):
+            # A top-level list: relationships.yaml, keyed by the views each join connects
+            item = _properties([first[2:]] + [line[2:] for line in rest], 0)
+            if 'join_from_view' in item and 'join_to_view' in item:
+                name = f"{item['join_from_view']} -> {item['join_to_view']}"
+            else:
+                name = f"#{position}"
+            objects = sections.setdefault('relationships', {})
+            while name in objects:
+                name += "'"
+            objects[name] = item
+            continue
+        key, _, value = first.partition(':')
+        if key in OBJECT_SECTIONS and not value.strip():
+            objects = sections.setdefault(key, {})
+            for object_first, object_rest in _entries(rest, 2):
+                objects[object_first.partition(':')[0].strip('\'"')] = _properties(object_rest, 4)
+        else:
+            name, value_text = _property(first, rest, 2)
+            top_level[name] = value_text
+    if top_level:
+        sections[TOP_LEVEL] = {TOP_LEVEL: top_level}
+    return sections
+
+
+def _unchanged(entry: Optional[Dict[str, Any]], stat: os.stat_result) -> bool:
+    """Whether a snapshot or manifest entry was recorded for the file as it is on disk"""
+    return bool(entry) and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+
+
+def file_entry(text: str, digest: str) -> Dict[str, Any]:
+    """Snapshot entry of one file: its content hash and its sections, objects and properties with their hashes"""
+    sections = {}
+    for section, objects in parse_objects(text).items():
+        entries = {name: {'hash': rollup(props), 'props': props} for name, props in objects.items()}
+        sections[section] = {'hash': rollup({name: entry['hash'] for name, entry in entries.items()}),
+                             'objects': entries}
+    return {'content': digest,
+            'hash': rollup({section: entry['hash'] for section, entry in sections.items()}),
+            'sections': sections}
+
+
+def snapshot_directory(output_dir: str, save: bool = False) -> Dict[str, Any]:
+    """Snapshot of every YAML file in output_dir, reusing the cached one for files that did not change
+
+    save writes the snapshot back to the directory's cache when it changed.
+    """
+    previous = load_snapshot(os.path.join(output_dir, SNAPSHOT_NAME)) or {'files': {}}
+    manifest = load_manifest(output_dir)
+    paths = []
+    for root, dirs, files in os.walk(output_dir):
+        dirs.sort()
+        paths.extend(os.path.relpath(os.path.join(root, name), output_dir)
+                     for name in sorted(files) if name.endswith('.yaml') and not name.startswith('.'))
+    files = {}
+    for path in paths:
+        full_path = os.path.join(output_dir, path)
+        stat = os.stat(full_path)
+        cached = previous['files'].get(path)
+        # Hashes are trusted only while the file's size and mtime match when they were taken:
+        # the cached snapshot's own, or the batch manifest's for everything it wrote
+        manifest_entry = manifest.get(path)
+        known = manifest_entry['hash'] if _unchanged(manifest_entry, stat) else None
+        if cached is not None and (_unchanged(cached, stat) or cached['content'] == known):
+            entry = cached
+        else:
+            with open(full_path, 'rb') as f:
+                data = f.read()
+            digest = content_hash(data)
+            entry = cached if cached is not None and cached['content'] == digest \
+                else file_entry(data.decode('utf-8'), digest)
+        files[path] = {**entry, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    snapshot = {'version': SNAPSHOT_VERSION,
+                'root': rollup({path: entry['hash'] for path, entry in files.items()}),
+                'files': files}
+    if save and snapshot != previous:
+        save_manifest(output_dir, snapshot, SNAPSHOT_NAME)
+    return snapshot
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """A saved snapshot, or None if it is missing, unreadable or from another version"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return snapshot if snapshot.get('version') == SNAPSHOT_VERSION else None
+
+
+def load_side(path: str, cache: bool = False) -> Dict[str, Any]:
+    """Snapshot of a diff argument: an output directory or a saved snapshot file"""
+    if os.path.isdir(path):
+        return snapshot_directory(path, save=cache)
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        raise ValueError(f"{path} is neither an output directory nor a snapshot")
+    return snapshot
+
+
+def _diff_objects(path: str, section: str, old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    changes = []
+    for name in sorted(set(old) | set(new)):
+        old_object, new_object = old.get(name), new.get(name)
+        if old_object is None:
+            changes.append({'file': path, 'section': section, 'object': name, 'change': 'added'})
+        elif new_object is None:
+            changes.append({'file': path, 'section': section, 'object': name, 'change': 'removed'})
+        elif old_object['hash'] != new_object['hash']:
+            old_props, new_props = old_object['props'], new_object['props']
+            properties = {key: [old_props.get(key), new_props.get(key)]
+                          for key in sorted(set(old_props) | set(new_props))
+                          if old_props.get(key) != new_props.get(key)}
+            changes.append({'file': path, 'section': section, 'object': name, 'change': 'changed',
+                            'properties': properties})
+    return changes
+
+
+def diff_snapshots(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Added, removed and changed objects, descending only into subtrees whose hashes differ"""
+    if old['root'] == new['root']:
+        return []
+    changes = []
+    empty = {'hash': None, 'sections': {}}
+    for path in sorted(set(old['files']) | set(new['files'])):
+        old_file, new_file = old['files'].get(path, empty), new['files'].get(path, empty)
+        if old_file['hash'] == new_file['hash']:
+            continue
+        for section in sorted(set(old_file['sections']) | set(new_file['sections'])):
+            old_section = old_file['sections'].get(section, {'hash': None, 'objects': {}})
+            new_section = new_file['sections'].get(section, {'hash': None, 'objects': {}})
+            if old_section['hash'] != new_section['hash']:
+                changes.extend(_diff_objects(path, section, old_section['objects'], new_section['objects']))
+    return changes
+
+
+def _shorten(value: Optional[str], limit: int = 120) -> str:
+    if value is None:
+        return '(none)'
+    value = value.replace('\n', '\\n')
+    return value if len(value) <= limit else value[:limit - 3] + '...'
+
+
+def format_changes(changes: List[Dict[str, Any]]) -> List[str]:
+    """Changes as text, grouped by file"""
+    lines = []
+    current = None
+    marks = {'added': '+', 'removed': '-', 'changed': '~'}
+    for change in changes:
+        if change['file'] != current:
+            current = change['file']
+            lines.append(current)
+        label = f"{change['section']}.{change['object']}" if change['section'] else 'top level'
+        lines.append(f"  {marks[change['change']]} {label}")
+        for key, (old_value, new_value) in change.get('properties', {}).items():
+            lines.append(f"      {key}: {_shorten(old_value)} -> {_shorten(new_value)}")
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot converted Omni YAML and diff it field by field")
+    commands = parser.add_subparsers(dest='command', required=True)
+    snapshot_parser = commands.add_parser('snapshot', help="save a snapshot of an output directory")
+    snapshot_parser.add_argument('output_dir', help="directory of converted YAML")
+    snapshot_parser.add_argument('-o', '--output', required=True, help="file to save the snapshot to")
+    diff_parser = commands.add_parser('diff', help="compare two output directories or snapshots")
+    diff_parser.add_argument('old', help="output directory or snapshot file")
+    diff_parser.add_argument('new', help="output directory or snapshot file")
+    diff_parser.add_argument('--json', help="also write the changes to this file as JSON")
+    diff_parser.add_argument('--cache', action='store_true',
+                             help=f"save each directory's snapshot to its {SNAPSHOT_NAME}, to speed up the next diff")
+    args = parser.parse_args(argv)
+
+    if args.command == 'snapshot':
+        snapshot = snapshot_directory(args.output_dir, save=True)
+        directory, name = os.path.split(os.path.abspath(args.output))
+        save_manifest(directory, snapshot, name)
+        print(f"{len(snapshot['files'])} files, root {snapshot['root']}")
+        return 0
+
+    try:
+        old, new = load_side(args.old, args.cache), load_side(args.new, args.cache)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    changes = diff_snapshots(old, new)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(changes, f, indent=1)
+    if changes:
+        print('\n'.join(format_changes(changes)))
+    counts = {kind: sum(1 for change in changes if change['change'] == kind)
+              for kind in ('added', 'removed', 'changed')}
+    print(f"{counts['added']} added, {counts['removed']} removed, {counts['changed']} changed")
+    # Like diff: 1 when the two sides differ
+    return 1 if changes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
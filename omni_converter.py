@@ -0,0 +1,1011 @@
+"""Rule-based LookML to Omni YAML conversion engine.
+
+Kept free of Streamlit so it can be imported cheaply by the UI, the batch CLI
+and CI jobs. The Anthropic SDK is only imported when an LLM conversion runs.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+
+from metrics import CONVERSION_SECONDS, OBJECTS, size_class
+from field_sets import FieldSets
+from liquid_templates import LIQUID_RE, translate_liquid
+from rename_rules import RenameRules
+
+# Patterns are compiled once at import instead of on every parsed line
+# Every pattern is anchored and free of nested or adjacent unbounded repeats, so
+# matching stays linear in the line length (see benchmarks/fuzz_parser.py)
+VIEW_RE = re.compile(r'^view:\s*(\+?)\s*(\w+)\s*{')
+# Anonymous (link: {) and named (filter: date_filter {, explore_source: orders {) blocks
+BLOCK_START_RE = re.compile(r'^\w+:\s*(?:[\w+]+\s*)?{$')
+OBJECT_RE = re.compile(r'^(dimension_group|dimension|measure|parameter):\s*(\w+)\s*{')
+TIMEFRAME_ITEM_RE = re.compile(r'^(\w+),?$')
+TIMEFRAMES_INLINE_RE = re.compile(r'timeframes:\s*\[(.*?)\]')
+SQL_START_RE = re.compile(r'^(sql(?:_\w+)?):\s*(.*)$')
+DERIVED_TABLE_RE = re.compile(r'^derived_table:\s*{$')
+SET_RE = re.compile(r'^set:\s*(\w+)\s*{(.*)$')
+PROPERTY_KEY_RE = re.compile(r'(\w+):')
+# A whole SQL body that is just a column: ${TABLE}.col or ${TABLE}."Col"; used with fullmatch
+TABLE_REF_RE = re.compile(r'\$\{TABLE\}\.(?:"([^"\n]+)"|(\w+))')
+LKML_SUFFIX_RE = re.compile(r'\.lkml$', re.IGNORECASE)
+
+
+def strip_terminator(value: str) -> str:
+    """Remove a trailing ;; and the whitespace around it
+
+    Equivalent to re.sub(r'\\s*;;\\s*$', '', value) but linear: that regex retries
+    every whitespace run in the value and goes quadratic on long lines.
+    """
+    stripped = value.rstrip()
+    if stripped.endswith(';;'):
+        return stripped[:-2].rstrip()
+    return value
+
+
+class ConversionCancelled(Exception):
+    """Raised when a conversion's should_stop callback asks it to stop"""
+
+
+class SqlSpan:
+    """Multi-line SQL held as an offset range into the source LookML
+
+    The body is sliced out of the source once, when it is emitted, so long
+    derived-table SQL is never split, re-joined or copied while parsing, and
+    its line breaks survive into the output.
+    """
+    __slots__ = ('source', 'start', 'end')
+
+    def __init__(self, source: str, start: int, end: int):
+        self.source = source
+        self.start = start
+        self.end = end
+
+    def __str__(self) -> str:
+        return self.source[self.start:self.end].strip()
+
+    def __repr__(self) -> str:
+        return f"SqlSpan({self.start}, {self.end})"
+
+    def search(self, pattern: 're.Pattern') -> Optional['re.Match']:
+        """Search the span in place, without slicing it out of the source"""
+        return pattern.search(self.source, self.start, self.end)
+
+    def fullmatch(self, pattern: 're.Pattern') -> Optional['re.Match']:
+        """Match the whole span, surrounding whitespace aside, in place"""
+        start, end = self.start, self.end
+        while start < end and self.source[start].isspace():
+            start += 1
+        while end > start and self.source[end - 1].isspace():
+            end -= 1
+        return pattern.fullmatch(self.source, start, end)
+
+
+def sql_block_lines(sql: Any) -> list:
+    """Lines of a multi-line SQL body, with the common indentation removed"""
+    lines = str(sql).split('\n')
+    first = lines[0].strip()
+    rest = [line.rstrip() for line in lines[1:]]
+    indents = [len(line) - len(line.lstrip()) for line in rest if line]
+    margin = min(indents) if indents else 0
+    body = [first] if first else []
+    body.extend(line[margin:] for line in rest)
+    return body
+
+
+def parse_list(value: Any) -> list:
+    """Parse a LookML list value such as [a, "b", c] into a list of strings"""
+    if isinstance(value, list):
+        return value
+    value = str(value).strip()
+    if value.startswith('[') and value.endswith(']'):
+        value = value[1:-1]
+    return [item.strip().strip('"') for item in value.split(',') if item.strip()]
+
+
+class LookMLToOmniConverter:
+    """Converter class for transforming LookML to Omni YAML format"""
+    
+    def __init__(self, rules: Optional[RenameRules] = None):
+        self.property_mappings = {
+            'hidden': self._map_hidden,
+            'primary_key': self._map_primary_key,
+            'value_format_name': self._map_value_format,
+            'type': self._map_type,
+        }
+        # Track parameters for filter creation
+        self.parameters = {}
+        # Renames and overrides of converted fields; the bundled file holds the built-in ones
+        self.rules = rules if rules is not None else RenameRules.load()
+        
+    def _map_hidden(self, value: Any) -> Optional[Dict[str, Any]]:
+        """Map hidden property to tags"""
+        if value == 'no' or value is False:
+            return {'tags': ['business_facing']}
+        return None
+    
+    def _map_primary_key(self, value: Any) -> Optional[Dict[str, Any]]:
+        """Map primary_key property"""
+        if value == 'yes' or value is True:
+            return {'primary_key': True}
+        return None
+    
+    def _map_value_format(self, value: str) -> Dict[str, Any]:
+        """Map value_format_name to format"""
+        format_mappings = {
+            'decimal_0': 'NUMBER',
+            'decimal_1': 'NUMBER',
+            'decimal_2': 'NUMBER',
+            'percent_0': 'PERCENT',
+            'percent_1': 'PERCENT',
+            'percent_2': 'PERCENT',
+            'usd': 'CURRENCY',
+            'eur': 'CURRENCY',
+        }
+        return {'format': format_mappings.get(value, value.upper())}
+    
+    def _map_type(self, value: str, object_type: str) -> Optional[Dict[str, Any]]:
+        """Map type property based on object type"""
+        if object_type == 'measure':
+            aggregate_mappings = {
+                'count': 'count',
+                'count_distinct': 'count_distinct',
+                'sum': 'sum',
+                'average': 'avg',
+                'avg': 'avg',
+                'max': 'max',
+                'min': 'min',
+                'median': 'median',
+            }
+            if value in aggregate_mappings:
+                return {'aggregate_type': aggregate_mappings[value]}
+        elif value == 'yesno':
+            return {'type': 'boolean'}
+        return None
+    
+    def parse_lookml(self, lookml_code: str,
+                     on_progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Parse LookML code and convert to structured format
+
+        on_progress(done, total, partial_result) is called after each object with
+        the objects converted so far; should_stop() is checked before each one and
+        ConversionCancelled is raised when it returns true.
+        """
+        result = self._empty_result()
+        views = self.scan_lookml(lookml_code)
+        fields = [(view['name'], name, field) for view in views for name, field in view['fields'].items()]
+        # Sets of every block of this input, with refinements adding to their view's
+        view_sets: Dict[Optional[str], Dict[str, list]] = {}
+        for view in views:
+            view_sets.setdefault(view['name'], {}).update(view['sets'])
+        field_sets = FieldSets(lambda view_name: view_sets.get(view_name, {}))
+        total = len(fields)
+        for done, (view_name, name, field) in enumerate(fields, start=1):
+            if should_stop is not None and should_stop():
+                raise ConversionCancelled(f"Cancelled after {done - 1} of {total} objects")
+            self._save_object(result, field['type'], name, field['props'], view_name, field_sets)
+            if on_progress is not None:
+                on_progress(done, total, result)
+        count_objects(field['type'] for _, _, field in fields)
+        
+        # Convert parameters to filters
+        self._convert_parameters_to_filters(result)
+        
+        return result
+    
+    def _empty_result(self) -> Dict[str, Any]:
+        """Empty parse result with one section per object type"""
+        return {
+            'dimensions': {},
+            'dimension_groups': {},
+            'measures': {},
+            'parameters': {},
+            'filters': {}
+        }
+    
+    def scan_lookml(self, lookml_code: str) -> list:
+        """Scan LookML into views holding raw, unconverted field properties
+        
+        Each view is a dict with name, refinement, extends, props, fields
+        (field name -> {'type', 'props'}) and sets (set name -> field
+        references). Fields outside any view block are collected in a view
+        named None.
+        """
+        lines = lookml_code.split('\n')
+        loose_view = self._new_view(None)
+        views = [loose_view]
+        current_view = loose_view
+        
+        current_object = None
+        current_type = None
+        current_props = {}
+        in_timeframes = False
+        timeframes_list = []
+        in_case = False
+        case_depth = 0
+        in_block = False
+        block_depth = 0
+        in_sql = False
+        sql_start = 0
+        sql_key = None
+        sql_target = None
+        derived_table = None
+        in_allowed_value = False
+        allowed_values = []
+        current_allowed_value = {}
+        current_set = None
+        set_text = []
+        list_key = None
+        list_items = []
+        
+        offset = 0
+        for line in lines:
+            line_start = offset
+            offset += len(line) + 1
+            trimmed = line.strip()
+            
+            # Skip empty lines and comments
+            if not trimmed or trimmed.startswith('#'):
+                continue
+            
+            # Check for view and object declarations
+            view_match = VIEW_RE.match(trimmed)
+            object_match = OBJECT_RE.match(trimmed) if not view_match else None
+            
+            if view_match or object_match:
+                # A new declaration closes anything the previous one left open, so
+                # malformed input cannot swallow the rest of the file
+                if in_sql:
+                    sql_target[sql_key] = SqlSpan(lookml_code, sql_start, line_start)
+                    in_sql = False
+                if in_timeframes:
+                    current_props['timeframes'] = timeframes_list
+                    in_timeframes = False
+                    timeframes_list = []
+                if list_key is not None:
+                    current_props[list_key] = '[' + ' '.join(list_items) + ']'
+                    list_key = None
+                    list_items = []
+                in_case = False
+                in_block = False
+                in_allowed_value = False
+                current_set = None
+                derived_table = None
+                if current_object and current_type:
+                    self._store_field(current_view, current_type, current_object, current_props, allowed_values)
+                    allowed_values = []
+                current_object = None
+                current_type = None
+                current_props = {}
+                if view_match:
+                    current_view = self._new_view(view_match.group(2), refinement=bool(view_match.group(1)))
+                    views.append(current_view)
+                else:
+                    current_type = object_match.group(1)
+                    current_object = object_match.group(2)
+            elif current_set is not None:
+                # set: name { fields: [...] } may span any number of lines
+                set_text.append(trimmed)
+                if '}' in trimmed:
+                    self._store_set(current_view, current_set, set_text)
+                    current_set = None
+            elif (not current_object and not in_sql and not in_block and not in_case
+                  and derived_table is None and SET_RE.match(trimmed)):
+                set_match = SET_RE.match(trimmed)
+                set_text = [set_match.group(2)]
+                if '}' in set_match.group(2):
+                    self._store_set(current_view, set_match.group(1), set_text)
+                else:
+                    current_set = set_match.group(1)
+            elif list_key is not None:
+                # Items of a list property opened with [ on an earlier line
+                items, closed, _ = trimmed.partition(']')
+                list_items.append(items)
+                if closed:
+                    current_props[list_key] = '[' + ' '.join(list_items) + ']'
+                    list_key = None
+                    list_items = []
+            elif trimmed == '}':
+                if in_sql:
+                    # Unterminated SQL ends with its object
+                    sql_target[sql_key] = SqlSpan(lookml_code, sql_start, line_start)
+                    in_sql = False
+                if in_allowed_value:
+                    if 'value' in current_allowed_value:
+                        allowed_values.append(current_allowed_value)
+                    current_allowed_value = {}
+                    in_allowed_value = False
+                elif in_case and case_depth > 0:
+                    case_depth -= 1
+                    if case_depth <= 0:
+                        in_case = False
+                elif in_block:
+                    block_depth -= 1
+                    if block_depth <= 0:
+                        in_block = False
+                elif in_timeframes:
+                    in_timeframes = False
+                    current_props['timeframes'] = timeframes_list
+                    timeframes_list = []
+                elif derived_table is not None:
+                    derived_table = None
+                elif current_object:
+                    # End of the field
+                    self._store_field(current_view, current_type, current_object, current_props, allowed_values)
+                    allowed_values = []
+                    current_object = None
+                    current_type = None
+                    current_props = {}
+                elif current_view is not loose_view:
+                    # End of the view
+                    current_view = loose_view
+            elif in_allowed_value:
+                # Parse allowed_value properties
+                if '{' in trimmed:
+                    continue
+                prop = self._parse_property(trimmed)
+                if prop:
+                    key, value = prop
+                    current_allowed_value[key] = value
+            elif in_case or in_block:
+                # Net braces, so ${TABLE} references and one-line { ... } blocks leave the depth alone
+                depth_change = trimmed.count('{') - trimmed.count('}')
+                if in_case:
+                    case_depth += depth_change
+                    in_case = case_depth > 0
+                else:
+                    block_depth += depth_change
+                    in_block = block_depth > 0
+                # Skip case and other nested block content for now
+                continue
+            elif current_object and trimmed == 'case: {':
+                in_case = True
+                case_depth = 1
+            elif current_object and trimmed == 'allowed_value: {':
+                in_allowed_value = True
+            elif trimmed == 'timeframes: [':
+                in_timeframes = True
+            elif in_timeframes:
+                if trimmed.startswith(']'):
+                    in_timeframes = False
+                    current_props['timeframes'] = timeframes_list
+                    timeframes_list = []
+                    continue
+                # Extract timeframe values
+                tf_match = TIMEFRAME_ITEM_RE.match(trimmed)
+                if tf_match:
+                    timeframes_list.append(tf_match.group(1))
+            elif current_object or current_view is not loose_view:
+                # Properties belong to the open field, the view's derived_table
+                # block, or the view between fields
+                if current_object:
+                    target_props = current_props
+                elif derived_table is not None:
+                    target_props = derived_table
+                else:
+                    target_props = current_view['props']
+                # Check if we're in a multi-line SQL statement
+                if in_sql:
+                    # The body ends just before the ;; that terminates it
+                    if trimmed.endswith(';;'):
+                        sql_end = line_start + len(line.rstrip()) - 2
+                        sql_target[sql_key] = SqlSpan(lookml_code, sql_start, sql_end)
+                        in_sql = False
+                        sql_key = None
+                elif not current_object and derived_table is None and DERIVED_TABLE_RE.match(trimmed):
+                    derived_table = current_view['props'].setdefault('derived_table', {})
+                elif BLOCK_START_RE.match(trimmed):
+                    # Nested blocks such as link: { ... }, filter: name { ... } or
+                    # explore_source: name { ... }, whose closing } must not end the view
+                    in_block = True
+                    block_depth = 1
+                else:
+                    # Check if this line starts a SQL statement
+                    sql_match = SQL_START_RE.match(trimmed)
+                    if sql_match:
+                        sql_key = sql_match.group(1)
+                        sql_value = sql_match.group(2)
+                        
+                        # Check if it's a complete SQL statement
+                        if sql_value.endswith(';;'):
+                            sql_value = strip_terminator(sql_value)
+                            target_props[sql_key] = sql_value
+                        else:
+                            # Start of multi-line SQL; only its offset is kept
+                            in_sql = True
+                            sql_target = target_props
+                            indent = len(line) - len(line.lstrip())
+                            sql_start = line_start + indent + sql_match.start(2)
+                    else:
+                        # Parse regular property lines
+                        prop = self._parse_property(trimmed)
+                        if prop:
+                            key, value = prop
+                            if (current_object and isinstance(value, str) and value.startswith('[')
+                                    and ']' not in value):
+                                # A list continued on the following lines
+                                list_key = key
+                                list_items = [value[1:]]
+                            elif not current_object and key == 'extends':
+                                current_view['extends'] = parse_list(value)
+                            else:
+                                target_props[key] = value
+        
+        # Save last object
+        if in_sql:
+            sql_target[sql_key] = SqlSpan(lookml_code, sql_start, len(lookml_code))
+        if in_timeframes:
+            current_props['timeframes'] = timeframes_list
+        if list_key is not None:
+            current_props[list_key] = '[' + ' '.join(list_items) + ']'
+        if current_object and current_type:
+            self._store_field(current_view, current_type, current_object, current_props, allowed_values)
+        
+        if not loose_view['fields']:
+            views.remove(loose_view)
+        return views
+    
+    def _new_view(self, name: Optional[str], refinement: bool = False) -> Dict[str, Any]:
+        """Empty scanned view"""
+        return {'name': name, 'refinement': refinement, 'extends': [], 'props': {}, 'fields': {}, 'sets': {}}
+    
+    def _store_set(self, view: Dict[str, Any], name: str, lines: list):
+        """Attach a scanned set to its view; a set without a fields list is empty"""
+        _, found, rest = ' '.join(lines).partition('fields:')
+        rest = rest.lstrip()
+        if not found or not rest.startswith('['):
+            view['sets'][name] = []
+            return
+        view['sets'][name] = parse_list(rest[1:].partition(']')[0])
+    
+    def _store_field(self, view: Dict[str, Any], obj_type: str, name: str, props: Dict[str, Any],
+                     allowed_values: list):
+        """Attach a scanned field to its view"""
+        if allowed_values:
+            props['allowed_values'] = allowed_values
+        view['fields'][name] = {'type': obj_type, 'props': props}
+    
+    def _convert_parameters_to_filters(self, result: Dict[str, Any]):
+        """Convert LookML parameters to Omni filters"""
+        if 'parameters' in result and result['parameters']:
+            for param_name, param_props in result['parameters'].items():
+                filter_props = {}
+                
+                # Basic properties
+                if 'label' in param_props:
+                    filter_props['label'] = param_props['label']
+                if 'description' in param_props:
+                    filter_props['description'] = param_props['description']
+                
+                # Type is always string for filters
+                filter_props['type'] = 'string'
+                
+                # Convert allowed_values to suggestion_list
+                if 'allowed_values' in param_props:
+                    suggestion_list = []
+                    for av in param_props['allowed_values']:
+                        if 'value' in av:
+                            suggestion_list.append({'value': av['value']})
+                    if suggestion_list:
+                        filter_props['suggestion_list'] = suggestion_list
+                
+                # Handle default_value
+                if 'default_value' in param_props:
+                    filter_props['default_filter'] = {'is': param_props['default_value']}
+                
+                result['filters'][param_name] = filter_props
+    
+    def _parse_property(self, line: str) -> Optional[Tuple[str, Any]]:
+        """Parse a property line"""
+        # Handle timeframes array in single line
+        timeframes_match = TIMEFRAMES_INLINE_RE.match(line)
+        if timeframes_match:
+            timeframes = [t.strip() for t in timeframes_match.group(1).split(',')]
+            return ('timeframes', timeframes)
+        
+        # Handle regular properties
+        match = PROPERTY_KEY_RE.match(line)
+        if match and match.end() < len(line):
+            key = match.group(1)
+            value = line[match.end():].strip()
+            
+            # Remove trailing semicolons
+            value = strip_terminator(value)
+            
+            # Handle quoted values
+            if value.startswith('"') and value.endswith('"'):
+                value = value[1:-1]
+            
+            # Convert boolean values
+            if value in ('yes', 'true'):
+                value = True
+            elif value in ('no', 'false'):
+                value = False
+            
+            return (key, value)
+        
+        return None
+    
+    def _save_object(self, result: Dict, obj_type: str, name: str, props: Dict[str, Any], view_name: str = None,
+                     field_sets: Optional[FieldSets] = None):
+        """Save parsed object to result"""
+        if obj_type == 'parameter':
+            # Parameters keep their raw properties; they are converted to filters afterwards
+            result['parameters'][name] = props
+            return
+        plural_type, output_name, converted_props = self.convert_object(obj_type, name, props, view_name,
+                                                                        field_sets)
+        result[plural_type][output_name] = converted_props
+    
+    def convert_object(self, obj_type: str, name: str, props: Dict[str, Any], view_name: str = None,
+                       field_sets: Optional[FieldSets] = None) -> Tuple[str, str, Dict[str, Any]]:
+        """Convert one object's raw properties, returning (section, output name, converted properties)
+
+        view_name qualifies the filters that Liquid parameter references become;
+        field_sets expands set references in drill_fields, which are dropped without it.
+        """
+        plural_type = obj_type + 's'
+        if obj_type == 'dimension_group':
+            plural_type = 'dimensions'  # dimension_groups go under dimensions in the output
+        
+        converted_props = {}
+        
+        # First, handle SQL field which is critical
+        if 'sql' in props:
+            sql_value = props['sql']
+            # Only SQL that is nothing but a field reference like ${TABLE}."FIELD" or
+            # ${TABLE}.FIELD becomes a column; anything around it keeps the SQL as written
+            if isinstance(sql_value, SqlSpan):
+                table_ref_match = sql_value.fullmatch(TABLE_REF_RE)
+            else:
+                table_ref_match = TABLE_REF_RE.fullmatch(sql_value.strip())
+            if table_ref_match:
+                # Quoted or not in the original, the column is always quoted in the output
+                field_name = table_ref_match.group(1) or table_ref_match.group(2)
+                converted_props['sql'] = f'"{field_name}"'
+            elif isinstance(sql_value, SqlSpan):
+                # Multi-line SQL already excludes its ;; and is emitted as a block
+                converted_props['sql'] = sql_value
+            else:
+                # For CASE statements and other SQL, keep as is but remove ;;
+                sql_cleaned = sql_value.replace(';;', '').strip()
+                # Don't add quotes to complex SQL
+                converted_props['sql'] = sql_cleaned
+            converted_props['sql'] = self._translate_liquid(converted_props['sql'], view_name, True)
+        
+        # Handle label
+        if 'label' in props:
+            converted_props['label'] = self._translate_liquid(props['label'], view_name)
+        
+        # Handle group_label - clean up extra spaces
+        if 'group_label' in props:
+            group_label = props['group_label'].strip()
+            # Remove leading spaces that might be used for visual hierarchy
+            if group_label.startswith('  '):
+                group_label = group_label.strip()
+            converted_props['group_label'] = group_label
+        
+        # Handle description
+        if 'description' in props:
+            converted_props['description'] = props['description']
+        else:
+            # Add placeholder description based on label or name
+            label = converted_props.get('label', name.replace('_', ' ').title())
+            converted_props['description'] = f"{label}"
+        
+        # Handle common parameters for both dimensions and measures
+        
+        # format parameter
+        if 'value_format' in props:
+            converted_props['format'] = props['value_format']
+        elif 'value_format_name' in props:
+            format_mapping = {
+                'decimal_0': 'NUMBER',
+                'decimal_1': 'NUMBER_1',
+                'decimal_2': 'NUMBER_2',
+                'percent_0': 'PERCENT',
+                'percent_1': 'PERCENT_1',
+                'percent_2': 'PERCENT_2',
+                'usd': 'CURRENCY',
+                'usd_0': 'CURRENCY',
+                'eur': 'EURCURRENCY',
+                'gbp': 'GBPCURRENCY',
+                # Add more format mappings based on examples
+                'id': 'ID',
+                'string': 'STRING',
+            }
+            converted_props['format'] = format_mapping.get(props['value_format_name'], props['value_format_name'].upper())
+        
+        # Handle type for dimensions
+        if obj_type == 'dimension':
+            if 'type' in props:
+                dimension_type = props['type']
+                # Special handling for ID fields
+                if name.endswith('_id') and dimension_type == 'string':
+                    converted_props['format'] = 'ID'
+                # Handle _sk fields (surrogate keys)
+                elif name.endswith('_sk'):
+                    converted_props['format'] = 'ID'
+                # yesno becomes boolean in Omni
+                elif dimension_type == 'yesno':
+                    # Note: yesno dimensions don't get a type in output
+                    pass
+                # number type gets specific format
+                elif dimension_type == 'number' and 'format' not in converted_props:
+                    converted_props['format'] = 'NUMBER'
+                # time dimensions
+                elif dimension_type == 'time':
+                    # Time dimensions are handled as dimension_groups
+                    pass
+            
+            # Handle dimension-specific parameters
+            if 'primary_key' in props and props['primary_key'] in ['yes', True]:
+                converted_props['primary_key'] = True
+            
+            # timeframes for date dimensions
+            if 'timeframes' in props:
+                converted_props['timeframes'] = props['timeframes']
+            
+            # convert_tz
+            if 'convert_tz' in props:
+                converted_props['convert_tz'] = props['convert_tz'] == 'yes' or props['convert_tz'] is True
+        
+        # Handle hidden property
+        if 'hidden' in props:
+            if props['hidden'] in ['yes', True]:
+                converted_props['hidden'] = True
+            elif props['hidden'] in ['no', False]:
+                # Don't add hidden field if it's explicitly set to 'no'
+                pass
+        
+        # tags - only add if explicitly defined in LookML
+        if 'tags' in props:
+            # Ensure tags is always a list
+            if isinstance(props['tags'], str):
+                converted_props['tags'] = [props['tags']]
+            elif isinstance(props['tags'], list):
+                converted_props['tags'] = props['tags']
+            else:
+                converted_props['tags'] = [str(props['tags'])]
+        
+        # links
+        if 'link' in props or 'links' in props:
+            links = props.get('links', props.get('link', []))
+            if not isinstance(links, list):
+                links = [links]
+            converted_props['links'] = links
+        
+        # drill_fields
+        if 'drill_fields' in props and props['drill_fields']:
+            drill_fields = parse_list(props['drill_fields'])
+            if field_sets is not None:
+                drill_fields = field_sets.expand_references(view_name, drill_fields)
+            else:
+                # Omni has no sets, so references like [detail*] need the set definitions
+                drill_fields = [f for f in drill_fields if '*' not in f]
+            if drill_fields:
+                converted_props['drill_fields'] = drill_fields
+        
+        # suggest_from_field
+        if 'suggest_from_field' in props:
+            converted_props['suggest_from_field'] = props['suggest_from_field']
+        
+        # suggestion_list
+        if 'suggestion_list' in props:
+            converted_props['suggestion_list'] = props['suggestion_list']
+        elif 'suggestions' in props:
+            # Convert suggestions to suggestion_list format
+            converted_props['suggestion_list'] = props['suggestions']
+        
+        # order_by_field
+        if 'order_by_field' in props:
+            converted_props['order_by_field'] = props['order_by_field']
+        
+        # display_order
+        if 'display_order' in props:
+            converted_props['display_order'] = props['display_order']
+        
+        # view_label
+        if 'view_label' in props:
+            converted_props['view_label'] = props['view_label']
+        
+        # For measures, handle special cases
+        if obj_type == 'measure':
+            # Handle aggregate type
+            if 'type' in props:
+                measure_type = props['type']
+                if measure_type == 'count_distinct':
+                    converted_props['aggregate_type'] = 'count_distinct'
+                elif measure_type == 'sum':
+                    converted_props['aggregate_type'] = 'sum'
+                elif measure_type == 'sum_distinct':
+                    converted_props['aggregate_type'] = 'sum_distinct_on'
+                elif measure_type == 'count':
+                    converted_props['aggregate_type'] = 'count'
+                elif measure_type == 'average':
+                    converted_props['aggregate_type'] = 'avg'
+                elif measure_type == 'max':
+                    converted_props['aggregate_type'] = 'max'
+                elif measure_type == 'min':
+                    converted_props['aggregate_type'] = 'min'
+                elif measure_type == 'median':
+                    converted_props['aggregate_type'] = 'median'
+                elif measure_type == 'list':
+                    converted_props['aggregate_type'] = 'list'
+                # If type is 'number', it's a calculated measure, no aggregate_type
+            
+            # Handle sql_distinct_key -> custom_primary_key_sql
+            if 'sql_distinct_key' in props:
+                distinct_key = props['sql_distinct_key']
+                if not isinstance(distinct_key, SqlSpan):
+                    distinct_key = distinct_key.replace(';;', '').strip()
+                # Just keep the field reference as-is, don't add table prefixes
+                converted_props['custom_primary_key_sql'] = distinct_key
+            
+            # filters for filtered measures
+            if 'filters' in props:
+                converted_props['filters'] = props['filters']
+            
+            # drill_queries
+            if 'drill_queries' in props:
+                converted_props['drill_queries'] = props['drill_queries']
+            
+            # Handle view_label (special case - comes from file level)
+            if 'view_label' in props:
+                converted_props['view_label'] = props['view_label']
+            
+            # Handle measure-specific format mappings
+            if 'format' not in converted_props and 'label' in props:
+                # Infer format from label or name patterns
+                label_lower = props['label'].lower()
+                if any(word in label_lower for word in ['count', 'number', 'num']):
+                    converted_props['format'] = 'big_2'  # Common format for counts
+        
+        # Handle dimension_group specifics
+        if obj_type == 'dimension_group':
+            # For dimension groups, we only keep sql, group_label, label, and description
+            # Remove timeframes and other time-specific properties from output
+            keys_to_keep = ['sql', 'group_label', 'label', 'description']
+            converted_props = {k: v for k, v in converted_props.items() if k in keys_to_keep}
+        
+        # Handle required_access_grants
+        if 'required_access_grants' in props:
+            converted_props['required_access_grants'] = props['required_access_grants']
+        
+        # Handle aliases
+        if 'alias' in props:
+            converted_props['aliases'] = [props['alias']] if isinstance(props['alias'], str) else props['alias']
+        elif 'aliases' in props:
+            converted_props['aliases'] = props['aliases']
+        
+        # Handle ignored fields
+        if 'ignored' in props and props['ignored'] in ['yes', True]:
+            converted_props['ignored'] = True
+            
+        # Handle dimension specific: groups, bin_boundaries
+        if obj_type == 'dimension':
+            if 'groups' in props:
+                converted_props['groups'] = props['groups']
+            if 'bin_boundaries' in props:
+                converted_props['bin_boundaries'] = props['bin_boundaries']
+            if 'filter_single_select_only' in props:
+                converted_props['filter_single_select_only'] = props['filter_single_select_only'] in ['yes', True]
+        
+        name, converted_props = self.rules.apply(name, converted_props)
+        return plural_type, name, converted_props
+    
+    def get_llm_conversion(self, lookml_code: str, error_msg: str = None, api_key: str = None,
+                           client: Any = None, on_progress: Optional[Callable[[int, int], None]] = None,
+                           should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """Use Anthropic Claude as fallback for complex conversions"""
+        
+        # Check if API key is available
+        anthropic_key = api_key or os.getenv('ANTHROPIC_API_KEY')
+        
+        if not anthropic_key and client is None:
+            return None
+            
+        if client is None:
+            client = create_anthropic_client(anthropic_key)
+        # Imported here so the rule-based engine never pays for the LLM path
+        from llm_fallback import convert_with_llm
+        with CONVERSION_SECONDS.time(engine='llm', size=size_class(len(lookml_code))):
+            return convert_with_llm(client, lookml_code, error_msg, on_progress=on_progress, should_stop=should_stop)
+    
+    def _translate_liquid(self, value: Any, view_name: Optional[str], conditionals: bool = False) -> Any:
+        """Value with its Liquid translated to Omni templating, keeping multi-line SQL a block"""
+        if isinstance(value, SqlSpan):
+            if value.search(LIQUID_RE) is None:
+                return value
+            translated = translate_liquid(str(value), view_name, conditionals)
+            return SqlSpan(translated, 0, len(translated))
+        if isinstance(value, str) and '{' in value:
+            return translate_liquid(value, view_name, conditionals)
+        return value
+    
+    def convert_view_properties(self, props: Dict[str, Any], view_name: str = None) -> Dict[str, Any]:
+        """Map view-level properties (sql_table_name, label, ...) to Omni view properties"""
+        converted_props = {}
+        if 'sql' in props.get('derived_table', {}):
+            # A derived table becomes a SQL view; Liquid if blocks there usually wrap
+            # whole clauses rather than values, so only references are translated
+            converted_props['sql'] = self._translate_liquid(props['derived_table']['sql'], view_name)
+        elif 'sql_table_name' in props:
+            table = str(props['sql_table_name']).strip()
+            if '.' in table:
+                schema, table = table.rsplit('.', 1)
+                converted_props['schema'] = schema.strip('"`')
+            converted_props['table_name'] = table.strip('"`')
+        for key in ('label', 'description'):
+            if key in props:
+                converted_props[key] = props[key]
+        if props.get('hidden') in ['yes', True]:
+            converted_props['hidden'] = True
+        return converted_props
+    
+    def convert_to_yaml(self, parsed_data: Dict[str, Any]) -> str:
+        """Convert parsed data to YAML format"""
+        output = []
+        
+        # View-level properties come first in a view file
+        for key, value in parsed_data.get('view', {}).items():
+            output.extend(self._format_property(key, value, 0))
+        
+        # Process dimensions and dimension_groups
+        if parsed_data['dimensions'] or parsed_data['dimension_groups']:
+            if output:
+                output.append('')
+            output.append('dimensions:')
+            
+            # Add regular dimensions
+            for name, props in parsed_data['dimensions'].items():
+                output.append(f'  {name}:')
+                output.extend(self._format_properties(props, 4))
+                
+            # Add dimension groups
+            for name, props in parsed_data['dimension_groups'].items():
+                output.append(f'  {name}:')
+                output.extend(self._format_properties(props, 4))
+        
+        # Process measures
+        if parsed_data['measures']:
+            if output:
+                output.append('')
+            output.append('measures:')
+            for name, props in parsed_data['measures'].items():
+                output.append(f'  {name}:')
+                output.extend(self._format_properties(props, 4))
+        
+        # Process filters (converted from parameters)
+        if 'filters' in parsed_data and parsed_data['filters']:
+            if output:
+                output.append('')
+            output.append('filters:')
+            for name, props in parsed_data['filters'].items():
+                output.append(f'  {name}:')
+                output.extend(self._format_properties(props, 4))
+        
+        return '\n'.join(output)
+    
+    def _format_properties(self, props: Dict[str, Any], indent: int) -> list:
+        """Format properties as YAML lines"""
+        lines = []
+        indent_str = ' ' * indent
+        
+        # Property order for better organization - matching Omni documentation order
+        property_order = [
+            'sql', 'label', 'group_label', 'description', 'format',
+            'aggregate_type', 'custom_primary_key_sql', 'hidden', 
+            'primary_key', 'ignored', 'aliases', 'tags', 
+            'links', 'drill_fields', 'drill_queries', 'filters',
+            'display_order', 'view_label', 'suggest_from_field',
+            'suggestion_list', 'order_by_field', 'required_access_grants',
+            'timeframes', 'convert_tz', 'groups', 'bin_boundaries',
+            'filter_single_select_only', 'colors', 'type', 'default_filter'
+        ]
+        
+        # Add ordered properties first
+        for key in property_order:
+            if key in props:
+                lines.extend(self._format_property(key, props[key], indent))
+        
+        # Add remaining properties
+        for key, value in props.items():
+            if key not in property_order:
+                lines.extend(self._format_property(key, value, indent))
+        
+        return lines
+    
+    def _format_property(self, key: str, value: Any, indent: int) -> list:
+        """Format a single property"""
+        indent_str = ' ' * indent
+        lines = []
+        
+        if isinstance(value, list):
+            if key == 'timeframes':
+                lines.append(f'{indent_str}{key}:')
+                lines.append(f'{indent_str}  [')
+                for i, item in enumerate(value):
+                    suffix = ',' if i < len(value) - 1 else ''
+                    lines.append(f'{indent_str}    {item}{suffix}')
+                lines.append(f'{indent_str}  ]')
+            elif key == 'suggestion_list':
+                lines.append(f'{indent_str}{key}:')
+                for item in value:
+                    if isinstance(item, dict) and 'value' in item:
+                        lines.append(f'{indent_str}  - value: {item["value"]}')
+                    else:
+                        lines.append(f'{indent_str}  - value: {item}')
+            else:
+                lines.append(f'{indent_str}{key}: [ {", ".join(map(str, value))} ]')
+        elif isinstance(value, dict):
+            if key == 'default_filter':
+                # Format default_filter specially
+                for k, v in value.items():
+                    lines.append(f'{indent_str}{key}:')
+                    lines.append(f'{indent_str}  {k}: {v}')
+            else:
+                lines.append(f'{indent_str}{key}: {value}')
+        elif isinstance(value, bool):
+            lines.append(f'{indent_str}{key}: {str(value).lower()}')
+        elif isinstance(value, SqlSpan):
+            # Multi-line SQL keeps its line breaks as a literal block scalar
+            lines.append(f'{indent_str}{key}: |')
+            lines.extend(f'{indent_str}  {line}' if line else '' for line in sql_block_lines(value))
+        elif isinstance(value, str):
+            # Special handling for SQL fields
+            if value.startswith('{'):
+                # Omni templating at the start would otherwise read as a YAML flow mapping
+                quoted = value.replace("'", "''")
+                lines.append(f"{indent_str}{key}: '{quoted}'")
+            elif key == 'sql':
+                # Check if it's already a simple quoted field reference
+                if value.startswith('"') and value.endswith('"') and value.count('"') == 2:
+                    # It's already properly quoted, output with single quotes around the whole thing
+                    lines.append(f"{indent_str}{key}: '{value}'")
+                else:
+                    # It's complex SQL (CASE statements, etc.), output as-is
+                    lines.append(f'{indent_str}{key}: {value}')
+            else:
+                # For all other string properties
+                lines.append(f'{indent_str}{key}: {value}')
+        else:
+            lines.append(f'{indent_str}{key}: {value}')
+        
+        return lines
+
+
+def count_objects(types: Iterable[str]) -> None:
+    """Add converted objects to the per-type metric, one update per type"""
+    counts: Dict[str, int] = {}
+    for obj_type in types:
+        counts[obj_type] = counts.get(obj_type, 0) + 1
+    for obj_type, count in counts.items():
+        OBJECTS.inc(count, type=obj_type)
+
+
+def yaml_output_path(lookml_path: str) -> str:
+    """Map a LookML file path to its converted YAML path (orders.view.lkml -> orders.view.yaml)"""
+    return LKML_SUFFIX_RE.sub('', lookml_path) + '.yaml'
+
+
+def create_anthropic_client(api_key: str) -> Any:
+    """Create an Anthropic client, importing the SDK on first use since it is slow to import"""
+    import anthropic
+    # ANTHROPIC_BASE_URL can point the client at a local stand-in such as
+    # benchmarks/mock_anthropic_server.py for offline benchmarking
+    options = {}
+    if os.getenv('ANTHROPIC_BASE_URL'):
+        options['base_url'] = os.getenv('ANTHROPIC_BASE_URL')
+    if os.getenv('ANTHROPIC_MAX_RETRIES'):
+        options['max_retries'] = int(os.getenv('ANTHROPIC_MAX_RETRIES'))
+    return anthropic.Anthropic(api_key=api_key, **options)
+
+
+def conversion_cache_key(lookml_code: str, settings: Dict[str, Any] = None) -> str:
+    """Stable hash of the input text and the settings that affect its conversion"""
+    digest = hashlib.sha256(lookml_code.encode('utf-8'))
+    digest.update(json.dumps(settings or {}, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
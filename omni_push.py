@@ -0,0 +1,259 @@
+"""Push converted Omni YAML to an Omni model through its YAML API.
+
+    python omni_push.py omni_yaml/ --base-url https://myorg.omniapp.co --model-id <model id>
+    python omni_push.py omni_yaml/ --dry-run
+
+Uploads go through a small pool of keep-alive connections with a
+concurrency limit, and are retried with exponential backoff on 429, 5xx and
+connection errors (honouring Retry-After). Only files whose content hash
+changed since the last successful push are uploaded; the pushed hashes are
+kept in a manifest next to the YAML. The YAML endpoint takes one file per
+request, so uploads are not batched. benchmarks/mock_omni_server.py is a
+local stand-in for the API.
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from batch_convert import content_hash, load_manifest, save_manifest
+
+# Output path -> hash of the content last uploaded successfully
+PUSH_MANIFEST_NAME = '.omni_push_manifest.json'
+DEFAULT_PATH_TEMPLATE = '/api/v1/models/{model_id}/yaml'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PushError(Exception):
+    """An upload that failed for good, after any retries"""
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one host, at most size of them in use at once"""
+
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 30.0):
+        parts = urllib.parse.urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.idle: 'queue.LifoQueue[http.client.HTTPConnection]' = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes = None,
+                headers: Dict[str, str] = None) -> Tuple[int, http.client.HTTPMessage, bytes]:
+        """Send one request on an idle connection, or a new one, returning (status, headers, body)"""
+        with self.slots:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+            try:
+                connection.request(method, self.base_path + path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                # Also covers keep-alive connections the server has since closed
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.idle.put(connection)
+            return response.status, response.headers, data
+
+    def close(self):
+        """Close the idle connections"""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header; only the delay-seconds form is used"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class OmniClient:
+    """Uploads YAML files to one Omni model, retrying transient failures"""
+
+    def __init__(self, base_url: str, api_key: str, model_id: str, path_template: str = DEFAULT_PATH_TEMPLATE,
+                 pool_size: int = 8, timeout: float = 30.0, max_retries: int = 5,
+                 backoff: float = 0.5, max_backoff: float = 30.0):
+        self.pool = ConnectionPool(base_url, pool_size, timeout)
+        self.path = path_template.format(model_id=urllib.parse.quote(model_id, safe=''))
+        self.headers = {
+            'Authorization': f"Bearer {api_key}",
+            'Content-Type': 'application/json',
+        }
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+
+    def upload(self, file_name: str, yaml_text: str):
+        """Upload one file, raising PushError once retries are exhausted"""
+        body = json.dumps({'fileName': file_name, 'yaml': yaml_text}).encode('utf-8')
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                status, headers, data = self.pool.request('POST', self.path, body, self.headers)
+            except (OSError, http.client.HTTPException) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if status < 300:
+                    return
+                error = f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}"
+                if status not in RETRY_STATUSES:
+                    raise PushError(error)
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+            if attempt == self.max_retries:
+                raise PushError(f"{error} (after {attempt + 1} attempts)")
+            self.retries += 1
+            if retry_after is None:
+                # Exponential backoff with jitter so concurrent uploads do not retry in lockstep
+                retry_after = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            time.sleep(retry_after)
+
+    def close(self):
+        """Close the pooled connections"""
+        self.pool.close()
+
+
+def iter_yaml_files(output_dir: str) -> List[str]:
+    """Relative paths of the YAML files under output_dir, in a stable order"""
+    paths = []
+    for root, dirs, files in os.walk(output_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if name.endswith('.yaml') and not name.startswith('.'):
+                paths.append(os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, '/'))
+    return paths
+
+
+def current_hash(output_dir: str, path: str, written: Dict[str, Dict[str, Any]]) -> str:
+    """Content hash of an output, taken from the batch manifest while the file is unmodified"""
+    full_path = os.path.join(output_dir, path)
+    entry = written.get(path)
+    stat = os.stat(full_path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['hash']
+    with open(full_path, 'rb') as f:
+        return content_hash(f.read())
+
+
+def push_directory(client: Optional[OmniClient], output_dir: str, dry_run: bool = False, concurrency: int = 8,
+                   on_progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+    """Upload changed YAML files under output_dir, returning counts of uploaded, unchanged and failed files
+
+    With dry_run nothing is sent and the files that would be uploaded are
+    listed; client may then be None.
+    """
+    pushed = load_manifest(output_dir, PUSH_MANIFEST_NAME)
+    written = load_manifest(output_dir)
+    counts = {'uploaded': 0, 'unchanged': 0, 'failed': 0}
+    changed = []
+    hashes = {}
+    for path in iter_yaml_files(output_dir):
+        hashes[path] = current_hash(output_dir, path, written)
+        if pushed.get(path) == hashes[path]:
+            counts['unchanged'] += 1
+        else:
+            changed.append(path)
+
+    if dry_run:
+        for path in changed:
+            print(f"would upload {path}")
+        counts['uploaded'] = len(changed)
+        return counts
+
+    def upload(path: str):
+        with open(os.path.join(output_dir, path), encoding='utf-8') as f:
+            client.upload(path, f.read())
+
+    # Files that disappeared since the last push are dropped from the manifest
+    manifest = {path: digest for path, digest in pushed.items() if path in hashes}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {executor.submit(upload, path): path for path in changed}
+            for done, future in enumerate(as_completed(futures), start=1):
+                path = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"error: {path}: {e}", file=sys.stderr)
+                    counts['failed'] += 1
+                else:
+                    manifest[path] = hashes[path]
+                    counts['uploaded'] += 1
+                if on_progress:
+                    on_progress('pushing', done, len(changed))
+    finally:
+        # Record successful uploads even if the run is interrupted
+        if manifest != pushed:
+            save_manifest(output_dir, manifest, PUSH_MANIFEST_NAME)
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Upload converted Omni YAML to an Omni model")
+    parser.add_argument('output_dir', help="directory written by batch_convert.py")
+    parser.add_argument('--base-url', default=os.getenv('OMNI_BASE_URL'), help="Omni URL (default: $OMNI_BASE_URL)")
+    parser.add_argument('--model-id', default=os.getenv('OMNI_MODEL_ID'), help="model to push to (default: $OMNI_MODEL_ID)")
+    parser.add_argument('--path-template', default=DEFAULT_PATH_TEMPLATE,
+                        help="API path of the YAML endpoint, with {model_id} (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, default=8, help="uploads in flight and pooled connections")
+    parser.add_argument('--retries', type=int, default=5, help="retries per file on 429, 5xx and connection errors")
+    parser.add_argument('--timeout', type=float, default=30.0, help="seconds per request")
+    parser.add_argument('--dry-run', action='store_true', help="list the files that would be uploaded")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.output_dir):
+        parser.error(f"{args.output_dir} is not a directory")
+    client = None
+    if not args.dry_run:
+        api_key = os.getenv('OMNI_API_KEY')
+        if not (args.base_url and args.model_id and api_key):
+            parser.error("--base-url, --model-id and $OMNI_API_KEY are required unless --dry-run is given")
+        client = OmniClient(args.base_url, api_key, args.model_id, args.path_template,
+                            pool_size=args.concurrency, timeout=args.timeout, max_retries=args.retries)
+    started = time.perf_counter()
+    try:
+        counts = push_directory(client, args.output_dir, args.dry_run, args.concurrency)
+    finally:
+        if client:
+            client.close()
+    elapsed = time.perf_counter() - started
+    verb = 'to upload' if args.dry_run else 'uploaded'
+    summary = f"{counts['uploaded']} {verb}, {counts['unchanged']} unchanged, {counts['failed']} failed"
+    if client:
+        summary += f" in {elapsed:.1f} s ({client.pool.opened} connections, {client.retries} retries)"
+    print(summary)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
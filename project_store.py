@@ -0,0 +1,224 @@
+"""Storage for the scanned views of a LookMLProject.
+
+MemoryStore keeps them as the nested dicts scan_lookml produces, which is
+fastest but holds the whole project, source text included, in memory.
+SqliteStore writes each view to a SQLite file as it is added, with views
+keyed by name and fields by view and field name, and pages views back in
+on demand through a bounded LRU; LookMLProject bounds its resolution and
+conversion memos to the store's limits too, so a project larger than RAM
+converts in a fixed memory budget, at the cost of re-reading and
+re-resolving views that fall out of the caches.
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from conversion_jobs import ResultCache
+from omni_converter import SqlSpan
+
+# Stored form of a SqlSpan, whose source file is not kept
+SQL_SPAN_KEY = '$sql'
+
+
+class MemoryStore:
+    """Scanned views kept in memory as they are"""
+
+    # Memo sizes for LookMLProject; unbounded
+    cache_views = sys.maxsize
+    cache_fields = sys.maxsize
+
+    def __init__(self):
+        # view name -> base definition, and view name -> refinements in file order
+        self.views: Dict[str, Dict[str, Any]] = {}
+        self.refinements_by_view: Dict[str, List[Dict[str, Any]]] = {}
+        # file path -> fields outside any view
+        self.loose_views: Dict[str, Dict[str, Any]] = {}
+
+    def add_view(self, view: Dict[str, Any]):
+        self.views[view['name']] = view
+
+    def add_refinement(self, view: Dict[str, Any]):
+        self.refinements_by_view.setdefault(view['name'], []).append(view)
+
+    def add_loose(self, path: str, view: Dict[str, Any]):
+        self.loose_views[path] = view
+
+    def has_view(self, name: str) -> bool:
+        return name in self.views
+
+    def view(self, name: str) -> Dict[str, Any]:
+        return self.views[name]
+
+    def refinements(self, name: str) -> List[Dict[str, Any]]:
+        return self.refinements_by_view.get(name, [])
+
+    def has_loose(self, path: str) -> bool:
+        return path in self.loose_views
+
+    def loose(self, path: str) -> Dict[str, Any]:
+        return self.loose_views[path]
+
+    def close(self):
+        pass
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, SqlSpan):
+        # The raw slice, unstripped, so the restored span converts exactly like the original
+        return {SQL_SPAN_KEY: value.source[value.start:value.end]}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    # Restored as a span over its own text, so it is still written as a block
+    if len(value) == 1 and SQL_SPAN_KEY in value:
+        text = value[SQL_SPAN_KEY]
+        return SqlSpan(text, 0, len(text))
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_encode, separators=(',', ':'))
+
+
+def _loads(text: str) -> Any:
+    return json.loads(text, object_hook=_decode)
+
+
+class SqliteStore:
+    """Scanned views in a SQLite file, paged in through a bounded LRU
+
+    path is a scratch database that is overwritten; without one a temporary
+    file is used and removed on close. cache_views bounds the views held in
+    memory here and in the project's resolved-view memo, and cache_fields
+    the project's converted-field memo.
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_views: int = 256, cache_fields: int = 16384):
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='lookml_project_', suffix='.sqlite')
+            os.close(fd)
+        self.path = path
+        self.cache_views = cache_views
+        self.cache_fields = cache_fields
+        self.cache = ResultCache(cache_views)
+        self.conn = sqlite3.connect(path)
+        # A scratch database: durability is not needed, a bounded page cache is
+        self.conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            PRAGMA cache_size = -16384;
+            DROP TABLE IF EXISTS views;
+            DROP TABLE IF EXISTS fields;
+            CREATE TABLE views (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                name TEXT,
+                path TEXT,
+                extends TEXT NOT NULL,
+                props TEXT NOT NULL,
+                sets TEXT NOT NULL
+            );
+            CREATE INDEX views_by_name ON views (kind, name, id);
+            CREATE INDEX views_by_path ON views (kind, path);
+            CREATE TABLE fields (
+                view_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                props TEXT NOT NULL,
+                PRIMARY KEY (view_id, name)
+            ) WITHOUT ROWID;
+        """)
+
+    def _insert(self, kind: str, view: Dict[str, Any], path: Optional[str] = None):
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO views (kind, name, path, extends, props, sets) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, view['name'], path, _dumps(view['extends']), _dumps(view['props']), _dumps(view['sets'])))
+            view_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fields (view_id, name, position, type, props) VALUES (?, ?, ?, ?, ?)",
+                ((view_id, name, position, field['type'], _dumps(field['props']))
+                 for position, (name, field) in enumerate(view['fields'].items())))
+        # Adding a view can change any cached refinement list; adds happen before conversion anyway
+        self.cache.clear()
+
+    def add_view(self, view: Dict[str, Any]):
+        self._insert('view', view)
+
+    def add_refinement(self, view: Dict[str, Any]):
+        self._insert('refinement', view)
+
+    def add_loose(self, path: str, view: Dict[str, Any]):
+        self._insert('loose', view, path)
+
+    def _load(self, row: tuple) -> Dict[str, Any]:
+        view_id, name, extends, props, sets = row
+        fields = self.conn.execute(
+            "SELECT name, type, props, position FROM fields WHERE view_id = ?", (view_id,)).fetchall()
+        fields.sort(key=lambda field: field[3])
+        return {
+            'name': name,
+            'refinement': False,
+            'extends': _loads(extends),
+            'props': _loads(props),
+            'fields': {field_name: {'type': obj_type, 'props': _loads(field_props)}
+                       for field_name, obj_type, field_props, _ in fields},
+            'sets': _loads(sets),
+        }
+
+    def _cached(self, key: tuple, load):
+        found, value = self.cache.get(key)
+        if not found:
+            value = load()
+            self.cache.put(key, value)
+        return value
+
+    def has_view(self, name: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM views WHERE kind = 'view' AND name = ? LIMIT 1", (name,)).fetchone() is not None
+
+    def view(self, name: str) -> Dict[str, Any]:
+        def load():
+            row = self.conn.execute(
+                "SELECT id, name, extends, props, sets FROM views WHERE kind = 'view' AND name = ?",
+                (name,)).fetchone()
+            if row is None:
+                raise KeyError(name)
+            return self._load(row)
+        return self._cached(('view', name), load)
+
+    def refinements(self, name: str) -> List[Dict[str, Any]]:
+        def load():
+            rows = self.conn.execute(
+                "SELECT id, name, extends, props, sets FROM views WHERE kind = 'refinement' AND name = ? ORDER BY id",
+                (name,)).fetchall()
+            layers = [self._load(row) for row in rows]
+            for layer in layers:
+                layer['refinement'] = True
+            return layers
+        return self._cached(('refinements', name), load)
+
+    def has_loose(self, path: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM views WHERE kind = 'loose' AND path = ? LIMIT 1", (path,)).fetchone() is not None
+
+    def loose(self, path: str) -> Dict[str, Any]:
+        def load():
+            row = self.conn.execute(
+                "SELECT id, name, extends, props, sets FROM views WHERE kind = 'loose' AND path = ?",
+                (path,)).fetchone()
+            if row is None:
+                raise KeyError(path)
+            return self._load(row)
+        return self._cached(('loose', path), load)
+
+    def close(self):
+        self.conn.close()
+        if self.temporary:
+            os.remove(self.path)
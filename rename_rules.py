@@ -0,0 +1,270 @@
+"""User-supplied rename and override rules for converted fields.
+
+A rules file (YAML) lists rules in priority order; the first rule whose
+conditions all hold for a converted dimension or measure wins:
+
+    rules:
+      - match:
+          name: sum_planned_cpx            # exact
+          label: {glob: "Total*CXP"}       # glob over the whole value
+          sql: {regex: '"\\w+_FLAG"'}      # regex over the whole value
+        rename: sum_cxp_planned
+        set: {hidden: true}                # override converted properties
+
+Conditions test the field name, its converted label and its converted SQL.
+Each rule is indexed by its first condition (name, then label, then sql).
+Exact values go in a dict. Glob and regex patterns are keyed by their
+literal prefix (or, for globs such as ``*_id``, their literal suffix), so a
+lookup hashes the prefixes and suffixes of the value and only runs the few
+patterns that can match; Python's re has no DFA, so one alternation over
+thousands of patterns would still try them one by one. Only patterns with
+neither, such as ``.*total.*``, are tried for every field.
+"""
+import bisect
+import fnmatch
+import hashlib
+import heapq
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rename_rules.yaml')
+ATTRIBUTES = ('name', 'label', 'sql')
+GLOB_WILDCARDS = '*?[]'
+# Leading characters a regex matches literally
+REGEX_LITERAL_RE = re.compile(r'[\w \-:,/"\']*')
+
+
+class RuleError(ValueError):
+    """A rules file that cannot be used"""
+
+
+class Rule:
+    """One rule: conditions per attribute, a new name and property overrides"""
+
+    __slots__ = ('index', 'conditions', 'rename', 'overrides')
+
+    def __init__(self, index: int, conditions: Dict[str, Tuple[str, str, Optional['re.Pattern']]],
+                 rename: Optional[str], overrides: Dict[str, Any]):
+        self.index = index
+        self.conditions = conditions
+        self.rename = rename
+        self.overrides = overrides
+
+    def matches(self, values: Dict[str, Optional[str]]) -> Optional[Dict[str, str]]:
+        """Named groups of the name pattern if every condition holds, else None"""
+        groups = {}
+        for attribute, (kind, expected, pattern) in self.conditions.items():
+            value = values[attribute]
+            if value is None:
+                return None
+            if kind == 'exact':
+                if value != expected:
+                    return None
+                continue
+            match = pattern.fullmatch(value)
+            if match is None:
+                return None
+            if attribute == 'name':
+                # Optional groups that did not take part are empty, so every placeholder is filled
+                groups = match.groupdict('')
+        return groups
+
+
+def _parse_condition(rule_number: int, attribute: str, value: Any) -> Tuple[str, str, Optional['re.Pattern']]:
+    """(kind, source, compiled pattern) for one condition of a rule"""
+    if isinstance(value, dict) and len(value) == 1:
+        kind, source = next(iter(value.items()))
+        source = str(source)
+        if kind not in ('glob', 'regex'):
+            raise RuleError(f"Rule {rule_number}: unknown matcher '{kind}' for {attribute} (use glob or regex)")
+        try:
+            return kind, source, re.compile(fnmatch.translate(source) if kind == 'glob' else source)
+        except re.error as e:
+            raise RuleError(f"Rule {rule_number}: invalid {kind} for {attribute}: {e}")
+    if isinstance(value, (dict, list)):
+        raise RuleError(f"Rule {rule_number}: {attribute} must be a string, {{glob: ...}} or {{regex: ...}}")
+    return 'exact', str(value), None
+
+
+def _check_actions(rule_number: int, spec: Dict[str, Any],
+                   conditions: Dict[str, Tuple[str, str, Optional['re.Pattern']]]):
+    """Reject a set that is not a mapping, or a rename template that could not be filled in"""
+    overrides = spec.get('set')
+    if overrides is not None and not isinstance(overrides, dict):
+        raise RuleError(f"Rule {rule_number}: set must be a mapping of properties to values")
+    rename = spec.get('rename')
+    if rename is None:
+        return
+    if not isinstance(rename, str):
+        raise RuleError(f"Rule {rule_number}: rename must be a string")
+    # Placeholders are {name} and the named groups of a regex on the name
+    pattern = conditions.get('name', (None, None, None))[2]
+    placeholders = {group: group for group in pattern.groupindex} if pattern is not None else {}
+    placeholders['name'] = 'name'
+    try:
+        rename.format(**placeholders)
+    except KeyError as e:
+        raise RuleError(f"Rule {rule_number}: rename '{rename}' uses unknown placeholder {e} "
+                        f"(use {', '.join('{' + key + '}' for key in sorted(placeholders))})")
+    except (IndexError, ValueError, AttributeError, TypeError) as e:
+        raise RuleError(f"Rule {rule_number}: invalid rename template '{rename}': {e}")
+
+
+def _literal_affixes(kind: str, source: str) -> Tuple[str, str]:
+    """Literal prefix and suffix every value matching a pattern must have"""
+    if kind == 'glob':
+        prefix = source
+        for index, char in enumerate(source):
+            if char in GLOB_WILDCARDS:
+                prefix = source[:index]
+                break
+        suffix = source
+        for index in range(len(source) - 1, -1, -1):
+            if source[index] in GLOB_WILDCARDS:
+                suffix = source[index + 1:]
+                break
+        return prefix, suffix
+    if '|' in source:
+        # A top-level alternation has no common prefix; telling it apart from a nested one is not worth it
+        return '', ''
+    prefix = REGEX_LITERAL_RE.match(source).group()
+    if source[len(prefix):len(prefix) + 1] in ('*', '?', '{'):
+        # The last literal character is optional
+        prefix = prefix[:-1]
+    return prefix, ''
+
+
+class PatternIndex:
+    """Glob and regex rules keyed by literal prefix or suffix"""
+
+    def __init__(self):
+        self.prefixes: Dict[str, List[Rule]] = {}
+        self.suffixes: Dict[str, List[Rule]] = {}
+        self.prefix_lengths: List[int] = []
+        self.suffix_lengths: List[int] = []
+        self.unanchored: List[Rule] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.prefixes or self.suffixes or self.unanchored)
+
+    def add(self, rule: Rule, kind: str, source: str):
+        prefix, suffix = _literal_affixes(kind, source)
+        if prefix:
+            self.prefixes.setdefault(prefix, []).append(rule)
+            if len(prefix) not in self.prefix_lengths:
+                bisect.insort(self.prefix_lengths, len(prefix))
+        elif suffix:
+            self.suffixes.setdefault(suffix, []).append(rule)
+            if len(suffix) not in self.suffix_lengths:
+                bisect.insort(self.suffix_lengths, len(suffix))
+        else:
+            self.unanchored.append(rule)
+
+    def candidates(self, attribute: str, value: str) -> List[int]:
+        """Indexes, in rule order, of the rules whose pattern on attribute matches value"""
+        rules = list(self.unanchored)
+        for length in self.prefix_lengths:
+            if length > len(value):
+                break
+            rules.extend(self.prefixes.get(value[:length], ()))
+        for length in self.suffix_lengths:
+            if length > len(value):
+                break
+            rules.extend(self.suffixes.get(value[len(value) - length:], ()))
+        return sorted(rule.index for rule in rules if rule.conditions[attribute][2].fullmatch(value))
+
+
+class RenameRules:
+    """Compiled rules with an exact-value index and a pattern index per attribute"""
+
+    def __init__(self, rules: List[Dict[str, Any]], digest: str = ''):
+        self.rules: List[Rule] = []
+        self.exact: Dict[str, Dict[str, List[int]]] = {attribute: {} for attribute in ATTRIBUTES}
+        self.patterns: Dict[str, PatternIndex] = {attribute: PatternIndex() for attribute in ATTRIBUTES}
+        # Rules without conditions match every field
+        self.always: List[int] = []
+        self.digest = digest
+
+        for index, spec in enumerate(rules):
+            if not isinstance(spec, dict):
+                raise RuleError(f"Rule {index + 1}: expected a mapping")
+            match = spec.get('match') or {}
+            unknown = set(match) - set(ATTRIBUTES)
+            if unknown:
+                raise RuleError(f"Rule {index + 1}: unknown condition {', '.join(sorted(unknown))}")
+            if 'rename' not in spec and 'set' not in spec:
+                raise RuleError(f"Rule {index + 1}: needs rename or set")
+            conditions = {attribute: _parse_condition(index + 1, attribute, match[attribute])
+                          for attribute in ATTRIBUTES if attribute in match}
+            _check_actions(index + 1, spec, conditions)
+            rule = Rule(index, conditions, spec.get('rename'), dict(spec.get('set') or {}))
+            self.rules.append(rule)
+            if not conditions:
+                self.always.append(index)
+                continue
+            primary = next(iter(conditions))
+            kind, source, _ = conditions[primary]
+            if kind == 'exact':
+                self.exact[primary].setdefault(source, []).append(index)
+            else:
+                self.patterns[primary].add(rule, kind, source)
+        self.uses_sql = any('sql' in rule.conditions for rule in self.rules)
+
+    @classmethod
+    def from_yaml(cls, text: str) -> 'RenameRules':
+        """Parse rules from YAML text"""
+        import yaml
+        try:
+            data = yaml.safe_load(text) or {}
+        except yaml.YAMLError as e:
+            raise RuleError(f"Invalid rules file: {e}")
+        rules = data.get('rules', []) if isinstance(data, dict) else data
+        if not isinstance(rules, list):
+            raise RuleError("Rules file must hold a list under 'rules'")
+        return cls(rules, hashlib.sha256(text.encode('utf-8')).hexdigest())
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_RULES_PATH) -> 'RenameRules':
+        """Read a rules file; the default one holds the project's built-in renames"""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_yaml(f.read())
+
+    def match(self, name: str, label: Optional[str] = None,
+              sql: Optional[str] = None) -> Optional[Tuple[Rule, Dict[str, str]]]:
+        """The first rule that matches a field, with the named groups of its name pattern"""
+        if not self.rules:
+            return None
+        values = {'name': name, 'label': label, 'sql': sql}
+        candidates = [self.always]
+        for attribute in ATTRIBUTES:
+            value = values[attribute]
+            if value is None:
+                continue
+            exact = self.exact[attribute].get(value)
+            if exact:
+                candidates.append(exact)
+            if self.patterns[attribute]:
+                candidates.append(self.patterns[attribute].candidates(attribute, value))
+        for index in heapq.merge(*candidates):
+            rule = self.rules[index]
+            groups = rule.matches(values)
+            if groups is not None:
+                return rule, groups
+        return None
+
+    def apply(self, name: str, props: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Rename and override a converted field if a rule matches it"""
+        if not self.rules:
+            return name, props
+        label = props.get('label')
+        sql = props.get('sql') if self.uses_sql else None
+        found = self.match(name, str(label) if label is not None else None, str(sql) if sql is not None else None)
+        if found is None:
+            return name, props
+        rule, groups = found
+        if rule.overrides:
+            props = {**props, **rule.overrides}
+        if rule.rename:
+            name = rule.rename.format(name=name, **groups)
+        return name, props
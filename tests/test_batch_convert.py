@@ -0,0 +1,92 @@
+import os
+import stat
+
+from batch_convert import DEFAULT_FILE_MODE, MANIFEST_NAME, convert_files, load_manifest, write_atomic
+
+VIEW = """view: {name} {{
+  sql_table_name: public.{name} ;;
+  dimension: id {{
+    type: number
+    sql: ${{TABLE}}.id ;;
+  }}
+}}
+"""
+
+
+def write_project(directory, *names):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        with open(os.path.join(directory, f"{name}.view.lkml"), 'w') as f:
+            f.write(VIEW.format(name=name))
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_unchanged_outputs_are_skipped(tmp_path):
+    source, output = str(tmp_path / 'src'), str(tmp_path / 'out')
+    write_project(source, 'orders', 'users')
+    assert convert_files([source], output) == {'written': 2, 'unchanged': 0, 'deleted': 0, 'failed': 0}
+    assert set(load_manifest(output)) == {'orders.view.yaml', 'users.view.yaml'}
+    mtime = os.stat(os.path.join(output, 'orders.view.yaml')).st_mtime_ns
+    assert convert_files([source], output) == {'written': 0, 'unchanged': 2, 'deleted': 0, 'failed': 0}
+    assert os.stat(os.path.join(output, 'orders.view.yaml')).st_mtime_ns == mtime
+
+
+def test_hand_edited_output_is_rewritten(tmp_path):
+    source, output = str(tmp_path / 'src'), str(tmp_path / 'out')
+    write_project(source, 'orders')
+    convert_files([source], output)
+    with open(os.path.join(output, 'orders.view.yaml'), 'a') as f:
+        f.write('# edited\n')
+    assert convert_files([source], output)['written'] == 1
+
+
+def test_stale_outputs_are_deleted(tmp_path):
+    source, output = str(tmp_path / 'src'), str(tmp_path / 'out')
+    write_project(source, 'orders', 'users')
+    convert_files([source], output)
+    os.remove(os.path.join(source, 'users.view.lkml'))
+    assert convert_files([source], output)['deleted'] == 1
+    assert not os.path.exists(os.path.join(output, 'users.view.yaml'))
+    assert set(load_manifest(output)) == {'orders.view.yaml'}
+
+
+def test_stale_outputs_are_kept_when_a_file_fails_to_load(tmp_path):
+    source, output = str(tmp_path / 'src'), str(tmp_path / 'out')
+    write_project(source, 'orders', 'users')
+    convert_files([source], output)
+    os.remove(os.path.join(source, 'users.view.lkml'))
+    # Redefining a view fails the whole file
+    with open(os.path.join(source, 'again.view.lkml'), 'w') as f:
+        f.write(VIEW.format(name='orders'))
+    counts = convert_files([source], output)
+    assert counts['failed'] == 1 and counts['deleted'] == 0
+    assert os.path.exists(os.path.join(output, 'users.view.yaml'))
+
+
+def test_colliding_outputs_fail(tmp_path):
+    source, output = str(tmp_path / 'src'), str(tmp_path / 'out')
+    write_project(source, 'orders')
+    with open(os.path.join(source, 'orders.view.lkml'), 'a') as f:
+        f.write('dimension: loose {\n  type: string\n}\n')
+    counts = convert_files([source], output)
+    assert counts['failed'] == 1 and counts['written'] == 0
+
+
+def test_written_files_get_the_default_mode(tmp_path):
+    source, output = str(tmp_path / 'src'), str(tmp_path / 'out')
+    write_project(source, 'orders')
+    convert_files([source], output)
+    assert mode_of(os.path.join(output, 'orders.view.yaml')) == DEFAULT_FILE_MODE
+    assert mode_of(os.path.join(output, MANIFEST_NAME)) == DEFAULT_FILE_MODE
+
+
+def test_rewritten_files_keep_their_mode(tmp_path):
+    path = str(tmp_path / 'out.yaml')
+    write_atomic(path, b'a\n')
+    os.chmod(path, 0o640)
+    write_atomic(path, b'b\n')
+    assert mode_of(path) == 0o640
+    assert os.listdir(tmp_path) == ['out.yaml']
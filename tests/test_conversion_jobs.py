@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from conversion_jobs import ConversionExecutor, ExecutorBusy, ResultCache, cached_rule_conversion
+from omni_converter import ConversionCancelled, LookMLToOmniConverter
+
+VIEW = "view: orders {\n  dimension: id {\n    sql: ${TABLE}.id ;;\n  }\n}\n"
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1) and cache.get('c') == (True, 3)
+
+
+def test_cached_none_is_a_hit():
+    cache = ResultCache(1)
+    cache.put('a', None)
+    assert cache.get('a') == (True, None)
+    cache.clear()
+    assert cache.get('a') == (False, None)
+
+
+def test_rule_conversion_is_memoized():
+    class CountingConverter(LookMLToOmniConverter):
+        calls = 0
+
+        def parse_lookml(self, *args, **kwargs):
+            CountingConverter.calls += 1
+            return super().parse_lookml(*args, **kwargs)
+
+    cache = ResultCache(4)
+    converter = CountingConverter()
+    first = cached_rule_conversion('key', VIEW, converter, cache)
+    assert cached_rule_conversion('key', VIEW, converter, cache) == first
+    assert CountingConverter.calls == 1
+
+
+def test_jobs_report_results_failures_and_cancels():
+    executor = ConversionExecutor(max_workers=1, max_queued=4)
+    done = executor.submit('ok', lambda job: 'yaml')
+    failed = executor.submit('bad', lambda job: 1 / 0)
+
+    def cancellable(job):
+        while not job.should_stop():
+            job.cancelled.wait(0.01)
+        raise ConversionCancelled()
+
+    cancelled = executor.submit('slow', cancellable)
+    for job in (done, failed):
+        assert job.wait(5)
+    executor.cancel(cancelled)
+    assert cancelled.wait(5)
+    assert (done.state, done.result) == ('done', 'yaml')
+    assert failed.state == 'failed' and isinstance(failed.error, ZeroDivisionError)
+    assert cancelled.state == 'cancelled'
+
+
+def test_full_queue_refuses_jobs():
+    executor = ConversionExecutor(max_workers=1, max_queued=1)
+    release = threading.Event()
+    running = executor.submit('running', lambda job: release.wait(5))
+    while not executor.stats()['running']:
+        running.wait(0.01)
+    waiting = executor.submit('waiting', lambda job: 'late')
+    assert executor.position(waiting) == 1
+    with pytest.raises(ExecutorBusy):
+        executor.submit('refused', lambda job: None)
+    # A job cancelled while queued finishes at once and never runs
+    executor.cancel(waiting)
+    assert waiting.finished.is_set() and waiting.state == 'cancelled'
+    release.set()
+    assert running.wait(5) and running.state == 'done'
+    assert waiting.result is None
@@ -0,0 +1,66 @@
+import pytest
+
+from field_sets import FieldSets
+
+SETS = {
+    'orders': {
+        'detail': ['id', 'created_date', 'users.detail*'],
+        'everything': ['detail*', 'amount', '-created_date'],
+        'loop_a': ['loop_b*'],
+        'loop_b': ['id', 'loop_a*'],
+    },
+    'users': {
+        'detail': ['id', 'name', 'orders.id'],
+    },
+}
+
+
+def field_sets():
+    calls = []
+
+    def sets_of(view):
+        calls.append(view)
+        return SETS.get(view, {})
+
+    return FieldSets(sets_of), calls
+
+
+def test_local_and_cross_view_sets_expand_in_order():
+    sets, _ = field_sets()
+    # Fields of another view's set come back qualified; already qualified ones stay as they are
+    assert sets.expand_references('orders', ['detail*']) == \
+        ['id', 'created_date', 'users.id', 'users.name', 'orders.id']
+
+
+def test_sets_of_sets_with_exclusions_and_duplicates():
+    sets, _ = field_sets()
+    assert sets.expand_references('orders', ['everything*', 'id', 'amount']) == \
+        ['id', 'users.id', 'users.name', 'orders.id', 'amount']
+    assert sets.expand_references('orders', ['users.detail*', '-users.name']) == ['users.id', 'orders.id']
+
+
+def test_unknown_sets_expand_to_nothing():
+    sets, _ = field_sets()
+    assert sets.expand_references('orders', ['missing*', 'nowhere.detail*', 'id']) == ['id']
+
+
+def test_each_set_is_expanded_once():
+    sets, calls = field_sets()
+    for _ in range(3):
+        sets.expand_references('orders', ['detail*'])
+        sets.expand_references('orders', ['detail*', 'amount'])
+    assert calls.count('users') == 1
+    assert sets.expand('orders', 'detail') == ('id', 'created_date', 'users.id', 'users.name', 'orders.id')
+
+
+def test_circular_sets_raise():
+    sets, _ = field_sets()
+    with pytest.raises(ValueError, match=r'Circular set reference: orders\.loop_a -> orders\.loop_b -> orders\.loop_a'):
+        sets.expand_references('orders', ['loop_a*'])
+
+
+def test_views_that_do_not_resolve_have_no_sets():
+    def sets_of(view):
+        raise ValueError(f"View '{view}' is not defined")
+
+    assert FieldSets(sets_of).expand_references('orders', ['detail*', 'id']) == ['id']
@@ -0,0 +1,96 @@
+import pytest
+
+from join_graph import JoinGraph, scan_explores
+from lookml_project import LookMLProject
+from omni_converter import LookMLToOmniConverter
+
+
+def graph_of(lookml_code: str) -> JoinGraph:
+    graph = JoinGraph()
+    for explore in scan_explores(LookMLToOmniConverter(), lookml_code):
+        graph.add_explore(explore)
+    return graph
+
+
+def test_joins_after_named_block_are_kept():
+    graph = graph_of("""
+explore: orders {
+  aggregate_table: rollup {
+    query: {
+      dimensions: [orders.created_date]
+    }
+    materialization: {
+      datagroup_trigger: daily
+    }
+  }
+  join: users {
+    sql_on: ${orders.user_id} = ${users.id} ;;
+    relationship: many_to_one
+  }
+}
+""")
+    assert [edge['alias'] for edge in graph.edges] == ['users']
+    assert graph.topic('orders') == {'base_view': 'orders', 'joins': {'users': {}}}
+
+
+def test_joins_nest_under_the_alias_they_join_from():
+    graph = graph_of("""
+explore: orders {
+  join: users {
+    sql_on: ${orders.user_id} = ${users.id} ;;
+  }
+  join: regions {
+    sql_on: ${users.region_id} = ${regions.id} ;;
+  }
+}
+""")
+    assert graph.topic('orders')['joins'] == {'users': {'regions': {}}}
+    assert graph.reachable('orders') == {'users', 'regions'}
+    assert graph.reachable('regions') == set()
+    assert graph.explores_using('regions') == {'orders'}
+    assert graph.explores_using('orders') == {'orders'}
+    assert graph.explores_using('products') == set()
+
+
+def test_cycle_across_explores_is_found():
+    graph = graph_of("""
+explore: orders {
+  join: users {
+    sql_on: ${orders.user_id} = ${users.id} ;;
+  }
+}
+explore: users {
+  join: orders {
+    sql_on: ${orders.user_id} = ${users.id} ;;
+  }
+}
+""")
+    assert graph.find_cycles() == [['orders', 'users', 'orders']]
+
+
+def test_aliased_self_join_is_not_a_cycle():
+    graph = graph_of("""
+explore: users {
+  join: manager {
+    from: users
+    sql_on: ${users.manager_id} = ${manager.id} ;;
+    relationship: many_to_one
+  }
+}
+""")
+    assert graph.find_cycles() == []
+    assert graph.relationships()[0]['join_to_view_as'] == 'manager'
+
+
+def test_explore_defined_twice_is_an_error():
+    project = LookMLProject()
+    project.add_file('a.model.lkml', 'explore: orders {\n}\n')
+    with pytest.raises(ValueError, match="Explore 'orders' is defined more than once"):
+        project.add_file('b.model.lkml', 'explore: orders {\n}\n')
+
+
+def test_refinement_does_not_conflict():
+    project = LookMLProject()
+    project.add_file('a.model.lkml', 'explore: orders {\n}\n')
+    project.add_file('b.model.lkml', 'explore: +orders {\n  join: users {\n  }\n}\n')
+    assert project.join_graph.explores_using('users') == {'orders'}
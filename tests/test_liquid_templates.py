@@ -0,0 +1,77 @@
+import yaml
+
+from liquid_templates import translate_liquid
+from omni_converter import LookMLToOmniConverter
+
+
+def case_sql(template: str) -> str:
+    return translate_liquid(template, 'orders', True)
+
+
+def test_parameter_condition_compares_as_string():
+    assert case_sql("{% if orders.mode._parameter_value == 'x' %}a{% else %}b{% endif %}") == \
+        "CASE WHEN '{{filters.orders.mode.value}}' = 'x' THEN a ELSE b END"
+
+
+def test_unqualified_parameter_uses_the_view():
+    assert case_sql("{% if mode._parameter_value != 'x' %}a{% endif %}") == \
+        "CASE WHEN '{{filters.orders.mode.value}}' <> 'x' THEN a END"
+
+
+def test_user_attribute_condition_compares_as_string():
+    assert case_sql("""{% if _user_attributes['region'] == "'eu'" %}a{% endif %}""") == \
+        "CASE WHEN '{{omni_attributes.region}}' = 'eu' THEN a END"
+
+
+def test_elsif_and_boolean_operators():
+    template = ("{% if mode._parameter_value == 'a' and _user_attributes['x'] == 'y' %}1"
+                "{% elsif mode._parameter_value == 'b' or mode._parameter_value == 'c' %}2"
+                "{% else %}3{% endif %}")
+    assert case_sql(template) == (
+        "CASE WHEN '{{filters.orders.mode.value}}' = 'a' AND '{{omni_attributes.x}}' = 'y' THEN 1"
+        " WHEN '{{filters.orders.mode.value}}' = 'b' OR '{{filters.orders.mode.value}}' = 'c' THEN 2"
+        " ELSE 3 END")
+
+
+def test_empty_branches_yield_null():
+    assert case_sql("{% if mode._parameter_value == 'a' %}{% else %}${TABLE}.x{% endif %}") == \
+        "CASE WHEN '{{filters.orders.mode.value}}' = 'a' THEN NULL ELSE ${TABLE}.x END"
+    assert case_sql("{% if mode._parameter_value == 'a' %}x{% else %}{% endif %}") == \
+        "CASE WHEN '{{filters.orders.mode.value}}' = 'a' THEN x END"
+
+
+def test_untranslatable_conditions_are_kept():
+    for template in ("{% if mode._is_filtered %}a{% endif %}",
+                     "{% if mode._parameter_value contains 'a' %}a{% endif %}",
+                     "{% if mode._parameter_value %}a{% endif %}"):
+        assert case_sql(template) == template
+
+
+def test_conditionals_only_in_sql_mode():
+    template = "{% if mode._parameter_value == 'a' %}x{% endif %}"
+    assert translate_liquid(template, 'orders') == template
+
+
+def test_unbalanced_if_is_left_as_written():
+    template = "{% if mode._parameter_value == 'a' %}x"
+    assert case_sql(template) == template
+
+
+def test_references_outside_conditions():
+    assert translate_liquid("{% parameter mode %} {{ users.tier._parameter_value }} {{ _user_attributes['a'] }}",
+                            'orders') == "{{filters.orders.mode.value}} {{filters.users.tier.value}} {{omni_attributes.a}}"
+
+
+def test_case_in_converted_view_is_valid_yaml():
+    converter = LookMLToOmniConverter()
+    parsed = converter.parse_lookml("""
+view: orders {
+  parameter: mode { type: unquoted }
+  dimension: amount {
+    sql: {% if mode._parameter_value == 'net' %}${TABLE}.net{% else %}${TABLE}.gross{% endif %} ;;
+  }
+}
+""")
+    document = yaml.safe_load(converter.convert_to_yaml(parsed))
+    assert document['dimensions']['amount']['sql'] == \
+        "CASE WHEN '{{filters.orders.mode.value}}' = 'net' THEN ${TABLE}.net ELSE ${TABLE}.gross END"
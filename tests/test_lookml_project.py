@@ -0,0 +1,88 @@
+import pytest
+
+from lookml_project import LookMLProject
+
+
+def project_of(files):
+    project = LookMLProject()
+    for path, code in files.items():
+        project.add_file(path, code)
+    return project
+
+
+BASE = """
+view: base {
+  extension: required
+  parameter: mode {
+    type: unquoted
+  }
+  dimension: amount {
+    sql: {% if mode._parameter_value == 'net' %}${TABLE}.net{% else %}${TABLE}.gross{% endif %} ;;
+  }
+  dimension: id {
+    sql: ${TABLE}.id ;;
+  }
+}
+"""
+
+
+def child(name: str, parent: str, body: str = '') -> str:
+    return f"""
+view: {name} {{
+  extends: [{parent}]
+{body}
+}}
+"""
+
+
+def test_inherited_fields_are_qualified_by_each_child():
+    project = project_of({
+        'base.view.lkml': BASE,
+        'orders.view.lkml': child('orders', 'base'),
+        'returns.view.lkml': child('returns', 'base'),
+    })
+    orders = project.convert_view('orders')
+    returns = project.convert_view('returns')
+    assert 'filters.orders.mode.value' in orders and 'filters.returns' not in orders
+    assert 'filters.returns.mode.value' in returns and 'filters.orders' not in returns
+    # Converting again is served from the memo and gives the same output
+    assert project.convert_view('orders') == orders
+
+
+def test_child_override_merges_onto_parent_field():
+    project = project_of({
+        'base.view.lkml': BASE,
+        'orders.view.lkml': child('orders', 'base', """
+  dimension: id {
+    label: "Order ID"
+  }"""),
+    })
+    output = project.convert_view('orders')
+    assert 'label: Order ID' in output
+    assert '"id"' in output
+
+
+def test_loose_fields_are_kept_apart_by_file():
+    project = project_of({
+        'a.view.lkml': "dimension: total {\n  sql: ${TABLE}.a ;;\n}\n",
+        'b.view.lkml': "dimension: total {\n  sql: ${TABLE}.b ;;\n}\n",
+    })
+    a = project.convert_output('a.view.lkml', ('fields', None))
+    b = project.convert_output('b.view.lkml', ('fields', None))
+    assert '"a"' in a and '"b"' in b
+
+
+def test_circular_extends_raise():
+    project = project_of({
+        'a.view.lkml': child('a', 'b'),
+        'b.view.lkml': child('b', 'a'),
+    })
+    with pytest.raises(ValueError, match='Circular extends'):
+        project.resolve('a')
+
+
+def test_new_file_invalidates_converted_fields():
+    project = project_of({'orders.view.lkml': "view: orders {\n  dimension: id {\n    sql: ${TABLE}.id ;;\n  }\n}\n"})
+    assert 'label' not in project.convert_view('orders')
+    project.add_file('refine.view.lkml', 'view: +orders {\n  dimension: id {\n    label: "Order ID"\n  }\n}\n')
+    assert 'label: Order ID' in project.convert_view('orders')
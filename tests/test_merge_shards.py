@@ -0,0 +1,61 @@
+import json
+import os
+
+from batch_convert import SHARD_MANIFEST_NAME, convert_files, load_manifest
+from merge_shards import merge_shards
+
+VIEW = """view: {name} {{
+  dimension: id {{
+    sql: ${{TABLE}}.id ;;
+  }}
+}}
+"""
+NAMES = ('orders', 'users', 'products', 'stores', 'regions')
+
+
+def convert_shards(tmp_path, count=2):
+    source = str(tmp_path / 'src')
+    os.makedirs(source)
+    for name in NAMES:
+        with open(os.path.join(source, f"{name}.view.lkml"), 'w') as f:
+            f.write(VIEW.format(name=name))
+    shard_dirs = []
+    for index in range(1, count + 1):
+        shard_dir = str(tmp_path / f"shard{index}")
+        convert_files([source], shard_dir, shard=(index, count))
+        shard_dirs.append(shard_dir)
+    return source, shard_dirs
+
+
+def test_merged_shards_match_an_unsharded_run(tmp_path):
+    source, shard_dirs = convert_shards(tmp_path)
+    merged, single = str(tmp_path / 'merged'), str(tmp_path / 'single')
+    counts, problems = merge_shards(shard_dirs, merged)
+    assert problems == [] and counts == {'written': len(NAMES), 'unchanged': 0, 'deleted': 0}
+    convert_files([source], single)
+    assert {path: entry['hash'] for path, entry in load_manifest(merged).items()} == \
+        {path: entry['hash'] for path, entry in load_manifest(single).items()}
+    # Merging again writes nothing
+    assert merge_shards(shard_dirs, merged)[0]['unchanged'] == len(NAMES)
+
+
+def test_missing_or_duplicated_shards_are_refused(tmp_path):
+    _, shard_dirs = convert_shards(tmp_path)
+    merged = str(tmp_path / 'merged')
+    problems = merge_shards(shard_dirs[:1], merged)[1]
+    assert problems == ['missing shard(s) 2 of 2']
+    problems = merge_shards([shard_dirs[0], shard_dirs[0]], merged)[1]
+    assert any('given twice' in problem for problem in problems)
+    assert not os.path.exists(merged)
+
+
+def test_damaged_output_is_refused_and_nothing_is_written(tmp_path):
+    _, shard_dirs = convert_shards(tmp_path)
+    with open(os.path.join(shard_dirs[1], SHARD_MANIFEST_NAME), encoding='utf-8') as f:
+        damaged = next(iter(json.load(f)['outputs']))
+    with open(os.path.join(shard_dirs[1], damaged), 'a') as f:
+        f.write('# edited\n')
+    merged = str(tmp_path / 'merged')
+    problems = merge_shards(shard_dirs, merged)[1]
+    assert problems == [f"{shard_dirs[1]}: {damaged} is missing or does not match its recorded hash"]
+    assert not os.path.exists(merged)
@@ -0,0 +1,44 @@
+import os
+import stat
+
+import pytest
+
+from metrics import Counter, Histogram, Registry, write_metrics_file
+
+
+def make_registry():
+    registry = Registry()
+    counter = registry.register(Counter('test_total', "A counter", ('kind',)))
+    histogram = registry.register(Histogram('test_seconds', "A histogram", buckets=(0.1, 1.0)))
+    return registry, counter, histogram
+
+
+def test_render_counts_and_buckets():
+    registry, counter, histogram = make_registry()
+    counter.inc(kind='a')
+    counter.inc(2, kind='a')
+    histogram.observe(0.5)
+    text = registry.render()
+    assert 'test_total{kind="a"} 3' in text
+    assert 'test_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_seconds_bucket{le="1"} 1' in text
+    assert 'test_seconds_count 1' in text
+
+
+def test_metrics_file_is_world_readable(tmp_path):
+    registry, counter, _ = make_registry()
+    counter.inc(kind='a')
+    path = str(tmp_path / 'lookml.prom')
+    write_metrics_file(path, registry)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert os.listdir(tmp_path) == ['lookml.prom']
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    class Broken(Registry):
+        def render(self):
+            raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        write_metrics_file(str(tmp_path / 'lookml.prom'), Broken())
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,94 @@
+import json
+import os
+
+from object_diff import SNAPSHOT_NAME, diff_snapshots, main, parse_objects, snapshot_directory
+
+ORDERS = """label: Orders
+dimensions:
+  id:
+    sql: '"id"'
+  amount:
+    sql: |
+      CASE WHEN x THEN 1
+      ELSE 2 END
+measures:
+  count:
+    aggregate_type: count
+"""
+
+
+def write(directory, name, text):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+def test_parse_objects_splits_sections_and_block_scalars():
+    sections = parse_objects(ORDERS)
+    assert sections['dimensions']['amount']['sql'] == '|\n  CASE WHEN x THEN 1\n  ELSE 2 END'
+    assert sections['measures']['count'] == {'aggregate_type': 'count'}
+    assert sections[''][''] == {'label': 'Orders'}
+
+
+def test_reordered_output_is_not_a_change(tmp_path):
+    old, new = tmp_path / 'old', tmp_path / 'new'
+    old.mkdir()
+    new.mkdir()
+    write(old, 'orders.view.yaml', ORDERS)
+    write(new, 'orders.view.yaml', "measures:\n  count:\n    aggregate_type: count\n"
+                                   "dimensions:\n  amount:\n    sql: |\n      CASE WHEN x THEN 1\n      ELSE 2 END\n"
+                                   "  id:\n    sql: '\"id\"'\nlabel: Orders\n")
+    assert diff_snapshots(snapshot_directory(str(old)), snapshot_directory(str(new))) == []
+
+
+def test_changes_are_reported_per_property(tmp_path):
+    old, new = tmp_path / 'old', tmp_path / 'new'
+    old.mkdir()
+    new.mkdir()
+    write(old, 'orders.view.yaml', ORDERS)
+    write(old, 'users.view.yaml', "label: Users\n")
+    write(new, 'orders.view.yaml', ORDERS.replace('aggregate_type: count', 'aggregate_type: count_distinct')
+          + "filters:\n  region:\n    type: string\n")
+    changes = diff_snapshots(snapshot_directory(str(old)), snapshot_directory(str(new)))
+    assert changes == [
+        {'file': 'orders.view.yaml', 'section': 'filters', 'object': 'region', 'change': 'added'},
+        {'file': 'orders.view.yaml', 'section': 'measures', 'object': 'count', 'change': 'changed',
+         'properties': {'aggregate_type': ['count', 'count_distinct']}},
+        {'file': 'users.view.yaml', 'section': '', 'object': '', 'change': 'removed'},
+    ]
+
+
+def test_diff_writes_nothing_without_cache(tmp_path, capsys):
+    old, new = tmp_path / 'old', tmp_path / 'new'
+    old.mkdir()
+    new.mkdir()
+    write(old, 'orders.view.yaml', ORDERS)
+    write(new, 'orders.view.yaml', ORDERS)
+    assert main(['diff', str(old), str(new)]) == 0
+    assert os.listdir(old) == ['orders.view.yaml'] and os.listdir(new) == ['orders.view.yaml']
+    assert main(['diff', str(old), str(new), '--cache']) == 0
+    assert os.path.exists(old / SNAPSHOT_NAME) and os.path.exists(new / SNAPSHOT_NAME)
+
+
+def test_snapshot_file_against_hand_edited_directory(tmp_path, capsys):
+    output = tmp_path / 'out'
+    output.mkdir()
+    path = write(output, 'orders.view.yaml', ORDERS)
+    before = str(tmp_path / 'before.json')
+    assert main(['snapshot', str(output), '-o', before]) == 0
+    # The directory's cached snapshot no longer matches the edited file, so it is read again
+    stat = os.stat(path)
+    write(output, 'orders.view.yaml', ORDERS.replace('count\n', 'COUNT\n'))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    changes_path = str(tmp_path / 'changes.json')
+    assert main(['diff', before, str(output), '--json', changes_path]) == 1
+    with open(changes_path, encoding='utf-8') as f:
+        changes = json.load(f)
+    assert [(change['object'], change['properties']) for change in changes] == \
+        [('count', {'aggregate_type': ['count', 'COUNT']})]
+
+
+def test_unknown_side_is_an_error(tmp_path, capsys):
+    assert main(['diff', str(tmp_path / 'missing.json'), str(tmp_path)]) == 2
+    assert 'neither an output directory nor a snapshot' in capsys.readouterr().err
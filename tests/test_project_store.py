@@ -0,0 +1,88 @@
+import os
+
+from lookml_project import LookMLProject
+from project_store import SqliteStore
+
+FILES = {
+    'base.view.lkml': """
+view: base {
+  extension: required
+  dimension: id {
+    sql: ${TABLE}.id ;;
+  }
+  dimension: status {
+    sql:
+      CASE WHEN ${TABLE}.flag
+      THEN 'yes' END ;;
+  }
+  set: detail {
+    fields: [id, status]
+  }
+}
+""",
+    'orders.view.lkml': """
+view: orders {
+  extends: [base]
+  measure: count {
+    type: count
+    drill_fields: [detail*]
+  }
+}
+""",
+    'refine.view.lkml': """
+view: +orders {
+  dimension: id {
+    label: "Order ID"
+  }
+}
+""",
+    'loose.view.lkml': """
+dimension: total {
+  sql: ${TABLE}.total ;;
+}
+""",
+}
+
+
+def outputs(store=None):
+    project = LookMLProject(store=store)
+    for path, code in FILES.items():
+        project.add_file(path, code)
+    return {path: {output: project.convert_output(path, target) for output, target in project.output_paths(path).items()}
+            for path in FILES}
+
+
+def test_sqlite_store_converts_like_the_memory_store(tmp_path):
+    expected = outputs()
+    # Multi-line SQL must come back from the database as a block, not a one-line string
+    assert 'sql: |' in expected['orders.view.lkml']['orders.view.yaml']
+    store = SqliteStore(str(tmp_path / 'project.sqlite'), cache_views=1, cache_fields=1)
+    try:
+        assert outputs(store) == expected
+    finally:
+        store.close()
+
+
+def test_sqlite_store_pages_views_through_a_bounded_cache(tmp_path):
+    store = SqliteStore(str(tmp_path / 'project.sqlite'), cache_views=1)
+    try:
+        project = LookMLProject(store=store)
+        for path, code in FILES.items():
+            project.add_file(path, code)
+        first = store.view('orders')
+        store.view('base')
+        assert len(store.cache.entries) == 1
+        # Evicted views are read back from the database unchanged
+        assert store.view('orders') == first and store.view('orders') is not first
+        assert [layer['refinement'] for layer in store.refinements('orders')] == [True]
+        assert store.has_loose('loose.view.lkml') and not store.has_loose('orders.view.lkml')
+    finally:
+        store.close()
+
+
+def test_temporary_database_is_removed_on_close():
+    store = SqliteStore()
+    path = store.path
+    assert os.path.exists(path)
+    store.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,76 @@
+import pytest
+
+from rename_rules import RenameRules, RuleError
+
+RULES = """
+rules:
+  - match: {name: sum_planned_cpx, label: Total Planned CXP}
+    rename: sum_cxp_planned
+  - match: {name: {regex: 'total_(?P<what>\\w+?)(?:_(?P<unit>usd|eur))?'}}
+    rename: '{what}_total{unit}'
+  - match: {name: {glob: "*_sk"}}
+    set: {hidden: true}
+  - match: {sql: {glob: '*"DELETED_FLAG"*'}}
+    set: {hidden: true}
+    rename: '{name}_deleted'
+  - match: {label: {glob: "*"}}
+    set: {group_label: Labelled}
+"""
+
+
+def rules():
+    return RenameRules.from_yaml(RULES)
+
+
+def test_exact_match_needs_every_condition():
+    assert rules().apply('sum_planned_cpx', {'label': 'Total Planned CXP'})[0] == 'sum_cxp_planned'
+    # The label condition fails, so a later rule matching any label wins instead
+    assert rules().apply('sum_planned_cpx', {'label': 'Other'}) == \
+        ('sum_planned_cpx', {'label': 'Other', 'group_label': 'Labelled'})
+
+
+def test_regex_groups_fill_the_rename_and_missing_groups_are_empty():
+    assert rules().apply('total_revenue_usd', {})[0] == 'revenue_totalusd'
+    assert rules().apply('total_revenue', {})[0] == 'revenue_total'
+
+
+def test_glob_overrides_properties_without_renaming():
+    assert rules().apply('customer_sk', {'sql': '"CUSTOMER_SK"'}) == \
+        ('customer_sk', {'sql': '"CUSTOMER_SK"', 'hidden': True})
+
+
+def test_sql_conditions_and_name_placeholder():
+    name, props = rules().apply('status', {'sql': 'CASE WHEN "DELETED_FLAG" THEN 1 END'})
+    assert name == 'status_deleted' and props['hidden'] is True
+
+
+def test_first_matching_rule_wins():
+    assert rules().apply('total_sk', {})[0] == 'sk_total'
+
+
+def test_unmatched_fields_are_unchanged():
+    props = {'sql': '"ID"'}
+    assert rules().apply('id', props) == ('id', props)
+
+
+@pytest.mark.parametrize('text, message', [
+    ("rules: {name: x}", "must hold a list"),
+    ("rules: [x]", "Rule 1: expected a mapping"),
+    ("rules:\n  - match: {field: x}\n    rename: y", "unknown condition field"),
+    ("rules:\n  - match: {name: x}", "needs rename or set"),
+    ("rules:\n  - match: {name: {like: x}}\n    rename: y", "unknown matcher 'like'"),
+    ("rules:\n  - match: {name: {regex: '('}}\n    rename: y", "invalid regex for name"),
+    ("rules:\n  - match: {name: [x]}\n    rename: y", "name must be a string"),
+    ("rules:\n  - match: {name: x}\n    set: [hidden]", "set must be a mapping"),
+    ("rules:\n  - match: {name: x}\n    rename: [y]", "rename must be a string"),
+    ("rules:\n  - match: {name: {regex: 'a(?P<b>c)'}}\n    rename: '{d}'", "unknown placeholder"),
+    ("rules:\n  - match: {name: x}\n    rename: '{name'", "invalid rename template"),
+    ("rules: [", "Invalid rules file"),
+])
+def test_invalid_rules_are_rejected_when_loaded(text, message):
+    with pytest.raises(RuleError, match=message):
+        RenameRules.from_yaml(text)
+
+
+def test_bundled_rules_load():
+    assert RenameRules.load().rules
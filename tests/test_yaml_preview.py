@@ -0,0 +1,45 @@
+from yaml_preview import YamlPreview, last_lines
+
+DOCUMENT = """label: Orders
+dimensions:
+  id:
+    sql: '"id"'
+  order_total:
+    sql: '"total"'
+measures:
+  count:
+    aggregate_type: count
+  'total.sum':
+    aggregate_type: sum
+"""
+
+
+def test_index_lists_objects_with_their_lines():
+    preview = YamlPreview(DOCUMENT)
+    assert [(entry.section, entry.name, entry.line) for entry in preview.index] == [
+        ('dimensions', 'id', 2), ('dimensions', 'order_total', 4),
+        ('measures', 'count', 7), ('measures', 'total.sum', 9)]
+
+
+def test_search_ignores_case_and_reports_the_full_count():
+    preview = YamlPreview(DOCUMENT)
+    matches, total = preview.search('TOTAL', limit=1)
+    assert [entry.name for entry in matches] == ['order_total'] and total == 2
+    assert preview.search('  ')[1] == 4
+
+
+def test_pages_cover_every_line_once():
+    preview = YamlPreview(DOCUMENT, page_lines=4)
+    assert preview.line_count == 11 and preview.page_count == 3
+    pages = [preview.page(number) for number in range(1, 4)]
+    assert '\n'.join(text for text, _, _ in pages) + '\n' == DOCUMENT
+    assert [(first, last) for _, first, last in pages] == [(1, 4), (5, 8), (9, 11)]
+    # Out of range pages are clamped
+    assert preview.page(0) == pages[0] and preview.page(9) == pages[-1]
+    assert preview.page_of(preview.index[-1].line) == 3
+
+
+def test_last_lines():
+    assert last_lines(DOCUMENT, 2) == "  'total.sum':\n    aggregate_type: sum"
+    assert last_lines("a\nb", 5) == "a\nb"
+    assert last_lines("", 5) == ""
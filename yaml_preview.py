@@ -0,0 +1,88 @@
+"""Paged view of converted YAML with an index of its objects.
+
+Multi-megabyte outputs freeze the browser when rendered whole, and every
+rerun would send them again. The app therefore keeps the document on the
+server and sends one page of lines at a time; the index of dimensions,
+measures and filters (name and line) is built once per document, and name
+searches run against it server-side, so only the matches reach the page.
+"""
+import re
+from typing import List, NamedTuple, Tuple
+
+PAGE_LINES = 200
+# Top-level sections whose direct children are indexed as objects
+INDEXED_SECTIONS = ('dimensions', 'measures', 'filters')
+SECTION_RE = re.compile(r'^(\w+):\s*$')
+OBJECT_KEY_RE = re.compile(r"""^  ['"]?([\w.]+)['"]?:""")
+
+
+class IndexEntry(NamedTuple):
+    section: str
+    name: str
+    line: int
+
+
+class YamlPreview:
+    """Line offsets and object index of one YAML document, for paged display and search"""
+
+    def __init__(self, text: str, page_lines: int = PAGE_LINES):
+        self.text = text
+        self.page_lines = page_lines
+        # Offset of the start of each line, plus the end of the text
+        self.line_starts: List[int] = []
+        self.index: List[IndexEntry] = []
+        section = None
+        offset = 0
+        for number, line in enumerate(text.split('\n')):
+            self.line_starts.append(offset)
+            offset += len(line) + 1
+            if not line.startswith(' '):
+                section_match = SECTION_RE.match(line)
+                section = section_match.group(1) if section_match else None
+            elif section in INDEXED_SECTIONS:
+                object_match = OBJECT_KEY_RE.match(line)
+                if object_match:
+                    self.index.append(IndexEntry(section, object_match.group(1), number))
+        if text.endswith('\n'):
+            # The split leaves an empty last line after a final newline
+            self.line_starts.pop()
+        self.line_starts.append(len(text))
+        self._names = [entry.name.lower() for entry in self.index]
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts) - 1
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.line_count // self.page_lines))
+
+    def page_of(self, line: int) -> int:
+        """Page, starting at 1, that shows a line, starting at 0"""
+        return line // self.page_lines + 1
+
+    def page(self, page: int) -> Tuple[str, int, int]:
+        """Text of a page, starting at 1, with its first and last line numbers, starting at 1"""
+        page = min(max(page, 1), self.page_count)
+        first = (page - 1) * self.page_lines
+        last = min(first + self.page_lines, self.line_count)
+        return self.text[self.line_starts[first]:self.line_starts[last]].rstrip('\n'), first + 1, last
+
+    def search(self, query: str, limit: int = 100) -> Tuple[List[IndexEntry], int]:
+        """Objects whose name contains query, ignoring case, in document order, and how many matched in all"""
+        query = query.strip().lower()
+        if not query:
+            return self.index[:limit], len(self.index)
+        matches = [entry for entry, name in zip(self.index, self._names) if query in name]
+        return matches[:limit], len(matches)
+
+
+def last_lines(text: str, count: int = PAGE_LINES) -> str:
+    """The last count lines of text, without copying the rest"""
+    end = len(text.rstrip('\n'))
+    start = end
+    for _ in range(count):
+        start = text.rfind('\n', 0, start)
+        if start < 0:
+            return text[:end]
+    return text[start + 1:end]